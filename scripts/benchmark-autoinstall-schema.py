@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+
+# Copyright 2024 Canonical, Ltd.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Compare uncached and cached validation of the autoinstall examples.
+
+Each example is validated the way the server does it: the whole document
+against the top-level schema, then each section against the schema of
+the controller that owns it.
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+import jsonschema
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from subiquity.common.schema import SchemaRegistry  # noqa: E402
+
+
+def validate_all(validate, schema, corpus):
+    failures = 0
+    for data in corpus:
+        for instance, subschema in [(data, schema)] + [
+            (data[key], schema["properties"][key])
+            for key in data
+            if key in schema["properties"]
+        ]:
+            try:
+                validate(instance, subschema)
+            except jsonschema.ValidationError:
+                failures += 1
+    return failures
+
+
+def timed(label, func, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        result = func()
+    elapsed = time.perf_counter() - start
+    print(
+        "{:>10}: {:8.2f} ms per pass ({} failed validations)".format(
+            label, elapsed * 1000 / iterations, result
+        )
+    )
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--json-schema", default="autoinstall-schema.json")
+    parser.add_argument(
+        "examples", nargs="*", default=sorted(glob.glob("examples/autoinstall/*.yaml"))
+    )
+    parser.add_argument("-n", "--iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    with open(args.json_schema) as fp:
+        schema = json.load(fp)
+    corpus = []
+    for path in args.examples:
+        with open(path) as fp:
+            data = yaml.safe_load(fp)
+        if isinstance(data, dict) and "autoinstall" in data:
+            data = data["autoinstall"]
+        corpus.append(data)
+    print("{} documents, {} iterations".format(len(corpus), args.iterations))
+
+    registry = SchemaRegistry()
+    uncached = timed(
+        "uncached",
+        lambda: validate_all(jsonschema.validate, schema, corpus),
+        args.iterations,
+    )
+    cached = timed(
+        "cached",
+        lambda: validate_all(registry.validate, schema, corpus),
+        args.iterations,
+    )
+    print("{:>10}: {:8.1f}x".format("speedup", uncached / cached))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+
+# Copyright 2024 Canonical, Ltd.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Compare grep-status with the in-process dpkg status index.
+
+The query is the one used to list the kernels installed on the target:
+the installed packages that provide linux-image. Run it against the
+status file of a full desktop install for meaningful numbers.
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from subiquity.server.dpkg import DpkgStatus  # noqa: E402
+
+
+def grep_status(path):
+    cp = subprocess.run(
+        [
+            "grep-status",
+            "--whole-pkg",
+            "-FProvides",
+            "linux-image",
+            "--and",
+            "-FStatus",
+            "installed",
+            "--show-field=Package",
+            "--no-field-names",
+            path,
+        ],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    return [line for line in cp.stdout.splitlines() if line]
+
+
+def timed(label, func, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        result = func()
+    elapsed = time.perf_counter() - start
+    print(
+        "{:>12}: {:8.2f} ms per run ({} packages)".format(
+            label, elapsed * 1000 / iterations, len(result)
+        )
+    )
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("status", nargs="?", default="/var/lib/dpkg/status")
+    parser.add_argument("-n", "--iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    with open(args.status) as fp:
+        stanzas = fp.read().count("\nPackage: ") + 1
+    print("{} stanzas, {} iterations".format(stanzas, args.iterations))
+
+    parse = timed(
+        "parse",
+        lambda: DpkgStatus.from_file(args.status).packages,
+        args.iterations,
+    )
+    status = DpkgStatus.from_file(args.status)
+    timed(
+        "indexed",
+        lambda: status.installed_providers("linux-image"),
+        args.iterations,
+    )
+    if shutil.which("grep-status") is None:
+        print("grep-status not found, install dctrl-tools to compare")
+        return
+    forked = timed("grep-status", lambda: grep_status(args.status), args.iterations)
+    print("{:>12}: {:8.1f}x".format("speedup", forked / parse))
+
+
+if __name__ == "__main__":
+    main()
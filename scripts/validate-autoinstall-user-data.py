@@ -25,14 +25,113 @@ autoinstall:
 
 To validate the user-data directly, you can pass the --no-expect-cloudconfig
 switch.
+
+With --batch, any number of files and directories (searched recursively)
+are validated across a pool of worker processes, each of which compiles
+the schema once. Every problem found is written to stdout as a line of
+JSON:
+
+{"path": ..., "section": ..., "pointer": ..., "message": ...}
+
+where section is the top-level autoinstall key the problem is in (or
+null) and pointer is a JSON pointer to the offending value. The exit
+status is 0 if every file is valid, 1 if any is not.
 """
 
 import argparse
+import fnmatch
 import json
+import multiprocessing
+import os
+import sys
 
 import jsonschema
 import yaml
 
+# Set in each batch worker (or, with fork, inherited from the parent).
+_validator = None
+_expect_cloudconfig = True
+
+
+def _init_worker(schema, expect_cloudconfig):
+    global _validator, _expect_cloudconfig
+    if _validator is None or _validator.schema != schema:
+        cls = jsonschema.validators.validator_for(schema)
+        cls.check_schema(schema)
+        _validator = cls(schema)
+    _expect_cloudconfig = expect_cloudconfig
+
+
+def _json_pointer(path):
+    return "".join(
+        "/" + str(p).replace("~", "~0").replace("/", "~1") for p in path)
+
+
+def _problem(path, message, section=None, pointer=""):
+    return {
+        "path": path,
+        "section": section,
+        "pointer": pointer,
+        "message": message,
+    }
+
+
+def validate_file(path):
+    """ Return the list of problems with the user data at path. """
+    try:
+        with open(path) as fp:
+            if _expect_cloudconfig and fp.readline() != "#cloud-config\n":
+                return [_problem(path, "not a #cloud-config file")]
+            data = yaml.safe_load(fp)
+    except (OSError, UnicodeDecodeError, yaml.YAMLError) as exc:
+        return [_problem(path, str(exc))]
+    if _expect_cloudconfig:
+        if not isinstance(data, dict) or "autoinstall" not in data:
+            return [_problem(path, "no autoinstall section")]
+        data = data["autoinstall"]
+        prefix = ["autoinstall"]
+    else:
+        prefix = []
+    problems = []
+    errors = sorted(_validator.iter_errors(data),
+                    key=lambda e: list(map(str, e.absolute_path)))
+    for error in errors:
+        error_path = list(error.absolute_path)
+        section = error_path[0] if error_path else None
+        problems.append(_problem(
+            path, error.message, section, _json_pointer(prefix + error_path)))
+    return problems
+
+
+def find_files(paths, pattern):
+    for path in paths:
+        if not os.path.isdir(path):
+            yield path
+            continue
+        for dirpath, dirnames, filenames in os.walk(path):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                if fnmatch.fnmatch(filename, pattern):
+                    yield os.path.join(dirpath, filename)
+
+
+def run_batch(schema, paths, *, expect_cloudconfig, jobs, pattern) -> int:
+    files = list(find_files(paths, pattern))
+    # Compile here first so that forked workers inherit the validator.
+    _init_worker(schema, expect_cloudconfig)
+    invalid = 0
+    initargs = (schema, expect_cloudconfig)
+    with multiprocessing.Pool(jobs, _init_worker, initargs) as pool:
+        chunksize = max(1, len(files) // (4 * (jobs or os.cpu_count() or 1)))
+        for problems in pool.imap(validate_file, files, chunksize):
+            if problems:
+                invalid += 1
+            for problem in problems:
+                print(json.dumps(problem))
+    print("{} files checked, {} invalid".format(len(files), invalid),
+          file=sys.stderr)
+    return 1 if invalid else 0
+
 
 def main() -> None:
     """ Entry point. """
@@ -42,17 +141,40 @@ def main() -> None:
                         help="Path to the JSON schema",
                         type=argparse.FileType("r"),
                         default="autoinstall-schema.json")
-    parser.add_argument("input", nargs="?",
-                        help="Path to the user data instead of stdin",
-                        type=argparse.FileType("r"),
-                        default="-")
+    parser.add_argument("input", nargs="*",
+                        help="Path to the user data instead of stdin "
+                             "(with --batch, files and directories)",
+                        default=["-"])
     parser.add_argument("--no-expect-cloudconfig", dest="expect-cloudconfig",
                         action="store_false",
                         help="Assume the data is not wrapped in cloud-config.",
                         default=True)
+    parser.add_argument("--batch", action="store_true",
+                        help="Validate many files, reporting problems as "
+                             "JSON lines.")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="Number of worker processes for --batch "
+                             "(default: number of CPUs).")
+    parser.add_argument("--pattern", default="*",
+                        help="Only validate files in directories whose name "
+                             "matches this glob (default: %(default)s).")
 
     args = vars(parser.parse_args())
 
+    if args["batch"]:
+        if args["input"] == ["-"]:
+            parser.error("--batch needs files or directories to validate")
+        sys.exit(run_batch(json.load(args["json_schema"]), args["input"],
+                           expect_cloudconfig=args["expect-cloudconfig"],
+                           jobs=args["jobs"], pattern=args["pattern"]))
+
+    if len(args["input"]) > 1:
+        parser.error("only one input can be validated without --batch")
+    if args["input"][0] == "-":
+        args["input"] = sys.stdin
+    else:
+        args["input"] = open(args["input"][0])
+
     if args["expect-cloudconfig"]:
         assert args["input"].readline() == "#cloud-config\n"
         get_autoinstall_data = lambda data: data["autoinstall"]
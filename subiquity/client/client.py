@@ -223,10 +223,10 @@ class SubiquityClient(TuiApplication):
             answer = await run_in_thread(input)
         await self.confirm_install()
 
-    async def _status_get(self, cur=None):
+    async def _status_get(self, since=None):
         while True:
             try:
-                return await self.client.meta.status.GET(cur=cur)
+                return await self.client.meta.status.GET(since=since)
             except aiohttp.ClientError:
                 try:
                     fp = open(self.state_path("server-state"))
@@ -257,7 +257,7 @@ class SubiquityClient(TuiApplication):
                 print("An error occurred. Press enter to start a shell")
                 await run_in_thread(input)
                 os.execvp("/bin/bash", ["/bin/bash"])
-            app_status = await self._status_get(app_state)
+            app_status = await self._status_get(app_status.version)
 
     def subiquity_event_noninteractive(self, event):
         if event["SUBIQUITY_EVENT_TYPE"] == "start":
@@ -288,15 +288,15 @@ class SubiquityClient(TuiApplication):
         journald_listen([status.echo_syslog_id], lambda e: print(e["MESSAGE"]))
         if status.state == ApplicationState.STARTING_UP:
             status = await spinning_wait(
-                "starting up", self._status_get(cur=status.state)
+                "starting up", self._status_get(since=status.version)
             )
         if status.state == ApplicationState.CLOUD_INIT_WAIT:
             status = await spinning_wait(
-                "waiting for cloud-init", self._status_get(cur=status.state)
+                "waiting for cloud-init", self._status_get(since=status.version)
             )
         if status.state == ApplicationState.EARLY_COMMANDS:
             print("running early commands")
-            status = await self._status_get(cur=status.state)
+            status = await self._status_get(since=status.version)
             await asyncio.sleep(0.5)
         return status
 
@@ -32,6 +32,7 @@ class ProgressController(SubiquityTuiController):
         super().__init__(app)
         self.progress_view = ProgressView(self)
         self.app_state = None
+        self.app_status_version = None
         self.crash_report_ref = None
         self.answers = app.answers.get("InstallProgress", {})
 
@@ -70,11 +71,14 @@ class ProgressController(SubiquityTuiController):
         install_running = None
         while True:
             try:
-                app_status = await self.app.client.meta.status.GET(cur=self.app_state)
+                app_status = await self.app.client.meta.status.GET(
+                    since=self.app_status_version
+                )
             except aiohttp.ClientError:
                 await asyncio.sleep(1)
                 continue
             self.app_state = app_status.state
+            self.app_status_version = app_status.version
 
             self.progress_view.update_for_state(self.app_state)
             if self.ui.body is self.progress_view:
@@ -24,6 +24,7 @@ import sys
 import attr
 
 from subiquitycore.log import setup_logger
+from subiquitycore.tracing import TraceEventWriter
 
 from .common import LOGDIR, setup_environment
 
@@ -141,6 +142,16 @@ def make_server_args_parser():
     parser.add_argument(
         "--postinst-hooks-dir", default="/etc/subiquity/postinst.d", type=pathlib.Path
     )
+    parser.add_argument(
+        "--trace",
+        action="store_true",
+        default=False,
+        help=(
+            "Write a Chrome trace event file of the server's operations to "
+            "the log directory. Also enabled by subiquity-trace on the "
+            "kernel command line."
+        ),
+    )
     return parser
 
 
@@ -158,6 +169,8 @@ def main():
         opts.storage_version = int(
             opts.kernel_cmdline.get("subiquity-storage-version", 1)
         )
+    if "subiquity-trace" in opts.kernel_cmdline:
+        opts.trace = True
     logdir = LOGDIR
     if opts.dry_run:
         if opts.dry_run_config:
@@ -214,7 +227,20 @@ def main():
             "UdiLog",
             os.path.realpath("/var/log/installer/ubuntu_desktop_installer.log"),
         )
-        await server.run()
+        tracer = None
+        if opts.trace:
+            tracer = TraceEventWriter(
+                os.path.join(logdir, f"subiquity-server-trace.{os.getpid()}.json"),
+                "subiquity-server",
+            )
+            server.add_event_listener(tracer)
+        try:
+            await server.run()
+        finally:
+            if server.snapd is not None:
+                await server.snapd.close()
+            if tracer is not None:
+                tracer.close()
 
     asyncio.run(run_with_loop())
 
@@ -17,6 +17,7 @@ import inspect
 import json
 import logging
 import os
+import time
 import traceback
 
 from aiohttp import web
@@ -136,10 +137,14 @@ def _make_handler(
 
     async def handler(request):
         context = controller.context.child(implementation.__name__)
+        # Time spent in each phase of handling the request, for the
+        # server's middleware to collect.
+        timings = request["timings"] = {}
         with context:
             context.set("request", request)
             args = {}
             try:
+                start = time.monotonic()
                 if data_annotation is not None:
                     args[data_arg] = serializer.from_json(
                         data_annotation, await request.text()
@@ -160,12 +165,22 @@ def _make_handler(
                     args["context"] = context
                 if "request" in impl_params:
                     args["request"] = request
+                end = time.monotonic()
+                timings["deserialize"] = end - start
+                start = end
                 await check_controllers_started(definition, controller, request)
+                end = time.monotonic()
+                timings["wait"] = end - start
+                start = end
                 result = await implementation(**args)
+                end = time.monotonic()
+                timings["implementation"] = end - start
+                start = end
                 resp = web.json_response(
                     serializer.serialize(def_ret_ann, result),
                     headers={"x-status": "ok"},
                 )
+                timings["serialize"] = time.monotonic() - start
             except Exception as exc:
                 tb = traceback.TracebackException.from_exception(exc)
                 resp = web.Response(
@@ -38,6 +38,7 @@ from subiquity.common.types import (
     Disk,
     DriversPayload,
     DriversResponse,
+    EndpointMetrics,
     ErrorReportRef,
     GuidedChoiceV2,
     GuidedStorageResponseV2,
@@ -51,6 +52,7 @@ from subiquity.common.types import (
     MirrorPostResponse,
     MirrorSelectionFallback,
     ModifyPartitionV2,
+    NetworkDelta,
     NetworkStatus,
     OEMResponse,
     PackageInstallState,
@@ -99,8 +101,17 @@ class API:
     class meta:
         class status:
             @allowed_before_start
-            def GET(cur: Optional[ApplicationState] = None) -> ApplicationStatus:
-                """Get the installer state."""
+            def GET(
+                cur: Optional[ApplicationState] = None, since: Optional[int] = None
+            ) -> ApplicationStatus:
+                """Get the installer state.
+
+                If since is passed, wait for the first state the server
+                entered after the one with that version, so that a client
+                passing the version of the last status it got sees every
+                state in turn. If cur is passed, wait for the next
+                transition if the server is still in state cur.
+                """
 
         class mark_configured:
             def POST(endpoint_names: List[str]) -> None:
@@ -136,6 +147,13 @@ class API:
                 the list of components.  free-only choice must be made prior to
                 confirmation of filesystem changes"""
 
+        class metrics:
+            @allowed_before_start
+            def GET() -> List[EndpointMetrics]:
+                """Get request counts and latency histograms for each API
+                endpoint. The same data is available in the Prometheus text
+                format from /meta/metrics/prometheus."""
+
         class interactive_sections:
             def GET() -> Optional[List[str]]:
                 ...
@@ -208,6 +226,14 @@ class API:
         def POST() -> None:
             ...
 
+        class changes:
+            def GET(since: int) -> NetworkDelta:
+                """Return the devices that changed after version since.
+
+                The version to pass is the one from the previous GET of
+                this endpoint or of /network.
+                """
+
         class has_network:
             def GET() -> bool:
                 ...
@@ -535,6 +561,13 @@ class API:
             def GET(user_id: str) -> SSHFetchIdResponse:
                 ...
 
+        class fetch_ids:
+            def GET(user_ids: List[str]) -> List[SSHFetchIdResponse]:
+                """Fetch the keys for several ids at once.
+
+                The responses are in the same order as user_ids.
+                """
+
     class integrity:
         def GET() -> CasperMd5Results:
             ...
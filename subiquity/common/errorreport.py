@@ -14,6 +14,7 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import asyncio
+import collections
 import fcntl
 import json
 import logging
@@ -38,6 +39,149 @@ from subiquitycore.file_util import write_file
 
 log = logging.getLogger("subiquity.common.errorreport")
 
+LOG_TAIL_SIZE = 2048
+INDEX_FILENAME = "subiquity-reports.index"
+INDEX_VERSION = 1
+_READ_BLOCK_SIZE = 64 * 1024
+_MIN_UPLOAD_CHUNK = 16 * 1024
+_MAX_UPLOAD_CHUNK = 1024 * 1024
+
+
+def _reversed_blocks(value, block_size=_READ_BLOCK_SIZE):
+    """Yield the contents of a report value in blocks, last block first.
+
+    value can be a str or bytes, an apport CompressedValue or a file
+    reference tuple as accepted by apport.Report.  Files are read by
+    seeking backwards from the end so that only the blocks actually
+    needed are read.
+    """
+    if isinstance(value, tuple):
+        fp = value[0]
+        if isinstance(fp, str):
+            with open(fp, "rb") as fp:
+                yield from _reversed_blocks((fp,), block_size)
+            return
+        pos = fp.seek(0, os.SEEK_END)
+        while pos > 0:
+            step = min(block_size, pos)
+            pos -= step
+            fp.seek(pos)
+            yield fp.read(step)
+        return
+    if hasattr(value, "get_value"):
+        value = value.get_value()
+    for end in range(len(value), 0, -block_size):
+        yield value[max(0, end - block_size) : end]
+
+
+def _reversed_lines(blocks):
+    """Yield the lines in a stream of blocks produced by _reversed_blocks.
+
+    Lines are yielded last first, as str, and without their line
+    endings. Like str.splitlines, a trailing newline does not produce a
+    final empty line.
+    """
+
+    def decoded(parts):
+        line = parts[0][:0].join(parts)
+        if isinstance(line, bytes):
+            line = line.decode("utf-8", "replace")
+        if not line:
+            return [line]
+        return reversed(line.splitlines())
+
+    # The pieces of the line that straddles the current block boundary.
+    partial = collections.deque()
+    first = True
+    for block in blocks:
+        lines = block.split(b"\n" if isinstance(block, bytes) else "\n")
+        if len(lines) == 1:
+            partial.appendleft(block)
+            continue
+        partial.appendleft(lines.pop())
+        if not first or partial[0] or len(partial) > 1:
+            yield from decoded(partial)
+        first = False
+        for line in reversed(lines[1:]):
+            yield from decoded([line])
+        partial = collections.deque([lines[0]])
+    if partial:
+        yield from decoded(partial)
+
+
+def log_tail(value, limit=LOG_TAIL_SIZE):
+    """Return the stripped trailing lines of value that fit in limit chars.
+
+    This reads value from the end, so the cost depends on the size of
+    the tail and not on the size of the whole log.
+    """
+    tail = []
+    size = 0
+    for line in _reversed_lines(_reversed_blocks(value)):
+        line = line.strip()
+        size += len(line)
+        if size > limit:
+            break
+        tail.append(line)
+    tail.reverse()
+    return "\n".join(tail)
+
+
+def bson_encode_stream(doc):
+    """Encode doc as BSON one element at a time.
+
+    Returns the total length of the encoding and an iterable of the
+    pieces that make it up: the length header, one encoded element per
+    key and the terminating NUL. The pieces are never joined into a
+    single buffer.
+    """
+    elements = []
+    length = 4 + 1
+    for key, value in doc.items():
+        # The encoding of a single element document is the int32 length,
+        # the element itself and a trailing NUL.
+        element = memoryview(bson.BSON().encode({key: value}))[4:-1]
+        elements.append(element)
+        length += len(element)
+
+    def pieces():
+        yield length.to_bytes(4, "little")
+        yield from elements
+        yield b"\x00"
+
+    return length, pieces()
+
+
+def _date_from_base(base):
+    # Report bases start with the time.time() at which they were created,
+    # see ErrorReport.new.
+    try:
+        timestamp = float(base.rsplit(".", 1)[0])
+    except ValueError:
+        return "???"
+    return time.asctime(time.localtime(timestamp))
+
+
+def _upload_chunk_size(length):
+    # Aim for around a hundred progress updates, within sensible bounds.
+    return max(_MIN_UPLOAD_CHUNK, min(_MAX_UPLOAD_CHUNK, length // 100))
+
+
+def _chunked(pieces, chunk_size):
+    """Regroup an iterable of bytes-like pieces into chunk_size chunks."""
+    buf = bytearray()
+    for piece in pieces:
+        piece = memoryview(piece)
+        while piece:
+            take = chunk_size - len(buf)
+            buf += piece[:take]
+            piece = piece[take:]
+            if len(buf) == chunk_size:
+                yield bytes(buf)
+                buf.clear()
+    if buf:
+        yield bytes(buf)
+
 
 @attr.s(eq=False)
 class Upload(metaclass=urwid.MetaSignals):
@@ -81,6 +225,7 @@ class ErrorReport(metaclass=urwid.MetaSignals):
     _file = attr.ib()
     _context = attr.ib()
     _info_task = attr.ib(default=None)
+    _load_task = attr.ib(default=None)
 
     meta = attr.ib(default=attr.Factory(dict))
     uploader = attr.ib(default=None)
@@ -105,16 +250,25 @@ class ErrorReport(metaclass=urwid.MetaSignals):
         return r
 
     @classmethod
-    def from_file(cls, reporter, fpath):
+    def from_file(cls, reporter, fpath, entry=None):
+        """Create a report for fpath without loading it.
+
+        If entry is passed, it is a valid entry for the report from the
+        reporter's index and the .meta file is not read. Call
+        ensure_loaded to load the report itself.
+        """
         base = os.path.splitext(os.path.basename(fpath))[0]
         report = cls(
             reporter,
             base,
-            pr=apport.Report(date="???"),
+            pr=apport.Report(date=_date_from_base(base)),
             state=ErrorReportState.LOADING,
-            file=open(fpath, "rb"),
+            file=None,
             context=reporter.context.child(base),
         )
+        if entry is not None:
+            report.meta = dict(entry["meta"])
+            return report
         try:
             fp = open(report.meta_path, "r")
         except FileNotFoundError:
@@ -170,6 +324,7 @@ class ErrorReport(metaclass=urwid.MetaSignals):
                     self.state = ErrorReportState.DONE
                 self._file.close()
                 self._file = None
+                self.reporter.update_index(self)
                 urwid.emit_signal(self, "changed")
 
         if wait:
@@ -179,20 +334,28 @@ class ErrorReport(metaclass=urwid.MetaSignals):
         else:
             self._info_task = asyncio.create_task(add_info())
 
+    def _bg_load(self):
+        with open(self.path, "rb") as fp:
+            self.pr.load(fp)
+
     async def load(self):
         with self._context.child("load"):
             # Load report from disk in background.
             try:
-                await run_in_thread(self.pr.load, self._file)
+                await run_in_thread(self._bg_load)
             except Exception:
                 log.exception("loading problem report failed")
                 self.state = ErrorReportState.ERROR_LOADING
             else:
                 self.state = ErrorReportState.DONE
-        self._file.close()
-        self._file = None
         urwid.emit_signal(self, "changed")
 
+    def ensure_loaded(self):
+        """Start loading a report created by from_file, if not started yet."""
+        if self.state != ErrorReportState.LOADING or self._load_task is not None:
+            return
+        self._load_task = asyncio.create_task(self.load())
+
     def upload(self):
         uploader = self.uploader = Upload(bytes_to_send=1)
 
@@ -200,15 +363,14 @@ class ErrorReport(metaclass=urwid.MetaSignals):
         if self.reporter.dry_run:
             url = "https://daisy.staging.ubuntu.com"
 
-        chunk_size = 1024
-
-        def chunk(data):
-            for i in range(0, len(data), chunk_size):
+        def chunk(length, data):
+            chunk_size = _upload_chunk_size(length)
+            for piece in _chunked(data, chunk_size):
                 if uploader.cancelled:
                     log.debug("upload for %s cancelled", self.base)
                     return
-                yield data[i : i + chunk_size]
-                uploader._bg_update(uploader.bytes_sent + chunk_size)
+                yield piece
+                uploader._bg_update(uploader.bytes_sent + len(piece))
 
         def _bg_upload():
             for_upload = {"Kind": self.kind.value}
@@ -222,20 +384,15 @@ class ErrorReport(metaclass=urwid.MetaSignals):
                 else:
                     log.debug("dropping %s of length %s", k, len(v))
             if "CurtinLog" in self.pr:
-                logtail = []
-                for line in self.pr["CurtinLog"].splitlines():
-                    logtail.append(line.strip())
-                    while sum(map(len, logtail)) > 2048:
-                        logtail.pop(0)
-                for_upload["CurtinLogTail"] = "\n".join(logtail)
-            data = bson.BSON().encode(for_upload)
-            self.uploader._bg_update(0, len(data))
+                for_upload["CurtinLogTail"] = log_tail(self.pr["CurtinLog"])
+            length, data = bson_encode_stream(for_upload)
+            self.uploader._bg_update(0, length)
             headers = {
                 "user-agent": "subiquity/{}".format(
                     os.environ.get("SNAP_VERSION", "SNAP_VERSION")
                 ),
             }
-            response = requests.post(url, data=chunk(data), headers=headers)
+            response = requests.post(url, data=chunk(length, data), headers=headers)
             response.raise_for_status()
             return response.text.split()[0]
 
@@ -272,6 +429,7 @@ class ErrorReport(metaclass=urwid.MetaSignals):
         self.meta[key] = value
         with open(self.meta_path, "w") as fp:
             json.dump(self.meta, fp, indent=4)
+        self.reporter.update_index(self)
 
     def mark_seen(self):
         self.set_meta("seen", True)
@@ -362,25 +520,98 @@ class ErrorReporter(object):
         self._apport_data = []
         self._apport_files = []
 
+    @property
+    def index_path(self):
+        return os.path.join(self.crash_directory, INDEX_FILENAME)
+
+    def _read_index(self):
+        try:
+            with open(self.index_path) as fp:
+                index = json.load(fp)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError):
+            log.exception("reading error report index failed")
+            return {}
+        if index.get("version") != INDEX_VERSION:
+            return {}
+        return index["reports"]
+
+    def _write_index(self, entries):
+        content = json.dumps({"version": INDEX_VERSION, "reports": entries})
+        try:
+            write_file(self.index_path, content)
+        except OSError:
+            log.exception("writing error report index failed")
+
+    def _index_entry(self, report):
+        try:
+            crash_stat = os.stat(report.path)
+            meta_stat = os.stat(report.meta_path)
+        except FileNotFoundError:
+            return None
+        return {
+            "meta": report.meta,
+            "mtime": crash_stat.st_mtime_ns,
+            "size": crash_stat.st_size,
+            "meta-mtime": meta_stat.st_mtime_ns,
+        }
+
+    def _entry_is_valid(self, base, entry):
+        try:
+            crash_stat = os.stat(os.path.join(self.crash_directory, base + ".crash"))
+            meta_stat = os.stat(os.path.join(self.crash_directory, base + ".meta"))
+        except FileNotFoundError:
+            return False
+        return (
+            entry.get("mtime") == crash_stat.st_mtime_ns
+            and entry.get("size") == crash_stat.st_size
+            and entry.get("meta-mtime") == meta_stat.st_mtime_ns
+        )
+
+    def update_index(self, report):
+        # The index may also be updated by the server or client process,
+        # so re-read it rather than writing out our own view.
+        entries = self._read_index()
+        entry = self._index_entry(report)
+        if entry is None:
+            entries.pop(report.base, None)
+        else:
+            entries[report.base] = entry
+        self._write_index(entries)
+
     def load_reports(self):
+        """Find the reports in the crash directory.
+
+        Reports are not loaded from disk; the kind, seen and oops-id
+        details come from the index (or the .meta file if the index
+        entry is missing or out of date). Call ensure_loaded on a report
+        to load it in full.
+        """
         os.makedirs(self.crash_directory, exist_ok=True)
         filenames = os.listdir(self.crash_directory)
-        to_load = []
+        index = self._read_index()
+        new_index = {}
+        dirty = False
         for filename in sorted(filenames, reverse=True):
             base, ext = os.path.splitext(filename)
             if ext != ".crash":
                 continue
+            entry = index.get(base)
+            if entry is not None and not self._entry_is_valid(base, entry):
+                entry = None
             if base not in self._reports_by_base:
                 path = os.path.join(self.crash_directory, filename)
-                r = ErrorReport.from_file(self, path)
+                r = ErrorReport.from_file(self, path, entry)
                 self.reports.append(r)
                 self._reports_by_base[base] = r
-                to_load.append(r)
-        schedule_task(self._load_reports(to_load))
-
-    async def _load_reports(self, to_load):
-        for report in to_load:
-            await report.load()
+            if entry is None:
+                entry = self._index_entry(self._reports_by_base[base])
+                dirty = True
+            if entry is not None:
+                new_index[base] = entry
+        if dirty or new_index.keys() != index.keys():
+            self._write_index(new_index)
 
     def note_file_for_apport(self, key, path):
         self._apport_files.append((key, path))
@@ -458,6 +689,6 @@ class ErrorReporter(object):
         self.reports.insert(0, report)
         self._reports_by_base[error_ref.base] = report
 
-        loop.call_soon(asyncio.create_task, report.load())
+        loop.call_soon(report.ensure_loaded)
 
         return report
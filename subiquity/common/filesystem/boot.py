@@ -363,8 +363,7 @@ def is_esp(device):
 
 @is_esp.register(Partition)
 def _is_esp_partition(partition):
-    new_disk = attr.evolve(partition.device)
-    new_disk._partitions = []
+    new_disk = partition.device._with_partitions([])
     if not can_be_boot_device(new_disk, with_reformatting=True):
         return False
     if partition.device.ptable == "gpt":
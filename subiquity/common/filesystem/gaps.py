@@ -14,6 +14,7 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import functools
+import logging
 from typing import List, Tuple
 
 import attr
@@ -30,6 +31,12 @@ from subiquity.models.filesystem import (
     align_up,
 )
 
+log = logging.getLogger("subiquity.common.filesystem.gaps")
+
+# When set, every parts_and_gaps result served from the cache is checked
+# against a fresh computation. See the "check-gaps-cache" debug flag.
+check_cache = False
+
 
 # should also set on_setattr=None with attrs 20.1.0
 @attr.s(auto_attribs=True, frozen=True)
@@ -87,8 +94,39 @@ class Gap:
         return None
 
 
-@functools.singledispatch
 def parts_and_gaps(device):
+    """Return the partitions and gaps of device, in order.
+
+    The result is kept on the device and reused until the model changes
+    (see FilesystemModel.generation), as the same questions about the
+    same device tend to be asked many times while handling a request.
+    """
+    m = device._m
+    if m is None:
+        return _parts_and_gaps(device)
+    cached = device.__dict__.get("_parts_and_gaps")
+    if cached is not None and cached[0] == m.generation:
+        result = cached[1]
+        if check_cache:
+            fresh = _parts_and_gaps(device)
+            if fresh != result:
+                log.error(
+                    "stale parts_and_gaps for %s: cached %s, fresh %s",
+                    device,
+                    result,
+                    fresh,
+                )
+                raise Exception("stale parts_and_gaps for %s" % (device,))
+        return list(result)
+    result = _parts_and_gaps(device)
+    if not m._untracked_depth:
+        # Set directly, so that this does not count as a change.
+        device.__dict__["_parts_and_gaps"] = (m.generation, result)
+    return list(result)
+
+
+@functools.singledispatch
+def _parts_and_gaps(device):
     raise NotImplementedError(device)
 
 
@@ -189,8 +227,8 @@ def find_disk_gaps_v2(device, info=None):
     return result
 
 
-@parts_and_gaps.register(Disk)
-@parts_and_gaps.register(Raid)
+@_parts_and_gaps.register(Disk)
+@_parts_and_gaps.register(Raid)
 def parts_and_gaps_disk(device):
     if device._fs is not None:
         return []
@@ -200,7 +238,7 @@ def parts_and_gaps_disk(device):
         return find_disk_gaps_v2(device)
 
 
-@parts_and_gaps.register(LVM_VolGroup)
+@_parts_and_gaps.register(LVM_VolGroup)
 def _parts_and_gaps_vg(device):
     used = 0
     r = []
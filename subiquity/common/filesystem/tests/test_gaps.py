@@ -60,6 +60,54 @@ class TestGaps(unittest.TestCase):
         self.assertEqual(MiB, gap.offset)
 
 
+class TestPartsAndGapsCache(unittest.TestCase):
+    def setUp(self):
+        p = mock.patch.object(gaps, "_parts_and_gaps", wraps=gaps._parts_and_gaps)
+        self.compute = p.start()
+        self.addCleanup(p.stop)
+
+    def test_reused_until_model_changes(self):
+        m, d = make_model_and_disk(size=100 << 30)
+        first = gaps.parts_and_gaps(d)
+        self.assertEqual(first, gaps.parts_and_gaps(d))
+        self.assertEqual(first, gaps.parts_and_gaps(d))
+        self.compute.assert_called_once()
+
+        [gap] = first
+        make_partition(m, d, offset=gap.offset, size=10 << 30)
+        [p, g] = gaps.parts_and_gaps(d)
+        self.assertEqual(2, self.compute.call_count)
+        self.assertEqual(gap.offset + (10 << 30), g.offset)
+
+        p.size = 20 << 30
+        [p, g] = gaps.parts_and_gaps(d)
+        self.assertEqual(gap.offset + (20 << 30), g.offset)
+
+        m.remove_partition(p)
+        self.assertEqual(first, gaps.parts_and_gaps(d))
+
+    def test_result_can_be_modified(self):
+        m, d = make_model_and_disk()
+        gaps.parts_and_gaps(d).clear()
+        self.assertEqual(1, len(gaps.parts_and_gaps(d)))
+
+    def test_ephemeral_copy(self):
+        m, d = make_model_and_disk(size=100 << 30)
+        make_partition(m, d, size=10 << 30)
+        [p, g] = gaps.parts_and_gaps(d)
+        [gap] = gaps.parts_and_gaps(d._reformatted())
+        self.assertEqual([p, g], gaps.parts_and_gaps(d))
+
+    def test_check_cache(self):
+        m, d = make_model_and_disk()
+        # Plant a result that does not match the device.
+        d.__dict__["_parts_and_gaps"] = (m.generation, [])
+        self.assertEqual([], gaps.parts_and_gaps(d))
+        with mock.patch.object(gaps, "check_cache", True):
+            with self.assertRaises(Exception):
+                gaps.parts_and_gaps(d)
+
+
 class TestSplitGap(GapTestCase):
     def test_equal(self):
         [gap] = gaps.parts_and_gaps(make_disk())
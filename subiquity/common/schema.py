@@ -0,0 +1,71 @@
+# Copyright 2024 Canonical, Ltd.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Compiled, cached JSON schema validators.
+
+jsonschema.validate() checks the schema against its meta-schema and
+builds a new validator on every call, which costs a good deal more than
+validating a typical autoinstall section. The registry here does that
+once per distinct schema.
+"""
+
+import json
+from typing import Any, Dict, Optional
+
+import jsonschema
+from jsonschema.exceptions import best_match
+
+
+class SchemaRegistry:
+    def __init__(self, format_checker: Optional[jsonschema.FormatChecker] = None):
+        self.format_checker = format_checker
+        self._validators: Dict[str, Any] = {}
+
+    def _key(self, schema) -> str:
+        # Schemas are plain (unhashable, possibly shared and copied)
+        # dicts so key on their content rather than their identity.
+        return json.dumps(schema, sort_keys=True)
+
+    def get_validator(self, schema):
+        """Return a validator for schema, compiling it if needed.
+
+        Raises jsonschema.SchemaError if schema itself is invalid.
+        """
+        key = self._key(schema)
+        validator = self._validators.get(key)
+        if validator is None:
+            cls = jsonschema.validators.validator_for(schema)
+            cls.check_schema(schema)
+            validator = cls(schema, format_checker=self.format_checker)
+            self._validators[key] = validator
+        return validator
+
+    def validate(self, instance, schema) -> None:
+        """A cached equivalent of jsonschema.validate(instance, schema)."""
+        validator = self.get_validator(schema)
+        error = best_match(validator.iter_errors(instance))
+        if error is not None:
+            raise error
+
+    def clear(self) -> None:
+        self._validators.clear()
+
+    def __len__(self) -> int:
+        return len(self._validators)
+
+
+# jsonschema.validate does not check "format" by default; nor do we, so
+# that a cached validation accepts exactly what an uncached one does.
+schema_registry = SchemaRegistry()
@@ -0,0 +1,218 @@
+# Copyright 2024 Canonical, Ltd.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import io
+import json
+import os
+import time
+import tracemalloc
+import unittest
+from unittest import mock
+
+import bson
+
+from subiquity.common.errorreport import (
+    ErrorReport,
+    ErrorReporter,
+    _chunked,
+    _reversed_blocks,
+    _reversed_lines,
+    bson_encode_stream,
+    log_tail,
+)
+from subiquity.common.types import ErrorReportKind, ErrorReportState
+from subiquitycore.tests import SubiTestCase
+from subiquitycore.tests.parameterized import parameterized
+
+
+def naive_log_tail(text, limit=2048):
+    logtail = []
+    for line in text.splitlines():
+        logtail.append(line.strip())
+        while sum(map(len, logtail)) > limit:
+            logtail.pop(0)
+    return "\n".join(logtail)
+
+
+class TestLogTail(SubiTestCase):
+    @parameterized.expand(
+        [
+            ("",),
+            ("\n",),
+            ("\n\n",),
+            ("one line",),
+            ("one line\n",),
+            ("\nleading newline",),
+            ("a\n\nb\n\n",),
+            ("crlf\r\nline endings\r\n",),
+            ("  padded  \n\tlines\t\n",),
+            ("x" * 3000,),
+            ("short\n" + "x" * 3000,),
+            ("x" * 3000 + "\nshort\n",),
+            ("".join(f"line {i}\n" for i in range(1000)),),
+            ("".join(f"léne {i}\n" for i in range(1000)),),
+        ]
+    )
+    def test_matches_splitlines(self, text):
+        expected = naive_log_tail(text)
+        self.assertEqual(expected, log_tail(text))
+        self.assertEqual(expected, log_tail(text.encode("utf-8")))
+        self.assertEqual(expected, log_tail((io.BytesIO(text.encode("utf-8")),)))
+
+    def test_small_blocks(self):
+        text = "".join(f"léne {i}\n" for i in range(100))
+        data = text.encode("utf-8")
+        for block_size in range(1, 20):
+            blocks = _reversed_blocks((io.BytesIO(data),), block_size)
+            lines = list(_reversed_lines(blocks))
+            self.assertEqual(text.splitlines()[::-1], lines)
+
+    def test_limit(self):
+        text = "".join(f"{i:04}\n" for i in range(100))
+        self.assertEqual("0098\n0099", log_tail(text, limit=9))
+        self.assertEqual("0097\n0098\n0099", log_tail(text, limit=12))
+
+    def test_file_path(self):
+        path = self.tmp_path("curtin-install.log")
+        with open(path, "w") as fp:
+            fp.write("".join(f"line {i}\n" for i in range(1000)))
+        with open(path) as fp:
+            expected = naive_log_tail(fp.read())
+        self.assertEqual(expected, log_tail((path,)))
+
+    def test_large_log_bounded(self):
+        path = self.tmp_path("curtin-install.log")
+        line = b"curtin: Installation started. (%d)\n"
+        block = b"".join(line % i for i in range(20000))
+        with open(path, "wb") as fp:
+            while fp.tell() < 200 * 1024 * 1024:
+                fp.write(block)
+
+        tracemalloc.start()
+        self.addCleanup(tracemalloc.stop)
+        start = time.monotonic()
+        tail = log_tail((path,))
+        elapsed = time.monotonic() - start
+        _, peak = tracemalloc.get_traced_memory()
+
+        self.assertTrue(tail.endswith("curtin: Installation started. (19999)"))
+        self.assertLessEqual(len(tail.replace("\n", "")), 2048)
+        self.assertLess(elapsed, 1.0)
+        self.assertLess(peak, 1024 * 1024)
+
+
+class TestBSONEncodeStream(unittest.TestCase):
+    def test_matches_bson_encode(self):
+        doc = {
+            "Kind": "INSTALL_FAIL",
+            "Title": "install failed crashed with CalledProcessError",
+            "Traceback": "Traceback (most recent call last):\n" * 100,
+            "Binary": b"\x00\x01\x02",
+        }
+        length, pieces = bson_encode_stream(doc)
+        data = b"".join(pieces)
+        self.assertEqual(bson.BSON().encode(doc), data)
+        self.assertEqual(length, len(data))
+
+    def test_chunked(self):
+        pieces = [b"abc", b"", b"defgh", b"i"]
+        self.assertEqual(
+            [b"abcd", b"efgh", b"i"],
+            list(_chunked(pieces, 4)),
+        )
+
+
+class TestReportIndex(SubiTestCase):
+    def setUp(self):
+        self.root = self.tmp_dir()
+        self.crash_dir = os.path.join(self.root, "var/crash")
+        os.makedirs(self.crash_dir)
+
+    def make_reporter(self):
+        return ErrorReporter(mock.Mock(), dry_run=True, root=self.root)
+
+    def write_report(self, base, meta):
+        with open(os.path.join(self.crash_dir, base + ".crash"), "w") as fp:
+            fp.write("ProblemType: Bug\n")
+        with open(os.path.join(self.crash_dir, base + ".meta"), "w") as fp:
+            json.dump(meta, fp)
+
+    def test_load_reports_writes_index(self):
+        self.write_report("1.000000000.ui", {"kind": "UI"})
+        self.write_report("2.000000000.install_fail", {"kind": "INSTALL_FAIL"})
+        reporter = self.make_reporter()
+        reporter.load_reports()
+        self.assertEqual(
+            ["2.000000000.install_fail", "1.000000000.ui"],
+            [r.base for r in reporter.reports],
+        )
+        for report in reporter.reports:
+            self.assertEqual(ErrorReportState.LOADING, report.state)
+        with open(reporter.index_path) as fp:
+            index = json.load(fp)
+        self.assertEqual(
+            {"kind": "INSTALL_FAIL"},
+            index["reports"]["2.000000000.install_fail"]["meta"],
+        )
+
+    def test_index_used_when_valid(self):
+        self.write_report("1.000000000.ui", {"kind": "UI"})
+        self.make_reporter().load_reports()
+        reporter = self.make_reporter()
+        with mock.patch.object(
+            ErrorReport, "from_file", wraps=ErrorReport.from_file
+        ) as from_file:
+            reporter.load_reports()
+        entry = from_file.call_args.args[2]
+        self.assertEqual({"kind": "UI"}, entry["meta"])
+        [report] = reporter.reports
+        self.assertEqual(ErrorReportKind.UI, report.kind)
+        self.assertFalse(report.seen)
+
+    def test_stale_index_entry_ignored(self):
+        self.write_report("1.000000000.ui", {"kind": "UI"})
+        self.make_reporter().load_reports()
+        self.write_report("1.000000000.ui", {"kind": "UI", "seen": True})
+        meta_path = os.path.join(self.crash_dir, "1.000000000.ui.meta")
+        st = os.stat(meta_path)
+        os.utime(meta_path, ns=(st.st_atime_ns, st.st_mtime_ns + 1))
+        reporter = self.make_reporter()
+        reporter.load_reports()
+        [report] = reporter.reports
+        self.assertTrue(report.seen)
+
+    def test_set_meta_updates_index(self):
+        self.write_report("1.000000000.ui", {"kind": "UI"})
+        reporter = self.make_reporter()
+        reporter.load_reports()
+        with mock.patch("urwid.emit_signal"):
+            reporter.reports[0].mark_seen()
+        with open(reporter.index_path) as fp:
+            index = json.load(fp)
+        self.assertEqual(
+            {"kind": "UI", "seen": True},
+            index["reports"]["1.000000000.ui"]["meta"],
+        )
+
+    def test_removed_reports_dropped_from_index(self):
+        self.write_report("1.000000000.ui", {"kind": "UI"})
+        self.write_report("2.000000000.ui", {"kind": "UI"})
+        self.make_reporter().load_reports()
+        os.unlink(os.path.join(self.crash_dir, "1.000000000.ui.crash"))
+        reporter = self.make_reporter()
+        reporter.load_reports()
+        with open(reporter.index_path) as fp:
+            index = json.load(fp)
+        self.assertEqual(["2.000000000.ui"], list(index["reports"]))
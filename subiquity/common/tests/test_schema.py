@@ -0,0 +1,80 @@
+# Copyright 2024 Canonical, Ltd.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import glob
+import json
+import os
+import unittest
+from unittest import mock
+
+import jsonschema
+import yaml
+
+from subiquity.common.schema import SchemaRegistry
+from subiquitycore.tests.parameterized import parameterized
+
+PROJ_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+EXAMPLES = sorted(glob.glob(os.path.join(PROJ_DIR, "examples/autoinstall/*.yaml")))
+
+
+def load_schema():
+    with open(os.path.join(PROJ_DIR, "autoinstall-schema.json")) as fp:
+        return json.load(fp)
+
+
+class TestSchemaRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = SchemaRegistry()
+
+    @parameterized.expand([(os.path.basename(path),) for path in EXAMPLES])
+    def test_matches_jsonschema(self, name):
+        schema = load_schema()
+        with open(os.path.join(PROJ_DIR, "examples/autoinstall", name)) as fp:
+            data = yaml.safe_load(fp)
+        try:
+            jsonschema.validate(data, schema)
+        except jsonschema.ValidationError as exc:
+            expected = exc
+        else:
+            expected = None
+        if expected is None:
+            self.registry.validate(data, schema)
+        else:
+            with self.assertRaises(jsonschema.ValidationError) as cm:
+                self.registry.validate(data, schema)
+            self.assertEqual(expected.message, cm.exception.message)
+            self.assertEqual(expected.path, cm.exception.path)
+
+    def test_compiled_once(self):
+        schema = {"type": "array", "items": {"type": "string"}}
+        cls = jsonschema.validators.validator_for(schema)
+        with mock.patch.object(cls, "check_schema", wraps=cls.check_schema) as check:
+            self.registry.validate(["a"], schema)
+            self.registry.validate(["b"], dict(schema))
+            with self.assertRaises(jsonschema.ValidationError):
+                self.registry.validate([1], schema)
+        check.assert_called_once()
+        self.assertEqual(1, len(self.registry))
+
+    def test_distinct_schemas(self):
+        self.registry.validate(1, {"type": "integer"})
+        with self.assertRaises(jsonschema.ValidationError):
+            self.registry.validate(1, {"type": "string"})
+        self.assertEqual(2, len(self.registry))
+
+    def test_invalid_schema(self):
+        with self.assertRaises(jsonschema.SchemaError):
+            self.registry.validate(1, {"type": 12})
+        self.assertEqual(0, len(self.registry))
@@ -92,6 +92,32 @@ class ApplicationStatus:
     echo_syslog_id: str
     log_syslog_id: str
     event_syslog_id: str
+    # Counts the state transitions of the server, see meta.status.GET.
+    version: int = 0
+
+
+@attr.s(auto_attribs=True)
+class LatencyHistogram:
+    phase: str
+    # counts[i] is the number of requests that took at most bounds_us[i]
+    # (and more than bounds_us[i - 1]) microseconds. There is one more
+    # count than bounds for the requests that took longer than that.
+    bounds_us: List[int]
+    counts: List[int]
+    count: int
+    sum_us: int
+    max_us: int
+
+
+@attr.s(auto_attribs=True)
+class EndpointMetrics:
+    method: str
+    path: str
+    requests: int
+    errors: int
+    request_bytes: int
+    response_bytes: int
+    phases: List[LatencyHistogram]
 
 
 class PasswordKind(enum.Enum):
@@ -245,6 +271,15 @@ class PackageInstallState(enum.Enum):
 class NetworkStatus:
     devices: List[NetDevInfo]
     wlan_support_install_state: PackageInstallState
+    version: int = 0
+
+
+@attr.s(auto_attribs=True)
+class NetworkDelta:
+    version: int
+    devices: List[NetDevInfo]
+    removed: List[str]
+    wlan_support_install_state: PackageInstallState
 
 
 class ProbeStatus(enum.Enum):
@@ -14,6 +14,7 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import collections
+import contextlib
 import copy
 import enum
 import fnmatch
@@ -210,6 +211,13 @@ def _do_post_inits(obj):
         fn(obj)
 
 
+def fsobj__setattr(obj, name, value):
+    m = value if name == "_m" else obj.__dict__.get("_m")
+    if m is not None:
+        m._changed()
+    object.__setattr__(obj, name, value)
+
+
 def fsobj(typ):
     def wrapper(c):
         c.__attrs_post_init__ = _do_post_inits
@@ -225,6 +233,7 @@ def fsobj(typ):
         c.__annotations__["type"] = str
         c = attr.s(eq=False, repr=False, auto_attribs=True, kw_only=True)(c)
         c.__repr__ = fsobj__repr
+        c.__setattr__ = fsobj__setattr
         _type_to_cls[typ] = c
         return c
 
@@ -616,8 +625,18 @@ class _Device(_Formattable, ABC):
     def _reformatted(self):
         # Return a ephemeral copy of the device with as many partitions
         # deleted as possible.
-        new_disk = attr.evolve(self)
-        new_disk._partitions = [p for p in self.partitions() if p._is_in_use]
+        return self._with_partitions([p for p in self.partitions() if p._is_in_use])
+
+    def _with_partitions(self, partitions):
+        # Return a ephemeral copy of the device with the given partitions.
+        # Making the copy does not count as a change to the model.
+        if self._m is None:
+            untracked = contextlib.nullcontext()
+        else:
+            untracked = self._m._untracked()
+        with untracked:
+            new_disk = attr.evolve(self)
+            new_disk._partitions = partitions
         return new_disk
 
     def dasd(self):
@@ -1407,21 +1426,56 @@ class FilesystemModel:
             return Bootloader.BIOS
 
     def __init__(self, bootloader=None, *, root: str):
+        # Bumped on every change to the model or the objects in it, so
+        # that results derived from the model can be cached until it
+        # changes.
+        self.generation = 0
+        self._untracked_depth = 0
+        # Set on the snapshot returned by get_orig_model, which must not
+        # be changed.
+        self._read_only = False
         if bootloader is None:
             bootloader = self._probe_bootloader()
         self.bootloader = bootloader
         self.root = root
         self.storage_version = 1
         self._probe_data = None
+        # (probe data, model) of the last get_orig_model call.
+        self._orig_model: Optional[Tuple[Dict, "FilesystemModel"]] = None
         self.dd_target: Optional[Disk] = None
         self.reset_partition: Optional[Partition] = None
         self.reset()
 
+    def __setattr__(self, name, value):
+        if name not in ("generation", "_untracked_depth", "_read_only"):
+            self._changed()
+        super().__setattr__(name, value)
+
+    def _changed(self):
+        if self._untracked_depth:
+            return
+        if self._read_only:
+            raise Exception("the original storage model cannot be changed")
+        self.generation += 1
+
+    @contextlib.contextmanager
+    def _untracked(self):
+        # Changes made in this block, e.g. to ephemeral copies of objects,
+        # do not bump the generation.
+        self._untracked_depth += 1
+        try:
+            yield
+        finally:
+            self._untracked_depth -= 1
+
     def reset(self):
-        self._all_ids = set()
         if self._probe_data is not None:
-            self.process_probe_data()
+            orig_model = self.get_orig_model()
+            self._all_ids = set(orig_model._all_ids)
+            self._orig_config = orig_model._orig_config
+            self._actions = self._copy_actions(orig_model)
         else:
+            self._all_ids = set()
             self._orig_config = []
             self._actions = []
         self.swap = None
@@ -1433,12 +1487,41 @@ class FilesystemModel:
         # the original state.  _orig_config plays a similar role, but is
         # expressed in terms of curtin actions, which are not what we want to
         # use on the V2 storage API.
+        #
+        # Processing the probe data is expensive, so the original model is
+        # built once per probe data and shared. It is read-only: reset()
+        # copies its objects rather than modifying them.
+        if self._orig_model is not None:
+            probe_data, orig_model = self._orig_model
+            if (
+                probe_data is self._probe_data
+                and orig_model.bootloader == self.bootloader
+                and orig_model.target == self.target
+            ):
+                return orig_model
         orig_model = FilesystemModel(self.bootloader, root=self.root)
         orig_model.target = self.target
         if self._probe_data is not None:
-            orig_model.load_probe_data(self._probe_data)
+            orig_model._probe_data = self._probe_data
+            orig_model.process_probe_data()
+        orig_model._read_only = True
+        self._orig_model = (self._probe_data, orig_model)
         return orig_model
 
+    def _copy_actions(self, other):
+        """Return copies of the objects of other, belonging to this model."""
+        # StorageInfo is never modified so can be shared.
+        memo = {id(other): self}
+        for obj in other._actions:
+            info = getattr(obj, "_info", None)
+            if info is not None:
+                memo[id(info)] = info
+        actions = copy.deepcopy(other._actions, memo)
+        for obj in actions:
+            # Cached results are only valid for the generations of other.
+            obj.__dict__.pop("_parts_and_gaps", None)
+        return actions
+
     def process_probe_data(self):
         self._orig_config = storage_config.extract_storage_config(self._probe_data)[
             "storage"
@@ -1919,6 +2002,7 @@ class FilesystemModel:
             log.debug("computing size on unformatted dasd from %s as %s", data, size)
             devdata["attrs"]["size"] = str(size)
         self._probe_data = probe_data
+        self._orig_model = None
         self.reset()
 
     def _matcher(self, kw):
@@ -1982,6 +2066,7 @@ class FilesystemModel:
         return self._one(type="partition", uuid=partuuid)
 
     def _remove(self, obj):
+        self._changed()
         _remove_backlinks(obj)
         self._actions.remove(obj)
 
@@ -2225,6 +2310,7 @@ class FilesystemModel:
                 dm_crypt.recovery_key.generate()
 
     def expose_recovery_keys(self) -> None:
+        # Blocks, run it in a thread if called from the event loop.
         for dm_crypt in self.all_dm_crypts():
             if dm_crypt.recovery_key is None:
                 continue
@@ -2236,6 +2322,7 @@ class FilesystemModel:
             handler.expose_key_to_live_system(root=self.root)
 
     def copy_artifacts_to_target(self) -> None:
+        # Blocks, run it in a thread if called from the event loop.
         for dm_crypt in self.all_dm_crypts():
             if dm_crypt.recovery_key is None:
                 continue
@@ -13,6 +13,7 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import json
 import logging
 import os
 import typing
@@ -21,9 +22,14 @@ import attr
 import yaml
 
 from subiquity.common.serialize import Serializer
+from subiquitycore.file_util import write_file
 
 log = logging.getLogger("subiquity.models.source")
 
+# The libyaml based loader is an order of magnitude faster than the pure
+# Python one but is not always available.
+SafeLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
 
 @attr.s(auto_attribs=True)
 class CatalogEntryVariation:
@@ -80,13 +86,57 @@ class SourceModel:
         self.lang = None
         self.search_drivers = False
 
-    def load_from_file(self, fp):
+    def _catalog_cache_key(self, fp):
+        st = os.fstat(fp.fileno())
+        return [os.path.abspath(fp.name), st.st_size, st.st_mtime_ns]
+
+    def _load_cached_catalog(self, cache_path, key):
+        try:
+            with open(cache_path) as cache_fp:
+                cached = json.load(cache_fp)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(cached, dict) or cached.get("key") != key:
+            return None
+        try:
+            return Serializer().deserialize(
+                typing.List[CatalogEntry], cached["sources"]
+            )
+        except Exception:
+            log.exception("ignoring unusable source catalog cache %r", cache_path)
+            return None
+
+    def _cache_catalog(self, cache_path, key, sources):
+        data = {
+            "key": key,
+            "sources": Serializer().serialize(typing.List[CatalogEntry], sources),
+        }
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            write_file(cache_path, json.dumps(data))
+        except OSError:
+            log.exception("caching source catalog to %r failed", cache_path)
+
+    def load_from_file(self, fp, cache_path: typing.Optional[str] = None):
+        """Load the source catalog from fp.
+
+        If cache_path is set, the validated catalog is stored there and
+        reused for as long as the catalog file is unchanged.
+        """
         self._dir = os.path.dirname(fp.name)
         self.sources = []
         self.current = None
-        self.sources = Serializer(ignore_unknown_fields=True).deserialize(
-            typing.List[CatalogEntry], yaml.safe_load(fp)
-        )
+        sources = None
+        if cache_path is not None:
+            key = self._catalog_cache_key(fp)
+            sources = self._load_cached_catalog(cache_path, key)
+        if sources is None:
+            sources = Serializer(ignore_unknown_fields=True).deserialize(
+                typing.List[CatalogEntry], yaml.load(fp, Loader=SafeLoader)
+            )
+            if cache_path is not None:
+                self._cache_catalog(cache_path, key, sources)
+        self.sources = sources
         for entry in self.sources:
             if entry.default:
                 self.current = entry
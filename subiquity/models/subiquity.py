@@ -89,6 +89,13 @@ def merge_cloud_init_config(target, source):
             target[k] = v
 
 
+@functools.lru_cache(maxsize=None)
+def _cloudconfig_schema():
+    # get_schema() loads and parses cloud-init's (large) schema files on
+    # every call; the schema does not change while we run.
+    return get_schema()
+
+
 def _represent_dict_order(self, data):
     """http://stackoverflow.com/a/8661021"""
     return self.represent_mapping("tag:yaml.org,2002:map", data.items())
@@ -323,7 +330,7 @@ class SubiquityModel:
         # raising errors on deprecated keys.
         # In the meantime, iterate over schema_deprecations to log warnings.
         try:
-            validate_cloudconfig_schema(data, schema=get_schema(), strict=True)
+            validate_cloudconfig_schema(data, schema=_cloudconfig_schema(), strict=True)
         except SchemaValidationError as e:
             if hasattr(e, "schema_deprecations"):
                 warnings = []
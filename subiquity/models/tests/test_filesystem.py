@@ -338,6 +338,136 @@ class TestFilesystemModel(unittest.TestCase):
         self.assertIsNone(orig_model._probe_data)
 
 
+class TestGeneration(unittest.TestCase):
+    def test_adding_objects_bumps(self):
+        model, disk = make_model_and_disk()
+        generation = model.generation
+        part = make_partition(model, disk)
+        self.assertGreater(model.generation, generation)
+        generation = model.generation
+        make_filesystem(model, part)
+        self.assertGreater(model.generation, generation)
+
+    def test_changing_attribute_bumps(self):
+        model, part = make_model_and_partition()
+        generation = model.generation
+        part.wipe = "superblock"
+        self.assertGreater(model.generation, generation)
+
+    def test_removing_bumps(self):
+        model, part = make_model_and_partition()
+        generation = model.generation
+        model.remove_partition(part)
+        self.assertGreater(model.generation, generation)
+
+    def test_reset_bumps(self):
+        model, part = make_model_and_partition()
+        model._probe_data = None
+        generation = model.generation
+        model.reset()
+        self.assertGreater(model.generation, generation)
+
+    def test_reformatted_does_not_bump(self):
+        model, part = make_model_and_partition()
+        generation = model.generation
+        new_disk = part.device._reformatted()
+        self.assertEqual([], new_disk.partitions())
+        self.assertEqual([part], part.device.partitions())
+        self.assertEqual(generation, model.generation)
+
+
+class TestOrigModel(unittest.TestCase):
+    def setUp(self):
+        config = [
+            {
+                "type": "disk",
+                "id": "disk-sda",
+                "path": "/dev/sda",
+                "ptable": "gpt",
+            },
+            {
+                "type": "partition",
+                "id": "partition-sda1",
+                "device": "disk-sda",
+                "path": "/dev/sda1",
+                "number": 1,
+                "offset": 1 << 20,
+                "size": 10 << 30,
+            },
+        ]
+        p = mock.patch(
+            "subiquity.models.filesystem.storage_config.extract_storage_config",
+            return_value={"storage": {"config": config}},
+        )
+        self.extract = p.start()
+        self.addCleanup(p.stop)
+        self.probe_data = {
+            "blockdev": {
+                "/dev/sda": {
+                    "DEVTYPE": "disk",
+                    "attrs": {"size": str(100 << 30)},
+                },
+                "/dev/sda1": {
+                    "DEVTYPE": "partition",
+                    "attrs": {"size": str(10 << 30)},
+                },
+            },
+        }
+
+    def make_probed_model(self):
+        model = FilesystemModel(Bootloader.UEFI, root="/tmp")
+        model.load_probe_data(self.probe_data)
+        return model
+
+    def test_built_once_per_probe_data(self):
+        model = self.make_probed_model()
+        orig_model = model.get_orig_model()
+        self.assertIs(orig_model, model.get_orig_model())
+        model.reset()
+        model.reset()
+        self.assertIs(orig_model, model.get_orig_model())
+        self.extract.assert_called_once()
+
+        model.load_probe_data(self.probe_data)
+        self.assertIsNot(orig_model, model.get_orig_model())
+        self.assertEqual(2, self.extract.call_count)
+
+    def test_reset_copies(self):
+        model = self.make_probed_model()
+        orig_model = model.get_orig_model()
+        [disk] = model.all_disks()
+        [orig_disk] = orig_model.all_disks()
+        self.assertIsNot(disk, orig_disk)
+        self.assertIs(model, disk._m)
+        self.assertEqual(orig_disk.id, disk.id)
+        [part] = disk.partitions()
+        self.assertIs(disk, part.device)
+        self.assertTrue(part.preserve)
+
+        model.remove_partition(part)
+        self.assertEqual([], disk.partitions())
+        self.assertEqual(1, len(orig_disk.partitions()))
+
+        model.reset()
+        [disk] = model.all_disks()
+        self.assertEqual(1, len(disk.partitions()))
+
+    def test_read_only(self):
+        model = self.make_probed_model()
+        orig_model = model.get_orig_model()
+        [orig_disk] = orig_model.all_disks()
+        [orig_part] = orig_disk.partitions()
+        with self.assertRaises(Exception):
+            orig_part.size = 1 << 30
+        self.assertEqual(10 << 30, orig_part.size)
+        with self.assertRaises(Exception):
+            orig_model.remove_partition(orig_part)
+        self.assertEqual([orig_part], orig_disk.partitions())
+        # Questions about the original state can still be answered.
+        gap = gaps.largest_gap(orig_disk._reformatted())
+        self.assertGreater(gap.size, 90 << 30)
+
+
 def fake_up_blockdata_disk(disk, **kw):
     model = disk._m
     if model._probe_data is None:
@@ -18,6 +18,7 @@ import random
 import shutil
 import tempfile
 import unittest
+from unittest import mock
 
 import yaml
 
@@ -50,14 +51,14 @@ class TestSourceModel(unittest.TestCase):
         self.addCleanup(shutil.rmtree, tdir)
         return tdir
 
-    def write_and_load_entries(self, model, entries, dir=None):
+    def write_and_load_entries(self, model, entries, dir=None, cache_path=None):
         if dir is None:
             dir = self.tdir()
         cat_path = os.path.join(dir, "catalog.yaml")
         with open(cat_path, "w") as fp:
             yaml.dump(entries, fp)
         with open(cat_path) as fp:
-            model.load_from_file(fp)
+            model.load_from_file(fp, cache_path=cache_path)
 
     def test_initially_server(self):
         model = SourceModel()
@@ -138,3 +139,43 @@ class TestSourceModel(unittest.TestCase):
                 root_actual, ext_actual = os.path.splitext(var.path)
                 self.assertEqual(ext_expected, ext_actual)
                 self.assertTrue(root_actual.startswith(root))
+
+    def test_load_from_cache(self):
+        dir = self.tdir()
+        cache_path = os.path.join(dir, "cache", "catalog.json")
+        entries = [
+            make_entry(id="id1"),
+            make_entry(id="id2", default=True, foobarbaz=random_string()),
+        ]
+        model = SourceModel()
+        self.write_and_load_entries(model, entries, dir, cache_path)
+        self.assertTrue(os.path.exists(cache_path))
+
+        cat_path = os.path.join(dir, "catalog.yaml")
+        cached_model = SourceModel()
+        with mock.patch("subiquity.models.source.yaml.load") as m_load:
+            with open(cat_path) as fp:
+                cached_model.load_from_file(fp, cache_path=cache_path)
+        m_load.assert_not_called()
+        self.assertEqual(model.sources, cached_model.sources)
+        self.assertEqual("id2", cached_model.current.id)
+
+    def test_cache_invalidated_by_change(self):
+        dir = self.tdir()
+        cache_path = os.path.join(dir, "catalog.json")
+        model = SourceModel()
+        self.write_and_load_entries(model, [make_entry(id="id1")], dir, cache_path)
+        model = SourceModel()
+        self.write_and_load_entries(
+            model, [make_entry(id="id1"), make_entry(id="id2")], dir, cache_path
+        )
+        self.assertEqual(["id1", "id2"], [s.id for s in model.sources])
+
+    def test_corrupt_cache_ignored(self):
+        dir = self.tdir()
+        cache_path = os.path.join(dir, "catalog.json")
+        with open(cache_path, "w") as fp:
+            fp.write("{not json")
+        model = SourceModel()
+        self.write_and_load_entries(model, [make_entry(id="id1")], dir, cache_path)
+        self.assertEqual("id1", model.current.id)
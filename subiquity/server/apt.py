@@ -39,7 +39,7 @@ from subiquity.server.mounter import (
     OverlayCleanupError,
     OverlayMountpoint,
 )
-from subiquitycore.file_util import generate_config_yaml, write_file
+from subiquitycore.file_util import write_file
 from subiquitycore.lsb_release import lsb_release
 from subiquitycore.utils import astart_command, orig_environ
 
@@ -150,7 +150,9 @@ class AptConfigurer:
         config_location = os.path.join(
             self.app.root, "var/log/installer/curtin-install/subiquity-curtin-apt.conf"
         )
-        generate_config_yaml(config_location, self.apt_config(final))
+        self.app.file_writer.generate_config_yaml(
+            config_location, self.apt_config(final)
+        )
         self.app.note_data_for_apport("CurtinAptConfig", config_location)
 
         await run_curtin_command(
@@ -13,14 +13,11 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-import json
 import logging
-import os
 from typing import Any, Optional
 
-import jsonschema
-
 from subiquity.common.api.server import bind
+from subiquity.common.schema import schema_registry
 from subiquity.server.types import InstallerChannels
 from subiquitycore.context import with_context
 from subiquitycore.controller import BaseController
@@ -54,6 +51,15 @@ class SubiquityController(BaseController):
             await self.configured()
             self._active = False
 
+    def warm_up(self):
+        """Start work that can overlap the wait for cloud-init.
+
+        This is called before autoinstall data is loaded and before
+        early-commands run, so it must only prepare things that depend
+        on neither. start() must work whether this was called or not.
+        """
+        pass
+
     def setup_autoinstall(self):
         if not self.app.autoinstall_config:
             return
@@ -72,7 +78,7 @@ class SubiquityController(BaseController):
                 ai_data = self.autoinstall_default
 
             if ai_data is not None and self.autoinstall_schema is not None:
-                jsonschema.validate(ai_data, self.autoinstall_schema)
+                schema_registry.validate(ai_data, self.autoinstall_schema)
             self.load_autoinstall_data(ai_data)
 
     def load_autoinstall_data(self, data):
@@ -113,23 +119,38 @@ class SubiquityController(BaseController):
 
     async def configured(self):
         """Let the world know that this controller's model is now configured."""
-        with open(self.app.state_path("states", self.name), "w") as fp:
-            json.dump(self.serialize(), fp)
+        self.app.state_store.set(self.name, self.serialize())
         if self.model_name is not None:
             await self.app.hub.abroadcast(
                 (InstallerChannels.CONFIGURED, self.model_name)
             )
 
     def load_state(self):
-        state_path = self.app.state_path("states", self.name)
-        if not os.path.exists(state_path):
+        if self.name not in self.app.state_store:
             return
-        with open(state_path) as fp:
-            self.deserialize(json.load(fp))
+        self.deserialize(self.app.state_store.get(self.name))
 
     def deserialize(self, state):
         pass
 
+    def warm_restart_snapshot(self):
+        """Return expensive state to hand over to the server that replaces
+        this one when it restarts, or None.
+
+        Unlike serialize(), this is about derived state (probe results,
+        lists fetched from the network) rather than user choices. The
+        result must be JSON serializable.
+        """
+        return None
+
+    def restore_warm_restart_snapshot(self, data):
+        """Take back the result of warm_restart_snapshot() from before a
+        restart. This is called before warm_up() and start(); anything
+        that may have changed in the meantime should be checked before
+        it is used.
+        """
+        pass
+
     def make_autoinstall(self):
         return {}
 
@@ -15,16 +15,14 @@
 
 import asyncio
 import logging
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
 from subiquity.common.apidef import API
 from subiquity.common.types import DriversPayload, DriversResponse
-from subiquity.server.apt import OverlayCleanupError
 from subiquity.server.controller import SubiquityController
 from subiquity.server.controllers.source import SEARCH_DRIVERS_AUTOINSTALL_DEFAULT
 from subiquity.server.types import InstallerChannels
 from subiquity.server.ubuntu_drivers import (
-    CommandNotFoundError,
     UbuntuDriversInterface,
     get_ubuntu_drivers_interface,
 )
@@ -57,6 +55,8 @@ class DriversController(SubiquityController):
         # None means that the list has not (yet) been retrieved whereas an
         # empty list means that no drivers are available.
         self.drivers: Optional[List[str]] = None
+        # (source id, drivers) found by the server this one replaced.
+        self._restored_drivers: Optional[Tuple[str, List[str]]] = None
 
     def make_autoinstall(self):
         return {
@@ -67,6 +67,21 @@ class DriversController(SubiquityController):
         if data is not None and "install" in data:
             self.model.do_install = data["install"]
 
+    def warm_restart_snapshot(self):
+        # When searching for drivers is disabled, the list is empty
+        # without having looked.
+        if not self.list_drivers_done_event.is_set():
+            return None
+        if not self.app.controllers.Source.model.search_drivers:
+            return None
+        return {
+            "source": self.app.base_model.source.current.id,
+            "drivers": self.drivers,
+        }
+
+    def restore_warm_restart_snapshot(self, data):
+        self._restored_drivers = (data["source"], data["drivers"])
+
     def start(self):
         self._wait_apt = asyncio.Event()
         self.app.hub.subscribe(InstallerChannels.APT_CONFIGURED, self._wait_apt.set)
@@ -101,20 +116,15 @@ class DriversController(SubiquityController):
             self.drivers = []
             self.list_drivers_done_event.set()
             return
-        apt = self.app.controllers.Mirror.final_apt_configurer
-        try:
-            async with apt.overlay() as d:
-                try:
-                    # Make sure ubuntu-drivers is available.
-                    await self.ubuntu_drivers.ensure_cmd_exists(d.mountpoint)
-                except CommandNotFoundError:
-                    self.drivers = []
-                else:
-                    self.drivers = await self.ubuntu_drivers.list_drivers(
-                        root_dir=d.mountpoint, context=context
-                    )
-        except OverlayCleanupError:
-            log.exception("Failed to cleanup overlay. Continuing anyway.")
+        source_id = self.app.base_model.source.current.id
+        if self._restored_drivers is not None:
+            restored_source_id, drivers = self._restored_drivers
+            self._restored_drivers = None
+            if restored_source_id == source_id:
+                context.description = "from snapshot"
+                self.drivers = drivers
+        if self.drivers is None:
+            self.drivers = await self.app.hwe_scanner.list_drivers()
         self.list_drivers_done_event.set()
         log.debug("Available drivers to install: %s", self.drivers)
 
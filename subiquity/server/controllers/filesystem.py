@@ -22,7 +22,7 @@ import os
 import pathlib
 import subprocess
 import time
-from typing import Any, Callable, Dict, List, Optional, Union
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Union
 
 import attr
 import pyudev
@@ -37,6 +37,7 @@ from subiquity.common.filesystem.actions import DeviceAction
 from subiquity.common.filesystem.manipulator import FilesystemManipulator
 from subiquity.common.types import (
     AddPartitionV2,
+    ApplicationState,
     Bootloader,
     Disk,
     GuidedCapability,
@@ -72,6 +73,7 @@ from subiquity.models.filesystem import (
     align_up,
     humanize_size,
 )
+from subiquity.models.source import CatalogEntry
 from subiquity.server import snapdapi
 from subiquity.server.controller import SubiquityController
 from subiquity.server.controllers.source import SEARCH_DRIVERS_AUTOINSTALL_DEFAULT
@@ -85,6 +87,7 @@ from subiquity.server.types import InstallerChannels
 from subiquitycore.async_helpers import (
     SingleInstanceTask,
     TaskAlreadyRunningError,
+    run_in_thread,
     schedule_task,
 )
 from subiquitycore.context import with_context
@@ -251,6 +254,8 @@ class FilesystemController(SubiquityController, FilesystemManipulator):
             name = self.opts.bootloader.upper()
             self.model.bootloader = getattr(Bootloader, name)
         self.model.storage_version = self.opts.storage_version
+        if "check-gaps-cache" in app.debug_flags:
+            gaps.check_cache = True
         self._monitor = None
         self._errors = {}
         self._probe_once_task = SingleInstanceTask(
@@ -280,6 +285,17 @@ class FilesystemController(SubiquityController, FilesystemManipulator):
         # this variable. It will be picked up on next reset.
         self.queued_probe_data: Optional[Dict[str, Any]] = None
         self.reset_partition_only: bool = False
+        # The suggested install minimum only depends on the selected
+        # source, so it is worked out once per selection.
+        self._install_min: Optional[Tuple[CatalogEntry, Any, int]] = None
+        # (model generation, install_min, targets) of the last guided
+        # scenarios worked out, see _guided_targets_for_model.
+        self._guided_targets: Optional[
+            Tuple[int, int, List[GuidedStorageTarget]]
+        ] = None
+        # (probe_types, storage) of the last unrestricted probe, kept for
+        # the warm restart snapshot.
+        self._last_probe: Optional[Tuple[Set[str], Dict[str, Any]]] = None
 
     def is_core_boot_classic(self):
         return self._info.is_core_boot_classic()
@@ -405,6 +421,7 @@ class FilesystemController(SubiquityController, FilesystemManipulator):
 
     async def _examine_systems(self):
         self._variation_info.clear()
+        self._guided_targets = None
         catalog_entry = self.app.base_model.source.current
         for name, variation in catalog_entry.variations.items():
             system = None
@@ -459,6 +476,9 @@ class FilesystemController(SubiquityController, FilesystemManipulator):
                 self._variation_info[name] = VariationInfo.classic(
                     name=name, min_size=variation.size
                 )
+        # Scenarios may have been worked out while the systems were being
+        # examined.
+        self._guided_targets = None
 
     @with_context()
     async def apply_autoinstall_config(self, context=None):
@@ -555,7 +575,6 @@ class FilesystemController(SubiquityController, FilesystemManipulator):
             ),
         )
         self.model.load_or_generate_recovery_keys()
-        self.model.expose_recovery_keys()
 
     def guided_zfs(self, gap, choice: GuidedChoiceV2):
         device = gap.device
@@ -729,6 +748,7 @@ class FilesystemController(SubiquityController, FilesystemManipulator):
 
         if choice.capability.is_lvm():
             self.guided_lvm(gap, choice)
+            await run_in_thread(self.model.expose_recovery_keys)
         elif choice.capability.is_zfs():
             self.guided_zfs(gap, choice)
         elif choice.capability == GuidedCapability.DIRECT:
@@ -788,7 +808,7 @@ class FilesystemController(SubiquityController, FilesystemManipulator):
             config, blockdevs=self.model._probe_data["blockdev"], is_probe_data=False
         )
         self.model.load_or_generate_recovery_keys()
-        self.model.expose_recovery_keys()
+        await run_in_thread(self.model.expose_recovery_keys)
         await self.configured()
 
     def potential_boot_disks(self, check_boot=True, with_reformatting=False):
@@ -986,6 +1006,10 @@ class FilesystemController(SubiquityController, FilesystemManipulator):
 
     def calculate_suggested_install_min(self):
         catalog_entry = self.app.base_model.source.current
+        if self._install_min is not None:
+            entry, variations, install_min = self._install_min
+            if entry is catalog_entry and variations is catalog_entry.variations:
+                return install_min
         source_min = max(
             variation.size for variation in catalog_entry.variations.values()
         )
@@ -994,6 +1018,7 @@ class FilesystemController(SubiquityController, FilesystemManipulator):
         )
         install_min = sizes.calculate_suggested_install_min(source_min, align)
         log.debug(f"suggested install minimum size: {humanize_size(install_min)}")
+        self._install_min = (catalog_entry, catalog_entry.variations, install_min)
         return install_min
 
     async def get_v2_storage_response(self, model, wait, include_raid):
@@ -1066,8 +1091,31 @@ class FilesystemController(SubiquityController, FilesystemManipulator):
         if probe_resp is not None:
             return probe_resp
 
-        scenarios = []
+        return GuidedStorageResponseV2(
+            status=ProbeStatus.DONE,
+            configured=self.model.guided_configuration,
+            targets=list(self._guided_targets_for_model()),
+        )
+
+    def _guided_targets_for_model(self) -> List[GuidedStorageTarget]:
+        # Working out the scenarios means a lot of gap and boot device
+        # computations, so the result is kept until the model, the
+        # source or the examined systems change.
         install_min = self.calculate_suggested_install_min()
+        if self._guided_targets is not None:
+            generation, cached_install_min, targets = self._guided_targets
+            if (
+                generation == self.model.generation
+                and cached_install_min == install_min
+            ):
+                return targets
+        generation = self.model.generation
+        targets = self._compute_guided_targets(install_min)
+        self._guided_targets = (generation, install_min, targets)
+        return targets
+
+    def _compute_guided_targets(self, install_min: int) -> List[GuidedStorageTarget]:
+        scenarios = []
 
         classic_capabilities = self.get_classic_capabilities()
 
@@ -1076,8 +1124,8 @@ class FilesystemController(SubiquityController, FilesystemManipulator):
 
         for disk in self.potential_boot_disks(with_reformatting=True):
             capability_info = CapabilityInfo()
+            gap = gaps.largest_gap(disk._reformatted())
             for variation in self._variation_info.values():
-                gap = gaps.largest_gap(disk._reformatted())
                 capability_info.combine(
                     variation.capability_info_for_gap(gap, install_min)
                 )
@@ -1142,11 +1190,7 @@ class FilesystemController(SubiquityController, FilesystemManipulator):
                 scenarios.append((vals.install_max, resize))
 
         scenarios.sort(reverse=True, key=lambda x: x[0])
-        return GuidedStorageResponseV2(
-            status=ProbeStatus.DONE,
-            configured=self.model.guided_configuration,
-            targets=[s[1] for s in scenarios],
-        )
+        return [s[1] for s in scenarios]
 
     async def v2_guided_POST(self, data: GuidedChoiceV2) -> GuidedStorageResponseV2:
         log.debug(data)
@@ -1235,19 +1279,26 @@ class FilesystemController(SubiquityController, FilesystemManipulator):
 
         await self._probe_task.task
 
+    def _probe_types(self, restricted):
+        if restricted:
+            return {"blockdev", "filesystem"}
+        probe_types = {"defaults", "filesystem_sizing"}
+        if self.app.opts.use_os_prober:
+            probe_types |= {"os"}
+        return probe_types
+
     @with_context(name="probe_once", description="restricted={restricted}")
     async def _probe_once(self, *, context, restricted):
+        probe_types = self._probe_types(restricted)
         if restricted:
-            probe_types = {"blockdev", "filesystem"}
             fname = "probe-data-restricted.json"
             key = "ProbeDataRestricted"
         else:
-            probe_types = {"defaults", "filesystem_sizing"}
-            if self.app.opts.use_os_prober:
-                probe_types |= {"os"}
             fname = "probe-data.json"
             key = "ProbeData"
         storage = await self.app.prober.get_storage(probe_types)
+        if not restricted:
+            self._last_probe = (probe_types, storage)
         # It is possible for the user to submit filesystem config
         # while a probert probe is running. We don't want to overwrite
         # the users config with a blank one if this happens! (See
@@ -1456,6 +1507,39 @@ class FilesystemController(SubiquityController, FilesystemManipulator):
         self.model.swap = self.ai_data.get("swap")
         self.model.grub = self.ai_data.get("grub")
 
+    def warm_restart_snapshot(self):
+        if self._last_probe is None:
+            return None
+        # Once storage is configured the udev monitor is stopped, and from
+        # confirmation on the install may have changed the disks, so the
+        # probe cannot be trusted to describe them any more.
+        if self._configured or self.app.state not in (
+            ApplicationState.STARTING_UP,
+            ApplicationState.CLOUD_INIT_WAIT,
+            ApplicationState.EARLY_COMMANDS,
+            ApplicationState.WAITING,
+        ):
+            return None
+        probe_types, storage = self._last_probe
+        return {"probe_types": sorted(probe_types), "storage": storage}
+
+    def restore_warm_restart_snapshot(self, data):
+        # Only probes taken before storage was configured are handed over,
+        # see warm_restart_snapshot. Disks rarely change during the few
+        # seconds a restart takes, and the udev monitor started after the
+        # first probe catches anything that changes later.
+        if self.app.prober is not None:
+            self.app.prober.seed_storage(set(data["probe_types"]), data["storage"])
+
+    def warm_up(self):
+        # The (unrestricted) probe is usually the slowest part of getting
+        # started, so get it going while cloud-init finishes. The first
+        # _probe_once picks up the result.
+        if self.app.prober is not None:
+            self.app.prober.start_speculative_storage_probe(
+                self._probe_types(restricted=False)
+            )
+
     def start(self):
         if self.model.bootloader == Bootloader.PREP:
             self.supports_resilient_boot = False
@@ -45,11 +45,7 @@ from subiquity.server.mounter import Mounter, Mountpoint
 from subiquity.server.types import InstallerChannels
 from subiquitycore.async_helpers import run_bg_task, run_in_thread
 from subiquitycore.context import with_context
-from subiquitycore.file_util import (
-    generate_config_yaml,
-    generate_timestamped_header,
-    write_file,
-)
+from subiquitycore.file_util import generate_timestamped_header
 from subiquitycore.utils import arun_command, log_process_streams
 
 log = logging.getLogger("subiquity.server.controllers.install")
@@ -102,9 +98,9 @@ class InstallController(SubiquityController):
 
     def write_config(self, config_file: Path, config: Any) -> None:
         """Create a YAML file that represents the curtin install configuration
-        specified."""
-        config_file.parent.mkdir(parents=True, exist_ok=True)
-        generate_config_yaml(str(config_file), config)
+        specified. The file is written in the background; it is on disk by
+        the time a curtin command starts."""
+        self.app.file_writer.generate_config_yaml(config_file, config)
 
     def base_config(self, logs_dir, resume_data_file) -> Dict[str, Any]:
         """Return configuration to be used as part of every curtin install
@@ -691,7 +687,9 @@ class InstallController(SubiquityController):
         )
         # As autoinstall-user-data contains a password hash, we want this file
         # to have a very restrictive mode and ownership.
-        write_file(autoinstall_path, autoinstall_config, mode=0o400, group="root")
+        self.app.file_writer.write_file(
+            autoinstall_path, autoinstall_config, mode=0o400, group="root"
+        )
         try:
             if self.supports_apt():
                 packages = await self.get_target_packages(context=context)
@@ -727,7 +725,9 @@ class InstallController(SubiquityController):
 
             await self.app.controllers.Ad.join_domain(hostname, context)
         await self.platform_postinstall()
-        self.model.filesystem.copy_artifacts_to_target()
+        await run_in_thread(self.model.filesystem.copy_artifacts_to_target)
+        # Fail the install if autoinstall-user-data could not be written.
+        await self.app.file_writer.flush()
 
     @with_context(description="configuring cloud-init")
     async def configure_cloud_init(self, context):
@@ -209,6 +209,11 @@ class KeyboardController(SubiquityController):
         for cmd in cmds:
             await arun_command(cmd)
 
+    def warm_up(self):
+        # Unless it is changed, the installer language is the one the
+        # server was started with.
+        self.model.keyboard_list.load_language(os.environ.get("LANG") or "C")
+
     async def GET(self) -> KeyboardSetup:
         lang = self.app.base_model.locale.selected_language
         self.model.keyboard_list.load_language(lang)
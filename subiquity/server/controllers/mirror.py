@@ -152,6 +152,8 @@ class MirrorController(SubiquityController):
             (InstallerChannels.CONFIGURED, "proxy"), self.proxy_configured_event.set
         )
         self._apt_config_key = None
+        # URI of the mirror elected by the server this one replaced.
+        self._restored_elected: Optional[str] = None
         self.test_apt_configurer: Optional[AptConfigurer] = None
         self.final_apt_configurer: Optional[AptConfigurer] = None
         self.mirror_check: Optional[MirrorCheck] = None
@@ -196,6 +198,14 @@ class MirrorController(SubiquityController):
             log.debug("Skipping mirror check since network is not available.")
             return
 
+        if self._restored_elected is not None:
+            restored_elected, self._restored_elected = self._restored_elected, None
+            for candidate in self.model.compatible_primary_candidates():
+                if candidate.uri == restored_elected:
+                    log.debug("electing %s again after restart", candidate.uri)
+                    candidate.elect()
+                    return
+
         # Try each mirror one after another.
         compatibles = self.model.compatible_primary_candidates()
         for idx, candidate in enumerate(compatibles):
@@ -314,6 +324,14 @@ class MirrorController(SubiquityController):
         if data is not None:
             self.model.create_primary_candidate(data).elect()
 
+    def warm_restart_snapshot(self):
+        if self.model.primary_elected is None:
+            return None
+        return {"elected": self.model.primary_elected.uri}
+
+    def restore_warm_restart_snapshot(self, data):
+        self._restored_elected = data["elected"]
+
     def make_autoinstall(self):
         config = self.model.make_autoinstall()
         config["geoip"] = self.geoip_enabled
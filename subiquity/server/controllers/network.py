@@ -22,7 +22,7 @@ import aiohttp
 from subiquity.common.api.client import make_client_for_conn
 from subiquity.common.apidef import API, LinkAction, NetEventAPI
 from subiquity.common.errorreport import ErrorReportKind
-from subiquity.common.types import NetworkStatus, PackageInstallState
+from subiquity.common.types import NetworkDelta, NetworkStatus, PackageInstallState
 from subiquity.server.controller import SubiquityController
 from subiquitycore.async_helpers import run_bg_task, schedule_task
 from subiquitycore.context import with_context
@@ -113,6 +113,8 @@ class NetworkController(BaseNetworkController, SubiquityController):
         self._call_clients("wlan_support_install_finished", r)
         if r == PackageInstallState.DONE:
             for dev in self.pending_wlan_devices:
+                # Make the device show up in changes_GET too.
+                dev.invalidate()
                 self._send_update(LinkAction.NEW, dev)
         self.pending_wlan_devices = set()
         return r
@@ -219,19 +221,30 @@ class NetworkController(BaseNetworkController, SubiquityController):
     def make_autoinstall(self):
         return self.model.render_config()["network"]
 
+    def _visible_netdevs(self, devices):
+        if self.wlan_support_install_state() == PackageInstallState.DONE:
+            return devices
+        else:
+            return [dev for dev in devices if dev.type != "wlan"]
+
     async def GET(self) -> NetworkStatus:
         if not self.view_shown:
             self.apply_config(silent=True)
             self.view_shown = True
-        if self.wlan_support_install_state() == PackageInstallState.DONE:
-            devices = self.model.get_all_netdevs()
-        else:
-            devices = [
-                dev for dev in self.model.get_all_netdevs() if dev.type != "wlan"
-            ]
+        devices = self._visible_netdevs(self.model.get_all_netdevs())
         return NetworkStatus(
             devices=[dev.netdev_info() for dev in devices],
             wlan_support_install_state=self.wlan_support_install_state(),
+            version=self.model.version,
+        )
+
+    async def changes_GET(self, since: int) -> NetworkDelta:
+        changed, removed = self.model.get_netdevs_changed_since(since)
+        return NetworkDelta(
+            version=self.model.version,
+            devices=[dev.netdev_info() for dev in self._visible_netdevs(changed)],
+            removed=removed,
+            wlan_support_install_state=self.wlan_support_install_state(),
         )
 
     async def configured(self):
@@ -15,20 +15,14 @@
 
 import asyncio
 import logging
-from typing import List, Optional
+from typing import Optional
 
 from subiquity.common.apidef import API
 from subiquity.common.types import OEMResponse
 from subiquity.models.oem import OEMMetaPkg
-from subiquity.server.apt import OverlayCleanupError
 from subiquity.server.controller import SubiquityController
-from subiquity.server.curtin import run_curtin_command
 from subiquity.server.kernel import flavor_to_pkgname
 from subiquity.server.types import InstallerChannels
-from subiquity.server.ubuntu_drivers import (
-    CommandNotFoundError,
-    get_ubuntu_drivers_interface,
-)
 from subiquitycore.context import with_context
 
 log = logging.getLogger("subiquity.server.controllers.oem")
@@ -59,10 +53,6 @@ class OEMController(SubiquityController):
 
     def __init__(self, app) -> None:
         super().__init__(app)
-        # At this point, the source variant has not been selected but it only
-        # has an impact if we're listing drivers, not OEM metapackages.
-        self.ubuntu_drivers = get_ubuntu_drivers_interface(self.app)
-
         self.load_metapkgs_task: Optional[asyncio.Task] = None
         self.kernel_configured_event = asyncio.Event()
         self.fs_configured_event = asyncio.Event()
@@ -94,39 +84,21 @@ class OEMController(SubiquityController):
     def load_autoinstall_data(self, *args, **kwargs) -> None:
         self.model.load_autoinstall_data(*args, **kwargs)
 
-    async def wants_oem_kernel(self, pkgname: str, *, context, overlay) -> bool:
+    def wants_oem_kernel(self, pkgname: str, flavor: Optional[str]) -> bool:
         """For a given package, tell whether it wants the OEM or the default
-        kernel flavor. We look for the Ubuntu-Oem-Kernel-Flavour attribute in
-        the package meta-data. If the attribute is present and has the value
-        "default", then return False. Otherwise, return True."""
-        result = await run_curtin_command(
-            self.app,
-            context,
-            "in-target",
-            "-t",
-            overlay.mountpoint,
-            "--",
-            "apt-cache",
-            "show",
-            pkgname,
-            capture=True,
-            private_mounts=True,
-        )
-        for line in result.stdout.decode("utf-8").splitlines():
-            if not line.startswith("Ubuntu-Oem-Kernel-Flavour:"):
-                continue
-
-            flavor = line.split(":", maxsplit=1)[1].strip()
-            if flavor == "default":
-                return False
-            elif flavor == "oem":
-                return True
-            else:
-                log.warning("%s wants unexpected kernel flavor: %s", pkgname, flavor)
-                return True
-
-        log.warning("%s has no Ubuntu-Oem-Kernel-Flavour", pkgname)
-        return True
+        kernel flavor, based on its Ubuntu-Oem-Kernel-Flavour attribute. If
+        the attribute is present and has the value "default", then return
+        False. Otherwise, return True."""
+        if flavor is None:
+            log.warning("%s has no Ubuntu-Oem-Kernel-Flavour", pkgname)
+            return True
+        if flavor == "default":
+            return False
+        elif flavor == "oem":
+            return True
+        else:
+            log.warning("%s wants unexpected kernel flavor: %s", pkgname, flavor)
+            return True
 
     @with_context()
     async def load_metapackages_list(self, context) -> None:
@@ -155,30 +127,11 @@ class OEMController(SubiquityController):
         with context.child("wait_apt"):
             await self._wait_apt.wait()
 
-        apt = self.app.controllers.Mirror.final_apt_configurer
-        try:
-            async with apt.overlay() as d:
-                try:
-                    # Make sure ubuntu-drivers is available.
-                    await self.ubuntu_drivers.ensure_cmd_exists(d.mountpoint)
-                except CommandNotFoundError:
-                    self.model.metapkgs = []
-                else:
-                    metapkgs: List[str] = await self.ubuntu_drivers.list_oem(
-                        root_dir=d.mountpoint, context=context
-                    )
-                    self.model.metapkgs = [
-                        OEMMetaPkg(
-                            name=name,
-                            wants_oem_kernel=await self.wants_oem_kernel(
-                                name, context=context, overlay=d
-                            ),
-                        )
-                        for name in metapkgs
-                    ]
-
-        except OverlayCleanupError:
-            log.exception("Failed to cleanup overlay. Continuing anyway.")
+        metapkgs = await self.app.hwe_scanner.list_oem()
+        self.model.metapkgs = [
+            OEMMetaPkg(name=name, wants_oem_kernel=self.wants_oem_kernel(name, flavor))
+            for name, flavor in metapkgs.items()
+        ]
 
         for pkg in self.model.metapkgs:
             if pkg.wants_oem_kernel:
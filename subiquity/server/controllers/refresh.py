@@ -19,7 +19,7 @@ import logging
 import os
 from typing import Tuple
 
-import requests.exceptions
+import aiohttp
 
 from subiquity.common.apidef import API
 from subiquity.common.types import Change, RefreshCheckState, RefreshStatus
@@ -28,6 +28,7 @@ from subiquity.server.snapdapi import (
     SnapAction,
     SnapActionRequest,
     TaskStatus,
+    get_change_watcher,
     post_and_wait,
 )
 from subiquity.server.types import InstallerChannels
@@ -100,11 +101,10 @@ class RefreshController(SubiquityController):
         if self.status.availability != RefreshCheckState.AVAILABLE:
             return
         change_id = await self.start_update(context=context)
-        while True:
-            change = await self.get_progress(change_id)
-            if change.status not in [TaskStatus.DO, TaskStatus.DOING, TaskStatus.DONE]:
-                raise Exception(f"update failed: {change.status}")
-            await asyncio.sleep(0.1)
+        await get_change_watcher(self.app.snapdapi).wait(change_id)
+        change = await self.get_progress(change_id)
+        if change.status != TaskStatus.DONE:
+            raise Exception(f"update failed: {change.status}")
 
     @with_context()
     async def configure_snapd(self, context):
@@ -117,7 +117,7 @@ class RefreshController(SubiquityController):
         with context.child("get_details") as subcontext:
             try:
                 snap = await self.app.snapdapi.v2.snaps[self.snap_name].GET()
-            except requests.exceptions.RequestException:
+            except aiohttp.ClientError:
                 log.exception("getting snap details")
                 return
             self.status.current_snap_version = snap.version
@@ -148,7 +148,7 @@ class RefreshController(SubiquityController):
                     self.app.snapdapi.v2.snaps[self.snap_name].POST,
                     SnapActionRequest(action=SnapAction.SWITCH, channel=channel),
                 )
-            except requests.exceptions.RequestException:
+            except aiohttp.ClientError:
                 log.exception("switching channels")
                 return
             subcontext.description = "switched to " + channel
@@ -193,7 +193,7 @@ class RefreshController(SubiquityController):
             return
         try:
             result = await self.app.snapdapi.v2.find.GET(select="refresh")
-        except requests.exceptions.RequestException:
+        except aiohttp.ClientError:
             log.exception("checking for snap update failed")
             context.description = "checking for snap update failed"
             self.status.availability = RefreshCheckState.UNKNOWN
@@ -218,10 +218,13 @@ class RefreshController(SubiquityController):
             SnapActionRequest(action=SnapAction.REFRESH, ignore_running=True)
         )
         context.description = "change id: {}".format(change_id)
+        get_change_watcher(self.app.snapdapi).watch(change_id)
         return change_id
 
     async def get_progress(self, change_id: str) -> Change:
-        change = await self.app.snapdapi.v2.changes[change_id].GET()
+        # The change is being followed by the change watcher so this
+        # does not usually need to ask snapd anything.
+        change = await get_change_watcher(self.app.snapdapi).current(change_id)
         if change.status == TaskStatus.DONE:
             # Clearly if we got here we didn't get restarted by
             # snapd/systemctl (dry-run mode)
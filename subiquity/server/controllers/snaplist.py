@@ -14,11 +14,14 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import asyncio
+import json
 import logging
-from typing import List
+import os
+from typing import Any, Dict, List, Optional
+from urllib.parse import quote_plus
 
+import aiohttp
 import attr
-import requests.exceptions
 
 from subiquity.common.apidef import API
 from subiquity.common.types import (
@@ -31,6 +34,7 @@ from subiquity.server.controller import SubiquityController
 from subiquity.server.types import InstallerChannels
 from subiquitycore.async_helpers import schedule_task
 from subiquitycore.context import with_context
+from subiquitycore.file_util import write_file
 
 log = logging.getLogger("subiquity.server.controllers.snaplist")
 
@@ -40,10 +44,21 @@ class SnapListFetchError(Exception):
 
 
 class SnapdSnapInfoLoader:
-    def __init__(self, model, snapd, store_section, context):
+    # How many snap info requests the background prefetch has in flight
+    # at once. Requests for snaps the user looks at are made immediately
+    # and do not count against this.
+    prefetch_concurrency = 4
+
+    def __init__(self, model, snapd, store_section, context, cache_dir=None):
         self.model = model
         self.store_section = store_section
         self.context = context
+        # Responses to v2/find?name= are kept here (if set) so they
+        # survive a restart of the server.
+        self.cache_dir: Optional[str] = cache_dir
+        # The response to v2/find?section=. If set before start(), it is
+        # used instead of asking snapd.
+        self.list_data: Optional[Dict[str, Any]] = None
 
         self.main_task = None
 
@@ -90,33 +105,74 @@ class SnapdSnapInfoLoader:
                 return
             self.pending_snaps = self.model.get_snap_list()
             log.debug("fetched list of %s snaps", len(self.pending_snaps))
-            while self.pending_snaps:
-                snap = self.pending_snaps.pop(0)
-                task = self.tasks[snap] = schedule_task(
-                    self._fetch_info_for_snap(snap=snap)
-                )
-                await task
+            await asyncio.gather(
+                *[self._prefetch() for _ in range(self.prefetch_concurrency)]
+            )
+
+    async def _prefetch(self):
+        while self.pending_snaps:
+            snap = self.pending_snaps.pop(0)
+            if snap in self.tasks:
+                continue
+            task = self.tasks[snap] = schedule_task(
+                self._fetch_info_for_snap(snap=snap)
+            )
+            await task
 
     @with_context(name="list")
     async def _load_list(self, context=None):
-        try:
-            result = await self.snapd.get("v2/find", section=self.store_section)
-        except requests.exceptions.RequestException:
-            raise SnapListFetchError
-        self.model.load_find_data(result)
+        if self.list_data is not None:
+            context.description = "from snapshot"
+        else:
+            try:
+                self.list_data = await self.snapd.get(
+                    "v2/find", section=self.store_section
+                )
+            except aiohttp.ClientError:
+                raise SnapListFetchError
+        self.model.load_find_data(self.list_data)
 
     def stop(self):
         if self.main_task is not None:
             self.main_task.cancel()
 
-    @with_context(name="fetch/{snap.name}")
-    async def _fetch_info_for_snap(self, snap, context=None):
+    def _cache_path(self, snap_name):
+        return os.path.join(
+            self.cache_dir, quote_plus(self.store_section), quote_plus(snap_name)
+        )
+
+    def _load_cached_info(self, snap_name):
+        if self.cache_dir is None:
+            return None
         try:
-            data = await self.snapd.get("v2/find", name=snap.name)
-        except requests.exceptions.RequestException:
-            log.exception("loading snap info failed")
-            # XXX something better here?
+            with open(self._cache_path(snap_name)) as fp:
+                return json.load(fp)
+        except (OSError, ValueError):
+            return None
+
+    def _cache_info(self, snap_name, data):
+        if self.cache_dir is None:
             return
+        path = self._cache_path(snap_name)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            write_file(path, json.dumps(data))
+        except OSError:
+            log.exception("caching info for snap %s failed", snap_name)
+
+    @with_context(name="fetch/{snap.name}")
+    async def _fetch_info_for_snap(self, snap, context=None):
+        data = self._load_cached_info(snap.name)
+        if data is not None:
+            context.description = "from cache"
+        else:
+            try:
+                data = await self.snapd.get("v2/find", name=snap.name)
+            except aiohttp.ClientError:
+                log.exception("loading snap info failed")
+                # XXX something better here?
+                return
+            self._cache_info(snap.name, data)
         self.model.load_info_data(data)
 
     def get_snap_list_task(self):
@@ -158,6 +214,7 @@ class SnapListController(SubiquityController):
             self.app.snapd,
             self.opts.snap_section,
             self.context.child("loader"),
+            cache_dir=self.app.state_path("snap-info"),
         )
 
     def __init__(self, app):
@@ -194,6 +251,16 @@ class SnapListController(SubiquityController):
     def make_autoinstall(self):
         return [attr.asdict(sel) for sel in self.model.selections]
 
+    def warm_restart_snapshot(self):
+        if not self.loader.fetch_list_completed():
+            return None
+        return {"section": self.loader.store_section, "list": self.loader.list_data}
+
+    def restore_warm_restart_snapshot(self, data):
+        # Snap info is already cached on disk, see SnapdSnapInfoLoader.
+        if data["section"] == self.loader.store_section:
+            self.loader.list_data = data["list"]
+
     async def GET(self, wait: bool = False) -> SnapListResponse:
         if (
             self.loader.fetch_list_failed()
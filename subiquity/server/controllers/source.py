@@ -15,7 +15,7 @@
 
 import logging
 import os
-from typing import Any, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 from curtin.commands.extract import (
     AbstractSourceHandler,
@@ -79,6 +79,10 @@ class SourceController(SubiquityController):
         self.source_path: Optional[str] = None
         self.ai_source_id: Optional[str] = None
         self._configured: bool = False
+        # The catalog does not change once loaded, so the converted
+        # sources are kept for each language they are asked for in.
+        self._selections_by_lang: Dict[str, List[SourceSelection]] = {}
+        self._catalog_key: Optional[Tuple[str, int, int]] = None
 
     def make_autoinstall(self):
         return {
@@ -103,14 +107,33 @@ class SourceController(SubiquityController):
         # current source accordingly.
         self.ai_source_id = data.get("id")
 
-    def start(self):
+    def load_catalog(self) -> bool:
+        """Load the source catalog, unless it is already loaded and has
+        not changed since. Return False if there is no catalog."""
         path = "/cdrom/casper/install-sources.yaml"
         if self.app.opts.source_catalog is not None:
             path = self.app.opts.source_catalog
-        if not os.path.exists(path):
-            return
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return False
+        key = (path, st.st_size, st.st_mtime_ns)
+        if key == self._catalog_key:
+            return True
         with open(path) as fp:
-            self.model.load_from_file(fp)
+            self.model.load_from_file(
+                fp, cache_path=self.app.state_path("source-catalog.json")
+            )
+        self._catalog_key = key
+        self._selections_by_lang.clear()
+        return True
+
+    def warm_up(self):
+        self.load_catalog()
+
+    def start(self):
+        if not self.load_catalog():
+            return
         # Assign the current source if hinted by autoinstall.
         if self.ai_source_id is not None:
             self.model.current = self.model.get_matching_source(self.ai_source_id)
@@ -130,8 +153,14 @@ class SourceController(SubiquityController):
         if search_drivers is SEARCH_DRIVERS_AUTOINSTALL_DEFAULT:
             search_drivers = True
 
+        selections = self._selections_by_lang.get(cur_lang)
+        if selections is None:
+            selections = self._selections_by_lang[cur_lang] = [
+                convert_source(source, cur_lang) for source in self.model.sources
+            ]
+
         return SourceSelectionAndSetting(
-            [convert_source(source, cur_lang) for source in self.model.sources],
+            selections,
             self.model.current.id,
             search_drivers=search_drivers,
         )
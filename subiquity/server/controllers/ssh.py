@@ -13,6 +13,7 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import asyncio
 import logging
 from typing import List
 
@@ -80,6 +81,13 @@ class SSHController(SubiquityController):
         await self.configured()
 
     async def fetch_id_GET(self, user_id: str) -> SSHFetchIdResponse:
+        return await self._fetch_id(user_id)
+
+    async def fetch_ids_GET(self, user_ids: List[str]) -> List[SSHFetchIdResponse]:
+        # The fetcher limits how many ids are actually fetched at once.
+        return await asyncio.gather(*[self._fetch_id(user_id) for user_id in user_ids])
+
+    async def _fetch_id(self, user_id: str) -> SSHFetchIdResponse:
         identities: List[SSHIdentity] = []
 
         try:
@@ -15,6 +15,7 @@
 
 import copy
 import subprocess
+import threading
 import uuid
 from unittest import IsolatedAsyncioTestCase, mock
 
@@ -24,6 +25,7 @@ from subiquity.common.filesystem import gaps, labels
 from subiquity.common.filesystem.actions import DeviceAction
 from subiquity.common.types import (
     AddPartitionV2,
+    ApplicationState,
     Bootloader,
     Gap,
     GapUsable,
@@ -38,10 +40,11 @@ from subiquity.common.types import (
     ModifyPartitionV2,
     Partition,
     ProbeStatus,
+    RecoveryKey,
     ReformatDisk,
     SizingPolicy,
 )
-from subiquity.models.filesystem import dehumanize_size
+from subiquity.models.filesystem import RecoveryKeyHandler, dehumanize_size
 from subiquity.models.source import CatalogEntryVariation
 from subiquity.models.tests.test_filesystem import (
     FakeStorageInfo,
@@ -184,6 +187,34 @@ class TestSubiquityControllerFilesystem(IsolatedAsyncioTestCase):
         self.assertIsNone(self.fsc.queued_probe_data, {})
         load.assert_called_once_with({})
 
+    def test_warm_restart_snapshot(self):
+        self.fsc._configured = False
+        self.app.state = ApplicationState.WAITING
+        self.fsc._last_probe = ({"defaults"}, {"blockdev": {}})
+        self.assertEqual(
+            {"probe_types": ["defaults"], "storage": {"blockdev": {}}},
+            self.fsc.warm_restart_snapshot(),
+        )
+
+    def test_warm_restart_snapshot_after_configured(self):
+        # e.g. "Restart the installer" after a failed install: the disks
+        # may have been partitioned since the probe.
+        self.fsc._configured = True
+        self.app.state = ApplicationState.WAITING
+        self.fsc._last_probe = ({"defaults"}, {"blockdev": {}})
+        self.assertIsNone(self.fsc.warm_restart_snapshot())
+
+    def test_warm_restart_snapshot_after_install_started(self):
+        self.fsc._configured = False
+        self.fsc._last_probe = ({"defaults"}, {"blockdev": {}})
+        for state in (
+            ApplicationState.NEEDS_CONFIRMATION,
+            ApplicationState.RUNNING,
+            ApplicationState.ERROR,
+        ):
+            self.app.state = state
+            self.assertIsNone(self.fsc.warm_restart_snapshot())
+
     async def test_v2_reset_POST_no_queued_data(self):
         self.fsc.queued_probe_data = None
         with mock.patch.object(self.fsc.model, "load_probe_data") as load:
@@ -527,6 +558,28 @@ class TestGuided(IsolatedAsyncioTestCase):
         self.assertFalse(d1p2.preserve)
         self.assertIsNone(gaps.largest_gap(self.d1))
 
+    async def test_guided_lvm_recovery_key_written_in_thread(self):
+        await self._guided_setup(Bootloader.UEFI, "gpt")
+        target = GuidedStorageTargetReformat(
+            disk_id=self.d1.id, allowed=default_capabilities
+        )
+        threads = []
+        with mock.patch.object(
+            RecoveryKeyHandler,
+            "_expose_key",
+            side_effect=lambda **kw: threads.append(threading.current_thread()),
+        ):
+            await self.controller.guided(
+                GuidedChoiceV2(
+                    target=target,
+                    capability=GuidedCapability.LVM_LUKS,
+                    password="passw0rd",
+                    recovery_key=RecoveryKey(live_location="/tmp/key.txt"),
+                )
+            )
+        [thread] = threads
+        self.assertIsNot(threading.main_thread(), thread)
+
     @parameterized.expand(boot_expectations)
     async def test_guided_zfs(self, bootloader, ptable, p1mnt):
         await self._guided_setup(bootloader, ptable)
@@ -744,6 +797,30 @@ class TestGuidedV2(IsolatedAsyncioTestCase):
         self.assertEqual(expected, resp.targets)
         self.assertEqual(ProbeStatus.DONE, resp.status)
 
+    async def test_targets_cached_until_model_changes(self):
+        await self._setup(Bootloader.UEFI, "gpt")
+        with mock.patch.object(
+            self.fsc,
+            "_compute_guided_targets",
+            wraps=self.fsc._compute_guided_targets,
+        ) as compute:
+            resp1 = await self.fsc.v2_guided_GET()
+            resp2 = await self.fsc.v2_guided_GET()
+            self.assertEqual(resp1.targets, resp2.targets)
+            compute.assert_called_once()
+
+            make_partition(self.model, self.disk, size=10 << 30, preserve=True)
+            resp3 = await self.fsc.v2_guided_GET()
+            self.assertEqual(2, compute.call_count)
+            self.assertNotEqual(resp1.targets, resp3.targets)
+
+    async def test_targets_cache_dropped_on_examine_systems(self):
+        await self._setup(Bootloader.UEFI, "gpt")
+        await self.fsc.v2_guided_GET()
+        self.assertIsNotNone(self.fsc._guided_targets)
+        await self.fsc._examine_systems()
+        self.assertIsNone(self.fsc._guided_targets)
+
     @parameterized.expand(bootloaders_and_ptables)
     async def test_probing(self, bootloader, ptable):
         await self._setup(bootloader, ptable, fix_bios=False)
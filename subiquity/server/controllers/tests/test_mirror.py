@@ -220,6 +220,63 @@ class TestMirrorController(unittest.IsolatedAsyncioTestCase):
             )
         self.assertEqual(self.controller.model.primary_elected.uri, "http://success")
 
+    async def test_find_and_elect_candidate_mirror_restored(self):
+        self.controller.app.context.child = contextlib.nullcontext
+        self.controller.app.base_model.network.has_network = True
+        self.controller.model = MirrorModel()
+        self.controller.network_configured_event.set()
+        self.controller.proxy_configured_event.set()
+        self.controller.cc_event.set()
+        self.controller.model.primary_candidates = [
+            self.controller.model.create_primary_candidate("http://failed"),
+            self.controller.model.create_primary_candidate("http://success"),
+        ]
+        self.controller.restore_warm_restart_snapshot({"elected": "http://success"})
+
+        with mock.patch.object(
+            self.controller, "try_mirror_checking_once"
+        ) as check_mirror:
+            await self.controller.find_and_elect_candidate_mirror(
+                self.controller.app.context
+            )
+        check_mirror.assert_not_called()
+        self.assertEqual(self.controller.model.primary_elected.uri, "http://success")
+        self.assertEqual(
+            {"elected": "http://success"}, self.controller.warm_restart_snapshot()
+        )
+
+        # The restored mirror is only used once.
+        self.controller.model.primary_elected = None
+        with mock.patch.object(
+            self.controller, "try_mirror_checking_once"
+        ) as check_mirror:
+            await self.controller.find_and_elect_candidate_mirror(
+                self.controller.app.context
+            )
+        check_mirror.assert_called_once()
+        self.assertEqual(self.controller.model.primary_elected.uri, "http://failed")
+
+    async def test_find_and_elect_candidate_mirror_restored_unknown(self):
+        self.controller.app.context.child = contextlib.nullcontext
+        self.controller.app.base_model.network.has_network = True
+        self.controller.model = MirrorModel()
+        self.controller.network_configured_event.set()
+        self.controller.proxy_configured_event.set()
+        self.controller.cc_event.set()
+        self.controller.model.primary_candidates = [
+            self.controller.model.create_primary_candidate("http://mirror"),
+        ]
+        self.controller.restore_warm_restart_snapshot({"elected": "http://gone"})
+
+        with mock.patch.object(
+            self.controller, "try_mirror_checking_once"
+        ) as check_mirror:
+            await self.controller.find_and_elect_candidate_mirror(
+                self.controller.app.context
+            )
+        check_mirror.assert_called_once()
+        self.assertEqual(self.controller.model.primary_elected.uri, "http://mirror")
+
     async def test_find_and_elect_candidate_mirror_no_network(self):
         self.controller.app.context.child = contextlib.nullcontext
         self.controller.app.base_model.network.has_network = False
@@ -13,16 +13,19 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import os
 import unittest
 from unittest.mock import AsyncMock
 
-import requests
+import aiohttp
 
 from subiquity.models.snaplist import SnapListModel
 from subiquity.server.controllers.snaplist import (
     SnapdSnapInfoLoader,
     SnapListFetchError,
 )
+from subiquitycore.snapd import AsyncSnapd, get_fake_connection
+from subiquitycore.tests import SubiTestCase
 from subiquitycore.tests.mocks import make_app
 
 
@@ -41,7 +44,7 @@ class TestSnapdSnapInfoLoader(unittest.IsolatedAsyncioTestCase):
         self.assertFalse(self.loader.fetch_list_failed())
 
     async def test_list_task_failed(self):
-        self.app.snapd.get.side_effect = requests.exceptions.RequestException
+        self.app.snapd.get.side_effect = aiohttp.ClientError
         self.loader.start()
         await self.loader.load_list_task_created.wait()
         with self.assertRaises(SnapListFetchError):
@@ -56,3 +59,82 @@ class TestSnapdSnapInfoLoader(unittest.IsolatedAsyncioTestCase):
         await self.loader.get_snap_list_task()
         self.assertTrue(self.loader.fetch_list_completed())
         self.assertFalse(self.loader.fetch_list_failed())
+
+    async def test_list_data_kept(self):
+        self.app.snapd.get.return_value = {"result": []}
+        self.loader.start()
+        await self.loader.load_list_task_created.wait()
+        await self.loader.get_snap_list_task()
+        self.assertEqual({"result": []}, self.loader.list_data)
+
+    async def test_list_data_seeded(self):
+        self.loader.list_data = {"result": []}
+        self.loader.start()
+        await self.loader.load_list_task_created.wait()
+        await self.loader.get_snap_list_task()
+        self.assertTrue(self.loader.fetch_list_completed())
+        self.app.snapd.get.assert_not_called()
+
+
+class TestSnapdSnapInfoLoaderPrefetch(SubiTestCase):
+    def setUp(self):
+        self.model = SnapListModel()
+        self.app = make_app()
+        self.fake = AsyncSnapd(get_fake_connection(scale_factor=100))
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.info_requests = []
+        self.app.snapd = AsyncMock()
+        self.app.snapd.get.side_effect = self.get
+
+    async def get(self, path, **args):
+        if "name" in args:
+            self.info_requests.append(args["name"])
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            return await self.fake.get(path, **args)
+        finally:
+            self.in_flight -= 1
+
+    def make_loader(self, cache_dir=None):
+        return SnapdSnapInfoLoader(
+            self.model, self.app.snapd, "server", self.app.context, cache_dir
+        )
+
+    async def test_prefetch_bounded(self):
+        loader = self.make_loader()
+        loader.start()
+        await loader.main_task
+        snaps = self.model.get_snap_list()
+        self.assertEqual(len(snaps), len(self.info_requests))
+        self.assertEqual(loader.prefetch_concurrency, self.max_in_flight)
+        for snap in snaps:
+            self.assertTrue(loader.get_snap_info_task(snap).done())
+
+    async def test_requested_snap_not_queued(self):
+        loader = self.make_loader()
+        loader.start()
+        await loader.load_list_task_created.wait()
+        await loader.get_snap_list_task()
+        snap = self.model.get_snap_list()[-1]
+        await loader.get_snap_info_task(snap)
+        self.assertEqual(1, self.info_requests.count(snap.name))
+        await loader.main_task
+        self.assertEqual(1, self.info_requests.count(snap.name))
+
+    async def test_info_cached_on_disk(self):
+        cache_dir = self.tmp_dir()
+        loader = self.make_loader(cache_dir)
+        loader.start()
+        await loader.main_task
+        count = len(self.info_requests)
+        self.assertTrue(os.path.exists(os.path.join(cache_dir, "server", "juju")))
+
+        self.model = SnapListModel()
+        loader = self.make_loader(cache_dir)
+        loader.start()
+        await loader.main_task
+        self.assertEqual(count, len(self.info_requests))
+        snap = self.model._snap_for_name("juju")
+        self.assertNotEqual([], snap.channels)
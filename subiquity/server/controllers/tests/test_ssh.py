@@ -98,3 +98,37 @@ class TestSSHController(unittest.IsolatedAsyncioTestCase):
             self.assertEqual(response.status, SSHFetchIdStatus.FINGERPRINT_ERROR)
             self.assertEqual(response.error, stderr)
             self.assertIsNone(response.identities)
+
+    async def test_fetch_ids_GET(self):
+        async def fetch_keys_for_id(user_id):
+            if user_id == "lp:missing":
+                raise SSHFetchError(
+                    status=SSHFetchIdStatus.IMPORT_ERROR, reason="not found"
+                )
+            return [f"ssh-rsa AAAAA[..] {user_id} # ssh-import-id {user_id}"]
+
+        mock_fetch_keys = mock.patch.object(
+            self.controller.fetcher, "fetch_keys_for_id", new=fetch_keys_for_id
+        )
+        mock_gen_fingerprint = mock.patch.object(
+            self.controller.fetcher,
+            "gen_fingerprint_for_key",
+            return_value="256 SHA256:rIR9[..] (RSA)",
+        )
+
+        with mock_fetch_keys, mock_gen_fingerprint:
+            responses = await self.controller.fetch_ids_GET(
+                user_ids=["lp:user", "lp:missing", "gh:user"]
+            )
+
+        self.assertEqual(
+            [SSHFetchIdStatus.OK, SSHFetchIdStatus.IMPORT_ERROR, SSHFetchIdStatus.OK],
+            [response.status for response in responses],
+        )
+        self.assertEqual(
+            "lp:user # ssh-import-id lp:user", responses[0].identities[0].key_comment
+        )
+        self.assertEqual("not found", responses[1].error)
+        self.assertEqual(
+            "gh:user # ssh-import-id gh:user", responses[2].identities[0].key_comment
+        )
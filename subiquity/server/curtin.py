@@ -118,7 +118,7 @@ class _CurtinCommand:
         await asyncio.sleep(0)
         self._event_contexts[""] = context
         self.proc = await self.runner.start(
-            self._cmd, **opts, private_mounts=self.private_mounts
+            self._cmd, **opts, private_mounts=self.private_mounts, context=context
         )
 
     async def wait(self):
@@ -195,6 +195,9 @@ class _FailingDryRunCurtinCommand(_DryRunCurtinCommand):
 async def start_curtin_command(
     app, context, command: str, *args: str, config=None, private_mounts: bool, **opts
 ) -> _CurtinCommand:
+    # curtin reads its configuration (and maybe other files we wrote)
+    # from disk.
+    await app.file_writer.flush()
     cls: Type[_CurtinCommand]
     if app.opts.dry_run:
         if "install-fail" in app.debug_flags:
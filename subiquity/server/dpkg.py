@@ -0,0 +1,164 @@
+# Copyright 2024 Canonical, Ltd.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Read dpkg status and apt Packages files without running dpkg or apt.
+
+Both are made of "stanzas" of RFC 822 style fields, separated by blank
+lines. DpkgStatus indexes the installed state of the packages of a
+target tree so that questions like "which kernels are installed" can be
+answered without a subprocess per question.
+
+The status file only says what is installed. Questions about packages
+that apt could install (the kernel flavour of an OEM metapackage, the
+recommended drivers, the missing language packs) still go to apt-cache,
+ubuntu-drivers and check-language-support.
+"""
+
+import logging
+import os
+import pathlib
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+import attr
+
+log = logging.getLogger("subiquity.server.dpkg")
+
+Stanza = Dict[str, str]
+
+
+def iter_stanzas(
+    lines: Iterable[str], fields: Optional[Set[str]] = None
+) -> Iterator[Stanza]:
+    """Yield the stanzas in lines as dicts mapping field names to values.
+
+    Continuation lines are joined to the value with newlines. If fields
+    is given, only those fields are kept, which saves a good deal of
+    work on large files.
+    """
+    stanza: Stanza = {}
+    field: Optional[str] = None
+    for line in lines:
+        line = line.rstrip("\n")
+        if not line.strip():
+            if stanza:
+                yield stanza
+            stanza = {}
+            field = None
+        elif line[0] in " \t":
+            if field is not None:
+                stanza[field] += "\n" + line[1:]
+        else:
+            name, sep, value = line.partition(":")
+            if not sep:
+                log.debug("ignoring malformed line %r", line)
+                field = None
+                continue
+            if fields is not None and name not in fields:
+                field = None
+                continue
+            field = name
+            stanza[name] = value.strip()
+    if stanza:
+        yield stanza
+
+
+def parse_relation_names(value: str) -> List[str]:
+    """Return the package names in a relationship field like Provides,
+    ignoring versions, architecture qualifiers and alternatives."""
+    names = []
+    for group in value.split(","):
+        for alternative in group.split("|"):
+            name = alternative.split("(", 1)[0].strip().split(":", 1)[0]
+            if name:
+                names.append(name)
+    return names
+
+
+@attr.s(auto_attribs=True)
+class PackageState:
+    name: str
+    version: Optional[str]
+    status: str
+    provides: Tuple[str, ...]
+
+    @property
+    def installed(self) -> bool:
+        # Status is "want flag state", e.g. "install ok installed".
+        return self.status.rsplit(" ", 1)[-1] == "installed"
+
+
+class DpkgStatus:
+    fields = {"Package", "Status", "Version", "Provides"}
+
+    def __init__(self, packages: Iterable[PackageState]):
+        self.packages: Dict[str, PackageState] = {}
+        self._providers: Dict[str, List[str]] = {}
+        for pkg in packages:
+            self.packages[pkg.name] = pkg
+            for virtual in pkg.provides:
+                self._providers.setdefault(virtual, []).append(pkg.name)
+
+    @classmethod
+    def from_lines(cls, lines: Iterable[str]) -> "DpkgStatus":
+        return cls(
+            PackageState(
+                name=stanza["Package"],
+                version=stanza.get("Version"),
+                status=stanza.get("Status", ""),
+                provides=tuple(parse_relation_names(stanza.get("Provides", ""))),
+            )
+            for stanza in iter_stanzas(lines, cls.fields)
+            if "Package" in stanza
+        )
+
+    @classmethod
+    def from_file(cls, path: Union[str, pathlib.Path]) -> "DpkgStatus":
+        with open(path, encoding="utf-8", errors="replace") as fp:
+            return cls.from_lines(fp)
+
+    def is_installed(self, name: str) -> bool:
+        pkg = self.packages.get(name)
+        return pkg is not None and pkg.installed
+
+    def installed_providers(self, virtual: str) -> List[str]:
+        """Return the installed packages that provide virtual."""
+        return [
+            name for name in self._providers.get(virtual, []) if self.is_installed(name)
+        ]
+
+
+_status_cache: Dict[str, Tuple[Tuple[int, int], DpkgStatus]] = {}
+
+
+def dpkg_status_for_target(rootfs: Union[str, pathlib.Path]) -> DpkgStatus:
+    """Return the DpkgStatus of the tree at rootfs.
+
+    The index is kept until the status file changes, so asking several
+    questions about the same tree only reads it once.
+    """
+    # Ideally, we should not hardcode var/lib/dpkg/status which is an
+    # implementation detail.
+    path = os.path.join(rootfs, "var/lib/dpkg/status")
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return DpkgStatus([])
+    key = (st.st_mtime_ns, st.st_size)
+    cached = _status_cache.get(path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    status = DpkgStatus.from_file(path)
+    _status_cache[path] = (key, status)
+    return status
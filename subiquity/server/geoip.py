@@ -16,6 +16,7 @@
 import enum
 import logging
 from abc import ABC, abstractmethod
+from typing import Optional, Tuple
 from xml.etree import ElementTree
 
 import aiohttp
@@ -92,6 +93,16 @@ class GeoIP:
             InstallerChannels.NETWORK_PROXY_SET, self.maybe_start_check
         )
         self.strategy = strategy
+        # (cc, tz) saved by the server this one replaced, see restore().
+        self._restored: Optional[Tuple[str, str]] = None
+
+    def restore(self, cc: str, tz: str) -> None:
+        """Use the result of a lookup made before the server restarted.
+
+        It is announced when the lookup would have been made, so that
+        subscribers see the same sequence of events as usual.
+        """
+        self._restored = (cc, tz)
 
     def maybe_start_check(self):
         if self.check_state != CheckState.DONE:
@@ -107,6 +118,11 @@ class GeoIP:
         return rv
 
     async def _lookup(self):
+        if self._restored is not None:
+            self.cc, self.tz = self._restored
+            self._restored = None
+            self.app.hub.broadcast(InstallerChannels.GEOIP)
+            return True
         try:
             self.response_text = await self.strategy.get_response()
         except aiohttp.ClientError as le:
@@ -14,11 +14,11 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import pathlib
-import subprocess
 from typing import List
 
+from subiquity.server.dpkg import dpkg_status_for_target
+from subiquitycore.async_helpers import run_in_thread
 from subiquitycore.lsb_release import lsb_release
-from subiquitycore.utils import arun_command
 
 
 def flavor_to_pkgname(flavor: str, *, dry_run: bool) -> str:
@@ -36,31 +36,5 @@ def flavor_to_pkgname(flavor: str, *, dry_run: bool) -> str:
 
 async def list_installed_kernels(rootfs: pathlib.Path) -> List[str]:
     """Return the list of linux-image packages installed in rootfs."""
-    # TODO use python-apt instead coupled with rootdir.
-    # Ideally, we should not hardcode var/lib/dpkg/status which is an
-    # implementation detail.
-    try:
-        cp = await arun_command(
-            [
-                "grep-status",
-                "--whole-pkg",
-                "-FProvides",
-                "linux-image",
-                "--and",
-                "-FStatus",
-                "installed",
-                "--show-field=Package",
-                "--no-field-names",
-                str(rootfs / pathlib.Path("var/lib/dpkg/status")),
-            ],
-            check=True,
-        )
-    except subprocess.CalledProcessError as cpe:
-        # grep-status exits with status 1 when there is no match.
-        if cpe.returncode != 1:
-            raise
-        stdout = cpe.stdout
-    else:
-        stdout = cp.stdout
-
-    return [line for line in stdout.splitlines() if line]
+    status = await run_in_thread(dpkg_status_for_target, rootfs)
+    return status.installed_providers("linux-image")
@@ -0,0 +1,254 @@
+# Copyright 2024 Canonical, Ltd.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" In-process latency metrics for the API server.
+
+The request handlers created by subiquity.common.api.server record how
+long each phase of handling a request took in request["timings"], and
+SubiquityServer.middleware passes those, along with the total time and
+payload sizes, to APIMetrics.observe.
+"""
+
+import bisect
+from typing import Dict, List, Tuple
+
+from subiquity.common.types import EndpointMetrics, LatencyHistogram
+
+# Upper bounds of the histogram buckets, in microseconds.
+BUCKET_BOUNDS_US = [
+    1_000,
+    2_500,
+    5_000,
+    10_000,
+    25_000,
+    50_000,
+    100_000,
+    250_000,
+    500_000,
+    1_000_000,
+    2_500_000,
+    5_000_000,
+    10_000_000,
+    30_000_000,
+    60_000_000,
+]
+
+# The phases of handling a request, in the order they happen. "total"
+# is measured by the middleware and so includes everything.
+PHASES = ["deserialize", "wait", "implementation", "serialize", "total"]
+
+
+class Histogram:
+    def __init__(self, bounds=BUCKET_BOUNDS_US):
+        self.bounds = bounds
+        # counts[i] is the number of observations in (bounds[i-1],
+        # bounds[i]]; the last entry counts those above all the bounds.
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0
+        self.max = 0
+
+    def observe(self, value_us: int) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value_us)] += 1
+        self.count += 1
+        self.sum += value_us
+        self.max = max(self.max, value_us)
+
+    def to_api(self, phase: str) -> LatencyHistogram:
+        return LatencyHistogram(
+            phase=phase,
+            bounds_us=list(self.bounds),
+            counts=list(self.counts),
+            count=self.count,
+            sum_us=self.sum,
+            max_us=self.max,
+        )
+
+    def quantile(self, q: float) -> int:
+        """Estimate the q-quantile as the bound of the bucket it falls in."""
+        if self.count == 0:
+            return 0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+
+class EndpointStats:
+    def __init__(self):
+        self.phases: Dict[str, Histogram] = {}
+        self.requests = 0
+        self.errors = 0
+        self.request_bytes = 0
+        self.response_bytes = 0
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _seconds(value_us: int) -> str:
+    return repr(value_us / 1_000_000)
+
+
+class APIMetrics:
+    def __init__(self):
+        self._endpoints: Dict[Tuple[str, str], EndpointStats] = {}
+
+    def observe(
+        self,
+        method: str,
+        path: str,
+        timings: Dict[str, float],
+        *,
+        error: bool,
+        request_bytes: int,
+        response_bytes: int,
+    ) -> None:
+        """Record one request.
+
+        timings maps phase names to durations in seconds.
+        """
+        stats = self._endpoints.get((method, path))
+        if stats is None:
+            stats = self._endpoints[(method, path)] = EndpointStats()
+        stats.requests += 1
+        if error:
+            stats.errors += 1
+        stats.request_bytes += request_bytes
+        stats.response_bytes += response_bytes
+        for phase, duration in timings.items():
+            histogram = stats.phases.get(phase)
+            if histogram is None:
+                histogram = stats.phases[phase] = Histogram()
+            histogram.observe(int(duration * 1_000_000))
+
+    def _sorted(self):
+        return sorted(self._endpoints.items(), key=lambda item: (item[0][1], item[0]))
+
+    def to_api(self) -> List[EndpointMetrics]:
+        r = []
+        for (method, path), stats in self._sorted():
+            r.append(
+                EndpointMetrics(
+                    method=method,
+                    path=path,
+                    requests=stats.requests,
+                    errors=stats.errors,
+                    request_bytes=stats.request_bytes,
+                    response_bytes=stats.response_bytes,
+                    phases=[
+                        stats.phases[phase].to_api(phase)
+                        for phase in PHASES
+                        if phase in stats.phases
+                    ],
+                )
+            )
+        return r
+
+    def prometheus(self) -> str:
+        """Return the metrics in the Prometheus text exposition format."""
+        lines = [
+            "# HELP subiquity_api_phase_seconds "
+            "Time spent handling API requests, by phase.",
+            "# TYPE subiquity_api_phase_seconds histogram",
+        ]
+        counters = {
+            "requests": ("Number of API requests.", lambda s: s.requests),
+            "errors": ("Number of API requests that failed.", lambda s: s.errors),
+            "request_bytes": (
+                "Size of API request bodies.",
+                lambda s: s.request_bytes,
+            ),
+            "response_bytes": (
+                "Size of API response bodies.",
+                lambda s: s.response_bytes,
+            ),
+        }
+        endpoints = self._sorted()
+        for (method, path), stats in endpoints:
+            labels = 'method="{}",path="{}"'.format(
+                _escape_label(method), _escape_label(path)
+            )
+            for phase in PHASES:
+                histogram = stats.phases.get(phase)
+                if histogram is None:
+                    continue
+                phase_labels = f'{labels},phase="{phase}"'
+                cumulative = 0
+                for bound, count in zip(histogram.bounds, histogram.counts):
+                    cumulative += count
+                    lines.append(
+                        f"subiquity_api_phase_seconds_bucket"
+                        f'{{{phase_labels},le="{_seconds(bound)}"}} {cumulative}'
+                    )
+                lines.append(
+                    f"subiquity_api_phase_seconds_bucket"
+                    f'{{{phase_labels},le="+Inf"}} {histogram.count}'
+                )
+                lines.append(
+                    f"subiquity_api_phase_seconds_sum{{{phase_labels}}} "
+                    f"{_seconds(histogram.sum)}"
+                )
+                lines.append(
+                    f"subiquity_api_phase_seconds_count{{{phase_labels}}} "
+                    f"{histogram.count}"
+                )
+        for name, (help, getter) in counters.items():
+            lines.append(f"# HELP subiquity_api_{name}_total {help}")
+            lines.append(f"# TYPE subiquity_api_{name}_total counter")
+            for (method, path), stats in endpoints:
+                labels = 'method="{}",path="{}"'.format(
+                    _escape_label(method), _escape_label(path)
+                )
+                lines.append(f"subiquity_api_{name}_total{{{labels}}} {getter(stats)}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self, limit=20) -> str:
+        """Return a short human readable summary of the slowest endpoints.
+
+        This is attached to crash reports.
+        """
+        totals = [
+            (stats.phases["total"], method, path, stats)
+            for (method, path), stats in self._endpoints.items()
+            if "total" in stats.phases
+        ]
+        totals.sort(key=lambda t: t[0].sum, reverse=True)
+        lines = []
+        for total, method, path, stats in totals[:limit]:
+            phases = " ".join(
+                "{}={:.3f}s".format(phase, stats.phases[phase].sum / 1_000_000)
+                for phase in PHASES[:-1]
+                if phase in stats.phases
+            )
+            lines.append(
+                "{} {}: n={} errors={} total={:.3f}s p50<={:.3f}s p99<={:.3f}s "
+                "max={:.3f}s {}".format(
+                    method,
+                    path,
+                    stats.requests,
+                    stats.errors,
+                    total.sum / 1_000_000,
+                    total.quantile(0.5) / 1_000_000,
+                    total.quantile(0.99) / 1_000_000,
+                    total.max / 1_000_000,
+                    phases,
+                )
+            )
+        return "\n".join(lines)
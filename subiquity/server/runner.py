@@ -14,19 +14,183 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import asyncio
+import json
+import logging
 import os
+import re
 import subprocess
+import time
 from contextlib import suppress
-from typing import List, Optional
+from typing import Dict, List, Optional
 
+import attr
+
+from subiquitycore.context import Context
+from subiquitycore.file_util import write_file
 from subiquitycore.utils import astart_command
 
+log = logging.getLogger("subiquity.server.runner")
+
+
+@attr.s(auto_attribs=True)
+class ResourceUsage:
+    """Resources used by a command run by a LoggedCommandRunner.
+
+    wall_time is measured by the runner, the others come from the
+    summary systemd-run prints for the transient unit and are None if
+    it is not available.
+    """
+
+    label: str
+    wall_time: float
+    cpu_time: Optional[float] = None
+    memory_peak: Optional[int] = None
+    io_read_bytes: Optional[int] = None
+    io_write_bytes: Optional[int] = None
+
+
+_TIMESPAN_UNITS = {
+    "us": 1e-6,
+    "ms": 1e-3,
+    "s": 1,
+    "min": 60,
+    "h": 60 * 60,
+    "d": 24 * 60 * 60,
+}
+_TIMESPAN_RE = re.compile(r"([0-9.]+)(us|ms|s|min|h|d)$")
+_BYTES_RE = re.compile(r"([0-9.]+)([BKMGTPE])$")
+
+_SUMMARY_FIELDS = {
+    "CPU time consumed": ("cpu_time", "timespan"),
+    "Memory peak": ("memory_peak", "bytes"),
+    "IO bytes read": ("io_read_bytes", "bytes"),
+    "IO bytes written": ("io_write_bytes", "bytes"),
+}
+
+
+def _parse_timespan(text: str) -> Optional[float]:
+    # As formatted by systemd's format_timespan, e.g. "1min 2.345s".
+    total = 0.0
+    for part in text.split():
+        m = _TIMESPAN_RE.match(part)
+        if m is None:
+            return None
+        total += float(m.group(1)) * _TIMESPAN_UNITS[m.group(2)]
+    return total
+
+
+def _parse_bytes(text: str) -> Optional[int]:
+    # As formatted by systemd's format_bytes, e.g. "512B" or "1.5M".
+    m = _BYTES_RE.match(text.strip())
+    if m is None:
+        return None
+    return int(float(m.group(1)) * 1024 ** "BKMGTPE".index(m.group(2)))
+
+
+def parse_systemd_run_summary(stderr) -> Dict[str, object]:
+    """Parse the resource usage systemd-run --wait prints on exit."""
+    if stderr is None:
+        return {}
+    if isinstance(stderr, bytes):
+        # The summary is the last thing printed.
+        stderr = stderr[-4096:].decode("utf-8", "replace")
+    r = {}
+    for line in stderr.splitlines():
+        key, sep, value = line.partition(": ")
+        if not sep or key not in _SUMMARY_FIELDS:
+            continue
+        field, kind = _SUMMARY_FIELDS[key]
+        if kind == "timespan":
+            parsed = _parse_timespan(value)
+        else:
+            parsed = _parse_bytes(value)
+        if parsed is not None:
+            r[field] = parsed
+    return r
+
+
+def command_label(cmd: List[str]) -> str:
+    """Return a short description of cmd to aggregate resource usage by.
+
+    For example "python3 -m curtin --showtrace in-target -t /target --
+    apt-get install foo" becomes "curtin in-target apt-get".
+    """
+    args = list(cmd)
+    if os.path.basename(args[0]).startswith("python") and len(args) > 1:
+        if args[1] == "-m" and len(args) > 2:
+            args = args[2:]
+        elif not args[1].startswith("-"):
+            args = args[1:]
+    label = os.path.basename(args[0])
+    if label == "curtin":
+        it = iter(args[1:])
+        for arg in it:
+            if arg in ("--set", "-c", "--config"):
+                next(it, None)
+            elif not arg.startswith("-"):
+                label += " " + arg
+                break
+    if "--" in args[:-1]:
+        label += " " + os.path.basename(args[args.index("--") + 1])
+    return label
+
+
+class CommandProfile:
+    """Aggregate the resource usage of commands by label.
+
+    If path is not None, a summary is written there, as JSON, each time
+    a command finishes.
+    """
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = path
+        self.totals: Dict[str, Dict[str, object]] = {}
+
+    def add(self, usage: ResourceUsage) -> None:
+        total = self.totals.get(usage.label)
+        if total is None:
+            total = self.totals[usage.label] = {
+                "label": usage.label,
+                "count": 0,
+                "wall_time": 0.0,
+                "cpu_time": None,
+                "memory_peak": None,
+                "io_read_bytes": None,
+                "io_write_bytes": None,
+            }
+        total["count"] += 1
+        total["wall_time"] += usage.wall_time
+        for field in "cpu_time", "io_read_bytes", "io_write_bytes":
+            value = getattr(usage, field)
+            if value is not None:
+                total[field] = (total[field] or 0) + value
+        if usage.memory_peak is not None:
+            total["memory_peak"] = max(total["memory_peak"] or 0, usage.memory_peak)
+        if self.path is not None:
+            self.write()
+
+    def summary(self) -> List[Dict[str, object]]:
+        return sorted(self.totals.values(), key=lambda t: t["wall_time"], reverse=True)
+
+    def write(self) -> None:
+        try:
+            write_file(self.path, json.dumps(self.summary(), indent=2))
+        except OSError:
+            log.exception("writing command profile to %s failed", self.path)
+
 
 class LoggedCommandRunner:
     """Class that executes commands using systemd-run."""
 
-    def __init__(self, ident, *, use_systemd_user: Optional[bool] = None) -> None:
+    def __init__(
+        self,
+        ident,
+        *,
+        use_systemd_user: Optional[bool] = None,
+        profile_path: Optional[str] = None,
+    ) -> None:
         self.ident = ident
+        self.profile = CommandProfile(profile_path)
         self.env_allowlist = [
             "PATH",
             "PYTHONPATH",
@@ -53,6 +217,10 @@ class LoggedCommandRunner:
         ]
         if private_mounts:
             prefix.extend(("--property", "PrivateMounts=yes"))
+        # Make sure systemd-run reports the resources used by the command
+        # when it exits, see parse_systemd_run_summary.
+        for prop in "CPUAccounting", "MemoryAccounting", "IOAccounting":
+            prefix.extend(("--property", f"{prop}=yes"))
         if self.use_systemd_user:
             prefix.append("--user")
         if capture:
@@ -75,21 +243,44 @@ class LoggedCommandRunner:
         *,
         private_mounts: bool = False,
         capture: bool = False,
+        context: Optional[Context] = None,
         **astart_kwargs,
     ) -> asyncio.subprocess.Process:
+        """Start cmd.
+
+        If context is passed, the resources used by the command are
+        stored in it under "resource-usage" when the command is waited
+        for.
+        """
+        start_time = time.monotonic()
         forged: List[str] = self._forge_systemd_cmd(
             cmd, private_mounts=private_mounts, capture=capture
         )
         proc = await astart_command(forged, **astart_kwargs)
         proc.args = forged
+        proc.label = command_label(cmd)
+        proc.context = context
+        proc.start_time = start_time
         return proc
 
+    def _record_usage(self, proc: asyncio.subprocess.Process, stderr) -> None:
+        usage = ResourceUsage(
+            label=proc.label,
+            wall_time=time.monotonic() - proc.start_time,
+            **parse_systemd_run_summary(stderr),
+        )
+        log.debug("resource usage of %s: %s", proc.args, usage)
+        if proc.context is not None:
+            proc.context.set("resource-usage", usage)
+        self.profile.add(usage)
+
     async def wait(
         self, proc: asyncio.subprocess.Process
     ) -> subprocess.CompletedProcess:
         stdout, stderr = await proc.communicate()
         # .communicate() forces returncode to be set to a value
         assert proc.returncode is not None
+        self._record_usage(proc, stderr)
         if proc.returncode != 0:
             raise subprocess.CalledProcessError(
                 proc.returncode, proc.args, output=stdout, stderr=stderr
@@ -106,9 +297,16 @@ class LoggedCommandRunner:
 
 class DryRunCommandRunner(LoggedCommandRunner):
     def __init__(
-        self, ident, delay, *, use_systemd_user: Optional[bool] = None
+        self,
+        ident,
+        delay,
+        *,
+        use_systemd_user: Optional[bool] = None,
+        profile_path: Optional[str] = None,
     ) -> None:
-        super().__init__(ident, use_systemd_user=use_systemd_user)
+        super().__init__(
+            ident, use_systemd_user=use_systemd_user, profile_path=profile_path
+        )
         self.delay = delay
 
     def _forge_systemd_cmd(
@@ -138,18 +336,28 @@ class DryRunCommandRunner(LoggedCommandRunner):
         *,
         private_mounts: bool = False,
         capture: bool = False,
+        context: Optional[Context] = None,
         **astart_kwargs,
     ) -> asyncio.subprocess.Process:
         delay = self._get_delay_for_cmd(cmd)
         proc = await super().start(
-            cmd, private_mounts=private_mounts, capture=capture, **astart_kwargs
+            cmd,
+            private_mounts=private_mounts,
+            capture=capture,
+            context=context,
+            **astart_kwargs,
         )
         await asyncio.sleep(delay)
         return proc
 
 
 def get_command_runner(app):
+    profile_path = os.path.join(
+        app.root, "var/log/installer/subiquity-command-profile.json"
+    )
     if app.opts.dry_run:
-        return DryRunCommandRunner(app.log_syslog_id, 2 / app.scale_factor)
+        return DryRunCommandRunner(
+            app.log_syslog_id, 2 / app.scale_factor, profile_path=profile_path
+        )
     else:
-        return LoggedCommandRunner(app.log_syslog_id)
+        return LoggedCommandRunner(app.log_syslog_id, profile_path=profile_path)
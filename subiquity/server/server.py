@@ -14,13 +14,13 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import asyncio
+import json
 import logging
 import os
 import sys
 import time
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
-import jsonschema
 import yaml
 from aiohttp import web
 from cloudinit.config.cc_set_passwords import rand_user_password
@@ -30,10 +30,12 @@ from subiquity.cloudinit import get_host_combined_cloud_config
 from subiquity.common.api.server import bind, controller_for_request
 from subiquity.common.apidef import API
 from subiquity.common.errorreport import ErrorReporter, ErrorReportKind
+from subiquity.common.schema import schema_registry
 from subiquity.common.serialize import to_json
 from subiquity.common.types import (
     ApplicationState,
     ApplicationStatus,
+    EndpointMetrics,
     ErrorReportRef,
     KeyFingerprint,
     LiveSessionSSHInfo,
@@ -43,17 +45,24 @@ from subiquity.models.subiquity import ModelNames, SubiquityModel
 from subiquity.server.controller import SubiquityController
 from subiquity.server.dryrun import DRConfig
 from subiquity.server.errors import ErrorController
-from subiquity.server.geoip import DryRunGeoIPStrategy, GeoIP, HTTPGeoIPStrategy
+from subiquity.server.geoip import (
+    CheckState,
+    DryRunGeoIPStrategy,
+    GeoIP,
+    HTTPGeoIPStrategy,
+)
+from subiquity.server.metrics import APIMetrics
 from subiquity.server.pkghelper import get_package_installer
 from subiquity.server.runner import get_command_runner
 from subiquity.server.snapdapi import make_api_client
 from subiquity.server.types import InstallerChannels
+from subiquity.server.ubuntu_drivers import HardwareEnablementScanner
 from subiquitycore.async_helpers import run_bg_task, run_in_thread
 from subiquitycore.context import with_context
 from subiquitycore.core import Application
 from subiquitycore.file_util import copy_file_if_exists, write_file
 from subiquitycore.prober import Prober
-from subiquitycore.snapd import AsyncSnapd, SnapdConnection, get_fake_connection
+from subiquitycore.snapd import AsyncSnapd, AsyncSnapdConnection, get_fake_connection
 from subiquitycore.ssh import host_key_fingerprints, user_key_fingerprints
 from subiquitycore.utils import arun_command, run_command
 
@@ -63,6 +72,13 @@ iso_autoinstall_path = "cdrom/autoinstall.yaml"
 root_autoinstall_path = "autoinstall.yaml"
 cloud_autoinstall_path = "run/subiquity/cloud.autoinstall.yaml"
 
+# Bump this whenever the content of the warm restart snapshot changes in
+# an incompatible way.
+WARM_RESTART_VERSION = 1
+# A snapshot older than this is not trusted: the system had plenty of
+# time to change under our feet.
+WARM_RESTART_MAX_AGE = 600
+
 log = logging.getLogger("subiquity.server.server")
 
 
@@ -73,12 +89,16 @@ class MetaController:
         self.free_only = False
 
     async def status_GET(
-        self, cur: Optional[ApplicationState] = None
+        self, cur: Optional[ApplicationState] = None, since: Optional[int] = None
     ) -> ApplicationStatus:
-        if cur == self.app.state:
-            await self.app.state_event.wait()
+        version, state = self.app.state_version, self.app.state
+        if since is not None:
+            version, state = await self.app.wait_for_state_after(since)
+        elif cur == state:
+            version, state = await self.app.wait_for_state_after(version)
         return ApplicationStatus(
-            state=self.app.state,
+            state=state,
+            version=version,
             confirming_tty=self.app.confirming_tty,
             error=self.app.fatal_error,
             cloud_init_ok=self.app.cloud_init_ok,
@@ -145,6 +165,9 @@ class MetaController:
     async def free_only_GET(self) -> bool:
         return self.free_only
 
+    async def metrics_GET(self) -> List[EndpointMetrics]:
+        return self.app.api_metrics.to_api()
+
     async def free_only_POST(self, enable: bool) -> None:
         self.free_only = enable
         to_disable = {"restricted", "multiverse"}
@@ -279,7 +302,9 @@ class SubiquityServer(Application):
         self.set_source_variant(self.supported_variants[0])
         self.block_log_dir = block_log_dir
         self.cloud_init_ok = None
-        self.state_event = asyncio.Event()
+        # state_history[i] is the state with version i + 1.
+        self.state_history: List[ApplicationState] = []
+        self._state_changed = asyncio.get_running_loop().create_future()
         self.update_state(ApplicationState.STARTING_UP)
         self.interactive = None
         self.confirming_tty = ""
@@ -294,6 +319,7 @@ class SubiquityServer(Application):
         self.log_syslog_id = "subiquity_log.{}".format(os.getpid())
         self.command_runner = get_command_runner(self)
         self.package_installer = get_package_installer(self)
+        self.hwe_scanner = HardwareEnablementScanner(self)
 
         self.error_reporter = ErrorReporter(
             self.context.child("ErrorReporter"), self.opts.dry_run, self.root
@@ -308,7 +334,7 @@ class SubiquityServer(Application):
             self.snapd = AsyncSnapd(connection)
             self.snapdapi = make_api_client(self.snapd)
         elif os.path.exists(self.snapd_socket_path):
-            connection = SnapdConnection(self.root, self.snapd_socket_path)
+            connection = AsyncSnapdConnection(self.root, self.snapd_socket_path)
             self.snapd = AsyncSnapd(connection)
             self.snapdapi = make_api_client(self.snapd)
         else:
@@ -316,6 +342,7 @@ class SubiquityServer(Application):
             self.snapd = None
         self.note_data_for_apport("SnapUpdated", str(self.updated))
         self.event_listeners = []
+        self.api_metrics = APIMetrics()
         self.autoinstall_config = None
         self.hub.subscribe(InstallerChannels.NETWORK_UP, self._network_change)
         self.hub.subscribe(InstallerChannels.NETWORK_PROXY_SET, self._proxy_set)
@@ -330,9 +357,87 @@ class SubiquityServer(Application):
         self.variant = variant
 
     def load_serialized_state(self):
+        self.state_store.load()
         for controller in self.controllers.instances:
             controller.load_state()
 
+    def _boot_id(self) -> Optional[str]:
+        try:
+            with open("/proc/sys/kernel/random/boot_id") as fp:
+                return fp.read().strip()
+        except OSError:
+            return None
+
+    def save_warm_restart_snapshot(self):
+        """Save the expensive state of this server for the one that will
+        replace it, see load_warm_restart_snapshot."""
+        controllers = {}
+        for controller in self.controllers.instances:
+            try:
+                data = controller.warm_restart_snapshot()
+            except Exception:
+                log.exception("snapshotting %s failed", controller.name)
+                continue
+            if data is not None:
+                controllers[controller.name] = data
+        geoip = None
+        if self.geoip.check_state == CheckState.DONE:
+            geoip = {"cc": self.geoip.countrycode, "tz": self.geoip.timezone}
+        snapshot = {
+            "version": WARM_RESTART_VERSION,
+            "boot_id": self._boot_id(),
+            "time": time.time(),
+            "geoip": geoip,
+            "controllers": controllers,
+        }
+        try:
+            write_file(self.state_path("warm-restart.json"), json.dumps(snapshot))
+        except (OSError, TypeError, ValueError):
+            log.exception("saving warm restart snapshot failed")
+
+    def load_warm_restart_snapshot(self):
+        """Hand the state saved by save_warm_restart_snapshot before a
+        restart back to the controllers.
+
+        The snapshot is used at most once, and only if it was written
+        recently, during the same boot, by a compatible server.
+        """
+        path = self.state_path("warm-restart.json")
+        try:
+            with open(path) as fp:
+                snapshot = json.load(fp)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError):
+            log.exception("reading warm restart snapshot failed")
+            snapshot = None
+        os.unlink(path)
+        if not isinstance(snapshot, dict):
+            return
+        if snapshot.get("version") != WARM_RESTART_VERSION:
+            log.debug("ignoring warm restart snapshot from another version")
+            return
+        if snapshot.get("boot_id") != self._boot_id():
+            log.debug("ignoring warm restart snapshot from another boot")
+            return
+        age = time.time() - snapshot.get("time", 0)
+        if not 0 <= age <= WARM_RESTART_MAX_AGE:
+            log.debug("ignoring warm restart snapshot from %ss ago", age)
+            return
+        log.debug("restoring warm restart snapshot from %.1fs ago", age)
+        geoip = snapshot.get("geoip")
+        if geoip is not None:
+            self.geoip.restore(geoip["cc"], geoip["tz"])
+        for controller in self.controllers.instances:
+            if controller.name not in snapshot["controllers"]:
+                continue
+            try:
+                controller.restore_warm_restart_snapshot(
+                    snapshot["controllers"][controller.name]
+                )
+            except Exception:
+                log.exception("restoring %s failed", controller.name)
+
     def add_event_listener(self, listener):
         self.event_listeners.append(listener)
 
@@ -380,11 +485,35 @@ class SubiquityServer(Application):
     def state(self):
         return self._state
 
+    @property
+    def state_version(self) -> int:
+        return len(self.state_history)
+
     def update_state(self, state):
         self._state = state
-        write_file(self.state_path("server-state"), state.name)
-        self.state_event.set()
-        self.state_event.clear()
+        self.state_history.append(state)
+        self.file_writer.write_file(self.state_path("server-state"), state.name)
+        # One future wakes up all the waiters, and a new one is in place
+        # before any of them runs.
+        changed, self._state_changed = (
+            self._state_changed,
+            asyncio.get_running_loop().create_future(),
+        )
+        changed.set_result(None)
+
+    async def wait_for_state_after(self, version: int) -> Tuple[int, ApplicationState]:
+        """Return (version, state) for the first state entered after the
+        one with the given version, waiting for it if needed.
+
+        A version from before a restart of the server may be ahead of
+        the current one, in which case the current state is returned.
+        """
+        version = max(version, 0)
+        if version >= self.state_version:
+            if version > self.state_version:
+                return self.state_version, self.state
+            await asyncio.shield(self._state_changed)
+        return version + 1, self.state_history[version]
 
     def note_file_for_apport(self, key, path):
         self.error_reporter.note_file_for_apport(key, path)
@@ -393,6 +522,7 @@ class SubiquityServer(Application):
         self.error_reporter.note_data_for_apport(key, value)
 
     def make_apport_report(self, kind, thing, *, wait=False, **kw):
+        kw.setdefault("APILatencySummary", self.api_metrics.summary())
         return self.error_reporter.make_apport_report(kind, thing, wait=wait, **kw)
 
     async def _run_error_cmds(self, report):
@@ -424,8 +554,32 @@ class SubiquityServer(Application):
             self.running_error_commands = True
             run_bg_task(self._run_error_cmds(report))
 
+    async def metrics_prometheus(self, request):
+        return web.Response(
+            text=self.api_metrics.prometheus(),
+            content_type="text/plain",
+            headers={"x-status": "ok"},
+        )
+
+    def _observe_request(self, request, resp, start):
+        route = request.match_info.route
+        if route.resource is None:
+            return
+        timings = dict(request.get("timings", {}))
+        timings["total"] = time.monotonic() - start
+        body = resp.body
+        self.api_metrics.observe(
+            request.method,
+            route.resource.canonical,
+            timings,
+            error=resp.status >= 400,
+            request_bytes=request.content_length or 0,
+            response_bytes=len(body) if isinstance(body, bytes) else 0,
+        )
+
     @web.middleware
     async def middleware(self, request, handler):
+        start = time.monotonic()
         override_status = None
         controller = await controller_for_request(request)
         if isinstance(controller, SubiquityController):
@@ -439,6 +593,7 @@ class SubiquityServer(Application):
             resp = web.Response(headers={"x-status": override_status})
         else:
             resp = await handler(request)
+        self._observe_request(request, resp, start)
         if self.updated:
             resp.headers["x-updated"] = "yes"
         else:
@@ -481,7 +636,7 @@ class SubiquityServer(Application):
             self.controllers.Reporting.start()
             self.controllers.Error.setup_autoinstall()
             with self.context.child("core_validation", level="INFO"):
-                jsonschema.validate(self.autoinstall_config, self.base_schema)
+                schema_registry.validate(self.autoinstall_config, self.base_schema)
             self.controllers.Early.setup_autoinstall()
         else:
             for controller in self.controllers.instances:
@@ -490,6 +645,7 @@ class SubiquityServer(Application):
     async def start_api_server(self):
         app = web.Application(middlewares=[self.middleware])
         bind(app.router, API.meta, MetaController(self))
+        app.router.add_get("/meta/metrics/prometheus", self.metrics_prometheus)
         bind(app.router, API.errors, ErrorController(self))
         if self.opts.dry_run:
             from .dryrun import DryRunController
@@ -665,10 +821,19 @@ class SubiquityServer(Application):
         else:
             self.installer_user_passwd_kind = PasswordKind.NONE
 
+    def warm_up(self):
+        for controller in self.controllers.instances:
+            try:
+                controller.warm_up()
+            except Exception:
+                log.exception("warming up %s failed", controller.name)
+
     async def start(self):
         self.controllers.load_all()
         await self.start_api_server()
         self.update_state(ApplicationState.CLOUD_INIT_WAIT)
+        self.load_warm_restart_snapshot()
+        self.warm_up()
         await self.wait_for_cloudinit()
         self.set_installer_password()
         self.autoinstall = self.select_autoinstall()
@@ -682,6 +847,10 @@ class SubiquityServer(Application):
                 await asyncio.sleep(1)
                 await self.controllers.Early.run()
                 open(stamp_file, "w").close()
+                # early-commands can change the disks of the system out
+                # from under a probe started by warm_up().
+                if self.prober is not None:
+                    self.prober.discard_speculative_storage()
                 await asyncio.sleep(1)
         self.load_autoinstall_config(only_early=False)
         if self.autoinstall_config:
@@ -722,6 +891,8 @@ class SubiquityServer(Application):
                 "-m",
                 "subiquity.cmd.server",
             ] + sys.argv[1:]
+        self.save_warm_restart_snapshot()
+        self.state_store.flush_sync()
         os.execvp(cmdline[0], cmdline)
 
     def make_autoinstall(self):
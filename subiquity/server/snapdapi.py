@@ -17,7 +17,8 @@ import asyncio
 import contextlib
 import enum
 import logging
-from typing import Dict, List, Optional
+import weakref
+from typing import Dict, List, Optional, Set
 
 import aiohttp
 import attr
@@ -266,7 +267,10 @@ class SnapdAPI:
                     ...
 
 
-class _FakeResponse:
+class _SnapdResponse:
+    # The response object make_client expects. AsyncSnapd has already
+    # decoded the body and raised for HTTP errors.
+
     def __init__(self, data):
         self.data = data
 
@@ -277,7 +281,7 @@ class _FakeResponse:
         return self.data
 
 
-class _FakeError:
+class _SnapdError:
     def __init__(self, data):
         self.data = data
 
@@ -286,11 +290,10 @@ class _FakeError:
 
 
 def make_api_client(async_snapd):
-    # subiquity.common.api.client is designed around how to make requests
-    # with aiohttp's client code, not the AsyncSnapd API but with a bit of
-    # effort it can be contorted into shape. Clearly it would be better to
-    # use aiohttp to talk to snapd but that would require porting across
-    # the fake implementation used in dry-run mode.
+    # subiquity.common.api.client is designed around aiohttp's client
+    # responses. AsyncSnapd already talks to snapd with aiohttp (or to
+    # the dry-run fake) and hands back decoded JSON, so all that is left
+    # to do here is unwrap snapd's response envelope.
 
     @contextlib.asynccontextmanager
     async def make_request(method, path, *, params, json):
@@ -300,12 +303,11 @@ def make_api_client(async_snapd):
             content = await async_snapd.post(path[1:], json, **params)
         response = snapd_serializer.deserialize(Response, content)
         if response.type == ResponseType.SYNC:
-            content = content["result"]
+            yield _SnapdResponse(content["result"])
         elif response.type == ResponseType.ASYNC:
-            content = content["change"]
-        elif response.type == ResponseType.ERROR:
-            yield _FakeError()
-        yield _FakeResponse(content)
+            yield _SnapdResponse(content["change"])
+        else:
+            yield _SnapdError(content)
 
     return make_client(SnapdAPI, make_request, serializer=snapd_serializer)
 
@@ -313,14 +315,137 @@ def make_api_client(async_snapd):
 snapd_serializer = Serializer(ignore_unknown_fields=True, serialize_enums_by="value")
 
 
+def _change_state(change: Change):
+    return (
+        change.status,
+        [(task.status, task.progress.done) for task in change.tasks],
+    )
+
+
+def _change_finished(change: Change):
+    return change.ready or change.status in (TaskStatus.DONE, TaskStatus.ERROR)
+
+
+class ChangeWatcher:
+    """Follow the progress of snapd changes.
+
+    A single task polls every change being watched, concurrently, and
+    keeps the latest state of each. The interval between polls doubles
+    up to max_interval while none of the changes make progress and goes
+    back to initial_interval as soon as one does (or a new change is
+    watched).
+    """
+
+    initial_interval = 0.1
+    max_interval = 2.0
+
+    def __init__(self, client):
+        self.client = client
+        self.changes: Dict[ChangeID, Change] = {}
+        self._watched: Set[ChangeID] = set()
+        self._waiters: Dict[ChangeID, List[asyncio.Future]] = {}
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def watch(self, change_id: ChangeID) -> None:
+        change = self.changes.get(change_id)
+        if change is not None and _change_finished(change):
+            return
+        self._watched.add(change_id)
+        self._wake.set()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def wait(self, change_id: ChangeID) -> Change:
+        """Wait for change_id to finish and return its final state."""
+        change = self.changes.get(change_id)
+        if change is not None and _change_finished(change):
+            return change
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(change_id, []).append(fut)
+        self.watch(change_id)
+        try:
+            return await fut
+        finally:
+            waiters = self._waiters.get(change_id, [])
+            if fut in waiters:
+                waiters.remove(fut)
+
+    async def current(self, change_id: ChangeID) -> Change:
+        """Return the latest state of change_id.
+
+        Changes that are being watched are answered from the state
+        fetched by the polling task; anything else is fetched from
+        snapd.
+        """
+        change = self.changes.get(change_id)
+        if change is not None and (
+            change_id in self._watched or _change_finished(change)
+        ):
+            return change
+        change = self.changes[change_id] = await self.client.v2.changes[change_id].GET()
+        return change
+
+    def _resolve(self, change_id, *, change=None, exc=None):
+        self._watched.discard(change_id)
+        for fut in self._waiters.pop(change_id, []):
+            if fut.done():
+                continue
+            if exc is not None:
+                fut.set_exception(exc)
+            else:
+                fut.set_result(change)
+
+    async def _poll(self, change_id) -> bool:
+        try:
+            change = await self.client.v2.changes[change_id].GET()
+        except Exception as exc:
+            log.debug("polling change %s failed: %s", change_id, exc)
+            self._resolve(change_id, exc=exc)
+            return False
+        previous = self.changes.get(change_id)
+        self.changes[change_id] = change
+        if _change_finished(change):
+            self._resolve(change_id, change=change)
+            return True
+        return previous is None or _change_state(previous) != _change_state(change)
+
+    async def _run(self):
+        interval = self.initial_interval
+        while self._watched:
+            self._wake.clear()
+            progressed = await asyncio.gather(
+                *[self._poll(change_id) for change_id in list(self._watched)]
+            )
+            if not self._watched:
+                break
+            if any(progressed):
+                interval = self.initial_interval
+            else:
+                interval = min(interval * 2, self.max_interval)
+            try:
+                await asyncio.wait_for(self._wake.wait(), interval)
+            except asyncio.TimeoutError:
+                pass
+            else:
+                interval = self.initial_interval
+
+
+_change_watchers = weakref.WeakKeyDictionary()
+
+
+def get_change_watcher(client) -> ChangeWatcher:
+    watcher = _change_watchers.get(client)
+    if watcher is None:
+        watcher = _change_watchers[client] = ChangeWatcher(client)
+    return watcher
+
+
 async def post_and_wait(client, meth, *args, **kw):
     change_id = await meth(*args, **kw)
     log.debug("post_and_wait %s", change_id)
 
-    while True:
-        result = await client.v2.changes[change_id].GET()
-        if result.status == TaskStatus.DONE:
-            return result.data
-        elif result.status == TaskStatus.ERROR:
-            raise aiohttp.ClientError(result.err)
-        await asyncio.sleep(0.1)
+    change = await get_change_watcher(client).wait(change_id)
+    if change.status == TaskStatus.DONE:
+        return change.data
+    raise aiohttp.ClientError(change.err or change.status.value)
@@ -13,11 +13,16 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import asyncio
+import base64
+import binascii
 import enum
+import hashlib
 import logging
 import os
+import struct
 import subprocess
-from typing import List
+from typing import List, Optional, Tuple
 
 from subiquity.common.types import SSHFetchIdStatus
 from subiquitycore.utils import arun_command
@@ -25,6 +30,74 @@ from subiquitycore.utils import arun_command
 log = logging.getLogger("subiquity.server.ssh")
 
 
+# Maps the key types ssh-keygen -l is commonly asked about to the name
+# it reports them under. Anything else (certificates, security keys,
+# ...) is left to ssh-keygen itself.
+_KEY_TYPE_NAMES = {
+    "ssh-rsa": "RSA",
+    "ssh-dss": "DSA",
+    "ssh-ed25519": "ED25519",
+    "ecdsa-sha2-nistp256": "ECDSA",
+    "ecdsa-sha2-nistp384": "ECDSA",
+    "ecdsa-sha2-nistp521": "ECDSA",
+}
+
+_ECDSA_CURVE_BITS = {
+    "nistp256": 256,
+    "nistp384": 384,
+    "nistp521": 521,
+}
+
+
+def _read_string(blob: bytes, offset: int) -> Tuple[bytes, int]:
+    (length,) = struct.unpack_from(">I", blob, offset)
+    offset += 4
+    if offset + length > len(blob):
+        raise ValueError("truncated key blob")
+    return blob[offset : offset + length], offset + length
+
+
+def _key_bits(key_type: str, blob: bytes) -> int:
+    blob_type, offset = _read_string(blob, 0)
+    if blob_type.decode("ascii") != key_type:
+        raise ValueError("key type does not match key blob")
+    if key_type == "ssh-rsa":
+        # string "ssh-rsa", mpint e, mpint n
+        _e, offset = _read_string(blob, offset)
+        n, offset = _read_string(blob, offset)
+        return int.from_bytes(n, "big").bit_length()
+    elif key_type == "ssh-dss":
+        # string "ssh-dss", mpint p, mpint q, mpint g, mpint y
+        p, offset = _read_string(blob, offset)
+        return int.from_bytes(p, "big").bit_length()
+    elif key_type == "ssh-ed25519":
+        return 256
+    else:
+        # string "ecdsa-sha2-<curve>", string <curve>, string Q
+        curve, offset = _read_string(blob, offset)
+        return _ECDSA_CURVE_BITS[curve.decode("ascii")]
+
+
+def fingerprint_key(key: str) -> Optional[str]:
+    """Return the fingerprint of a public key line in the format used
+    by ssh-keygen -l, or None if the key is not one we know how to
+    handle (in which case ssh-keygen should be asked instead)."""
+    parts = key.strip().split(None, 2)
+    if len(parts) < 2 or parts[0] not in _KEY_TYPE_NAMES:
+        return None
+    key_type, b64 = parts[:2]
+    comment = parts[2] if len(parts) > 2 else "no comment"
+    try:
+        blob = base64.b64decode(b64, validate=True)
+        bits = _key_bits(key_type, blob)
+    except (binascii.Error, struct.error, UnicodeDecodeError, KeyError, ValueError):
+        return None
+    digest = base64.b64encode(hashlib.sha256(blob).digest()).decode("ascii")
+    return "{} SHA256:{} {} ({})".format(
+        bits, digest.rstrip("="), comment, _KEY_TYPE_NAMES[key_type]
+    )
+
+
 class SSHFetchError(Exception):
     def __init__(self, status: SSHFetchIdStatus, reason: str) -> None:
         self.reason = reason
@@ -33,8 +106,12 @@ class SSHFetchError(Exception):
 
 
 class SSHKeyFetcher:
+    # How many ssh-import-id processes may run at the same time.
+    fetch_concurrency = 4
+
     def __init__(self, app):
         self.app = app
+        self._fetch_semaphore = asyncio.Semaphore(self.fetch_concurrency)
 
     async def fetch_keys_for_id(self, user_id: str) -> List[str]:
         cmd = ("ssh-import-id", "--output", "-", "--", user_id)
@@ -44,7 +121,8 @@ class SSHKeyFetcher:
             env["https_proxy"] = self.app.base_model.proxy.proxy
 
         try:
-            cp = await arun_command(cmd, check=True, env=env)
+            async with self._fetch_semaphore:
+                cp = await arun_command(cmd, check=True, env=env)
         except subprocess.CalledProcessError as exc:
             log.exception("ssh-import-id failed. stderr: %s", exc.stderr)
             raise SSHFetchError(status=SSHFetchIdStatus.IMPORT_ERROR, reason=exc.stderr)
@@ -53,6 +131,9 @@ class SSHKeyFetcher:
 
     async def gen_fingerprint_for_key(self, key: str) -> str:
         """For a given key, generate the fingerprint."""
+        fingerprint = fingerprint_key(key)
+        if fingerprint is not None:
+            return fingerprint
 
         # ssh-keygen supports multiple keys at once, but it is simpler to
         # associate each key with its resulting fingerprint if we call
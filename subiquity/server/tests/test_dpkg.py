@@ -0,0 +1,125 @@
+# Copyright 2024 Canonical, Ltd.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import unittest
+
+from subiquity.server.dpkg import (
+    DpkgStatus,
+    dpkg_status_for_target,
+    iter_stanzas,
+    parse_relation_names,
+)
+from subiquitycore.tests import SubiTestCase, populate_dir
+from subiquitycore.tests.parameterized import parameterized
+
+STATUS = """\
+Package: mawk
+Status: install ok installed
+Priority: required
+Version: 1.3.4.20230730-1
+Provides: awk
+Description: Pattern scanning and text processing language
+ Mawk is an interpreter for the AWK Programming Language.
+ .
+ It is fast.
+
+Package: gawk
+Status: deinstall ok config-files
+Version: 1:5.2.1-2
+Provides: awk
+
+Package: original-awk
+Status: install ok half-configured
+Provides: awk (= 2012-12-20)
+"""
+
+
+class TestIterStanzas(unittest.TestCase):
+    def test_fields_and_continuations(self):
+        stanzas = list(iter_stanzas(STATUS.splitlines()))
+        self.assertEqual(3, len(stanzas))
+        self.assertEqual("mawk", stanzas[0]["Package"])
+        self.assertEqual(
+            "Pattern scanning and text processing language\n"
+            "Mawk is an interpreter for the AWK Programming Language.\n"
+            ".\n"
+            "It is fast.",
+            stanzas[0]["Description"],
+        )
+        self.assertEqual("1:5.2.1-2", stanzas[1]["Version"])
+
+    def test_only_requested_fields(self):
+        stanzas = list(iter_stanzas(STATUS.splitlines(), {"Package", "Provides"}))
+        self.assertEqual({"Package": "mawk", "Provides": "awk"}, stanzas[0])
+        self.assertEqual(
+            {"Package": "original-awk", "Provides": "awk (= 2012-12-20)"}, stanzas[2]
+        )
+
+    def test_blank_lines(self):
+        self.assertEqual(
+            [{"Package": "a"}, {"Package": "b"}],
+            list(iter_stanzas(["", "Package: a", "", "", "Package: b", "  "])),
+        )
+
+
+class TestParseRelationNames(unittest.TestCase):
+    @parameterized.expand(
+        (
+            ("", []),
+            ("awk", ["awk"]),
+            ("awk (= 1.0), python3:any", ["awk", "python3"]),
+            ("a | b (>= 2), c", ["a", "b", "c"]),
+        )
+    )
+    def test_names(self, value, expected):
+        self.assertEqual(expected, parse_relation_names(value))
+
+
+class TestDpkgStatus(unittest.TestCase):
+    def setUp(self):
+        self.status = DpkgStatus.from_lines(STATUS.splitlines())
+
+    def test_is_installed(self):
+        self.assertTrue(self.status.is_installed("mawk"))
+        self.assertFalse(self.status.is_installed("gawk"))
+        self.assertFalse(self.status.is_installed("original-awk"))
+        self.assertFalse(self.status.is_installed("busybox"))
+
+    def test_installed_providers(self):
+        self.assertEqual(["mawk"], self.status.installed_providers("awk"))
+        self.assertEqual([], self.status.installed_providers("mawk"))
+
+    def test_version(self):
+        self.assertEqual("1.3.4.20230730-1", self.status.packages["mawk"].version)
+
+
+class TestDpkgStatusForTarget(SubiTestCase):
+    def test_cached_until_changed(self):
+        rootfs = self.tmp_dir()
+        [path] = populate_dir(rootfs, {"var/lib/dpkg/status": STATUS})
+        first = dpkg_status_for_target(rootfs)
+        self.assertIs(first, dpkg_status_for_target(rootfs))
+
+        with open(path, "a") as fp:
+            fp.write("\nPackage: busybox\nStatus: install ok installed\n")
+        st = os.stat(path)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1))
+        second = dpkg_status_for_target(rootfs)
+        self.assertIsNot(first, second)
+        self.assertTrue(second.is_installed("busybox"))
+
+    def test_missing_status(self):
+        self.assertEqual({}, dpkg_status_for_target(self.tmp_dir()).packages)
@@ -13,10 +13,13 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+from unittest import mock
+
 import aiohttp
 from aioresponses import aioresponses
 
 from subiquity.server.geoip import GeoIP, HTTPGeoIPStrategy
+from subiquity.server.types import InstallerChannels
 from subiquitycore.tests import SubiTestCase
 from subiquitycore.tests.mocks import make_app
 
@@ -103,3 +106,23 @@ class TestGeoIPBadData(SubiTestCase):
             )
             self.assertFalse(await self.geoip.lookup())
         self.assertIsNone(self.geoip.timezone)
+
+
+class TestGeoIPRestore(SubiTestCase):
+    async def test_restored_result_used_once(self):
+        app = make_app()
+        strategy = mock.Mock()
+        strategy.get_response = mock.AsyncMock(return_value=xml)
+        geoip = GeoIP(app, strategy)
+        geoip.restore("fr", "Europe/Paris")
+        self.assertIsNone(geoip.countrycode)
+        with mock.patch.object(app.hub, "broadcast") as broadcast:
+            self.assertTrue(await geoip.lookup())
+        strategy.get_response.assert_not_called()
+        self.assertEqual("fr", geoip.countrycode)
+        self.assertEqual("Europe/Paris", geoip.timezone)
+        broadcast.assert_called_once_with(InstallerChannels.GEOIP)
+
+        self.assertTrue(await geoip.lookup())
+        strategy.get_response.assert_called_once_with()
+        self.assertEqual("us", geoip.countrycode)
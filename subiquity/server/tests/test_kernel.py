@@ -13,11 +13,43 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-import subprocess
+import pathlib
 import unittest
-from unittest import mock
 
 from subiquity.server.kernel import flavor_to_pkgname, list_installed_kernels
+from subiquitycore.tests import SubiTestCase, populate_dir
+
+STATUS_NO_KERNEL = """\
+Package: linux-firmware
+Status: install ok installed
+Provides: linux-image-firmware
+Version: 20230919.git3672ccab-0ubuntu2.1
+
+Package: linux-image-generic
+Status: install ok installed
+Version: 6.5.0.14.16
+Depends: linux-image-6.5.0-14-generic
+
+"""
+
+STATUS_ONE_KERNEL = (
+    STATUS_NO_KERNEL
+    + """\
+Package: linux-image-6.1.0-16-generic
+Status: install ok installed
+Provides: linux-image, linux-image-6.1.0-16-generic-signed (= 6.1.0-16.16)
+Version: 6.1.0-16.16
+
+"""
+)
+
+STATUS_SECOND_KERNEL = """\
+Package: linux-image-6.2.0-24-generic
+Status: install ok installed
+Provides: linux-image
+Version: 6.2.0-24.24
+
+"""
 
 
 class TestFlavorToPkgname(unittest.TestCase):
@@ -37,38 +69,37 @@ class TestFlavorToPkgname(unittest.TestCase):
         )
 
 
-class TestListInstalledKernels(unittest.IsolatedAsyncioTestCase):
+class TestListInstalledKernels(SubiTestCase):
+    def write_status(self, content):
+        rootfs = self.tmp_dir()
+        populate_dir(rootfs, {"var/lib/dpkg/status": content})
+        return pathlib.Path(rootfs)
+
     async def test_one_kernel(self):
-        rv = subprocess.CompletedProcess([], 0)
-        rv.stdout = "linux-image-6.1.0-16-generic"
-        with mock.patch(
-            "subiquity.server.kernel.arun_command", return_value=rv
-        ) as mock_arun:
-            ret = await list_installed_kernels("/")
-            self.assertEqual(["linux-image-6.1.0-16-generic"], ret)
-        mock_arun.assert_called_once()
+        rootfs = self.write_status(STATUS_ONE_KERNEL)
+        self.assertEqual(
+            ["linux-image-6.1.0-16-generic"], await list_installed_kernels(rootfs)
+        )
 
     async def test_two_kernels(self):
-        rv = subprocess.CompletedProcess([], 0)
-        rv.stdout = """\
-linux-image-6.1.0-16-generic
-linux-image-6.2.0-24-generic
-"""
-        with mock.patch(
-            "subiquity.server.kernel.arun_command", return_value=rv
-        ) as mock_arun:
-            ret = await list_installed_kernels("/")
-            self.assertEqual(
-                ["linux-image-6.1.0-16-generic", "linux-image-6.2.0-24-generic"], ret
-            )
-        mock_arun.assert_called_once()
+        rootfs = self.write_status(STATUS_ONE_KERNEL + STATUS_SECOND_KERNEL)
+        self.assertEqual(
+            ["linux-image-6.1.0-16-generic", "linux-image-6.2.0-24-generic"],
+            await list_installed_kernels(rootfs),
+        )
+
+    async def test_removed_kernel(self):
+        removed = STATUS_SECOND_KERNEL.replace(
+            "install ok installed", "deinstall ok config-files"
+        )
+        rootfs = self.write_status(STATUS_ONE_KERNEL + removed)
+        self.assertEqual(
+            ["linux-image-6.1.0-16-generic"], await list_installed_kernels(rootfs)
+        )
 
     async def test_no_kernel(self):
-        rv = subprocess.CompletedProcess([], 0)
-        rv.stdout = "\n"
-        with mock.patch(
-            "subiquity.server.kernel.arun_command", return_value=rv
-        ) as mock_arun:
-            ret = await list_installed_kernels("/")
-            self.assertEqual([], ret)
-        mock_arun.assert_called_once()
+        rootfs = self.write_status(STATUS_NO_KERNEL)
+        self.assertEqual([], await list_installed_kernels(rootfs))
+
+    async def test_no_status_file(self):
+        self.assertEqual([], await list_installed_kernels(self.tmp_dir()))
@@ -0,0 +1,106 @@
+# Copyright 2024 Canonical, Ltd.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+
+from subiquity.server.metrics import APIMetrics, Histogram
+
+
+class TestHistogram(unittest.TestCase):
+    def test_observe(self):
+        h = Histogram(bounds=[10, 100])
+        for value in 5, 10, 11, 1000:
+            h.observe(value)
+        self.assertEqual([2, 1, 1], h.counts)
+        self.assertEqual(4, h.count)
+        self.assertEqual(1026, h.sum)
+        self.assertEqual(1000, h.max)
+
+    def test_quantile(self):
+        h = Histogram(bounds=[10, 100])
+        self.assertEqual(0, h.quantile(0.5))
+        for value in 1, 2, 3, 50:
+            h.observe(value)
+        self.assertEqual(10, h.quantile(0.5))
+        self.assertEqual(50, h.quantile(0.99))
+
+
+class TestAPIMetrics(unittest.TestCase):
+    def setUp(self):
+        self.metrics = APIMetrics()
+        self.metrics.observe(
+            "GET",
+            "/storage/v2/guided",
+            {"wait": 0.5, "implementation": 0.25, "total": 0.8},
+            error=False,
+            request_bytes=0,
+            response_bytes=100,
+        )
+        self.metrics.observe(
+            "GET",
+            "/storage/v2/guided",
+            {"total": 0.002},
+            error=True,
+            request_bytes=0,
+            response_bytes=50,
+        )
+        self.metrics.observe(
+            "POST",
+            "/meta/confirm",
+            {"total": 0.001},
+            error=False,
+            request_bytes=10,
+            response_bytes=4,
+        )
+
+    def test_to_api(self):
+        confirm, guided = self.metrics.to_api()
+        self.assertEqual(("POST", "/meta/confirm"), (confirm.method, confirm.path))
+        self.assertEqual(2, guided.requests)
+        self.assertEqual(1, guided.errors)
+        self.assertEqual(150, guided.response_bytes)
+        self.assertEqual(
+            ["wait", "implementation", "total"], [p.phase for p in guided.phases]
+        )
+        total = guided.phases[-1]
+        self.assertEqual(2, total.count)
+        self.assertEqual(802_000, total.sum_us)
+        self.assertEqual(800_000, total.max_us)
+        self.assertEqual(len(total.bounds_us) + 1, len(total.counts))
+
+    def test_prometheus(self):
+        text = self.metrics.prometheus()
+        labels = 'method="GET",path="/storage/v2/guided",phase="total"'
+        self.assertIn(
+            f'subiquity_api_phase_seconds_bucket{{{labels},le="0.005"}} 1', text
+        )
+        self.assertIn(
+            f'subiquity_api_phase_seconds_bucket{{{labels},le="1.0"}} 2', text
+        )
+        self.assertIn(
+            f'subiquity_api_phase_seconds_bucket{{{labels},le="+Inf"}} 2', text
+        )
+        self.assertIn(f"subiquity_api_phase_seconds_count{{{labels}}} 2", text)
+        self.assertIn(
+            'subiquity_api_errors_total{method="GET",path="/storage/v2/guided"} 1',
+            text,
+        )
+        self.assertTrue(text.endswith("\n"))
+
+    def test_summary(self):
+        guided, confirm = self.metrics.summary().splitlines()
+        self.assertTrue(guided.startswith("GET /storage/v2/guided: n=2 errors=1"))
+        self.assertIn("wait=0.500s", guided)
+        self.assertTrue(confirm.startswith("POST /meta/confirm: n=1"))
@@ -13,11 +13,19 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import json
 import os
 import subprocess
-from unittest.mock import ANY, patch
+from unittest.mock import ANY, AsyncMock, Mock, patch
 
-from subiquity.server.runner import DryRunCommandRunner, LoggedCommandRunner
+from subiquity.server.runner import (
+    CommandProfile,
+    DryRunCommandRunner,
+    LoggedCommandRunner,
+    ResourceUsage,
+    command_label,
+    parse_systemd_run_summary,
+)
 from subiquitycore.tests import SubiTestCase
 
 
@@ -62,6 +70,12 @@ class TestLoggedCommandRunner(SubiTestCase):
             "SyslogIdentifier=my-id",
             "--property",
             "PrivateMounts=yes",
+            "--property",
+            "CPUAccounting=yes",
+            "--property",
+            "MemoryAccounting=yes",
+            "--property",
+            "IOAccounting=yes",
             "--setenv",
             "PATH=/snap/subiquity/x1/bin",
             "--setenv",
@@ -94,6 +108,12 @@ class TestLoggedCommandRunner(SubiTestCase):
             "--same-dir",
             "--property",
             "SyslogIdentifier=my-id",
+            "--property",
+            "CPUAccounting=yes",
+            "--property",
+            "MemoryAccounting=yes",
+            "--property",
+            "IOAccounting=yes",
             "--user",
             "--pipe",
             "--setenv",
@@ -113,6 +133,111 @@ class TestLoggedCommandRunner(SubiTestCase):
         expected_cmd = ANY
         astart_mock.assert_called_once_with(expected_cmd, stdout=subprocess.PIPE)
 
+    async def test_wait_records_usage(self):
+        runner = LoggedCommandRunner(ident="my-id", use_systemd_user=False)
+        context = Mock()
+        proc = AsyncMock()
+        proc.returncode = 0
+        proc.communicate.return_value = (
+            b"",
+            b"""\
+Running as unit: run-u42.service; invocation ID: 0123456789abcdef
+Finished with result: success
+Main processes terminated with: code=exited/status=0
+Service runtime: 1min 2.500s
+CPU time consumed: 1.250s
+Memory peak: 1.5M
+IO bytes read: 512B
+IO bytes written: 2.0K
+""",
+        )
+
+        with patch("subiquity.server.runner.astart_command", return_value=proc):
+            proc = await runner.start(["/bin/ls"], context=context)
+        await runner.wait(proc)
+
+        context.set.assert_called_once_with("resource-usage", ANY)
+        usage = context.set.call_args.args[1]
+        self.assertEqual("ls", usage.label)
+        self.assertEqual(1.25, usage.cpu_time)
+        self.assertEqual(1536 * 1024, usage.memory_peak)
+        self.assertEqual(512, usage.io_read_bytes)
+        self.assertEqual(2048, usage.io_write_bytes)
+        [total] = runner.profile.summary()
+        self.assertEqual(1, total["count"])
+        self.assertEqual(1.25, total["cpu_time"])
+
+    async def test_wait_no_summary(self):
+        runner = LoggedCommandRunner(ident="my-id", use_systemd_user=False)
+        proc = AsyncMock()
+        proc.returncode = 0
+        proc.communicate.return_value = (b"", None)
+
+        with patch("subiquity.server.runner.astart_command", return_value=proc):
+            proc = await runner.start(["/bin/ls"])
+        await runner.wait(proc)
+
+        [total] = runner.profile.summary()
+        self.assertIsNone(total["cpu_time"])
+        self.assertIsNone(total["memory_peak"])
+
+
+class TestResourceUsage(SubiTestCase):
+    def test_parse_systemd_run_summary(self):
+        stderr = (
+            "Service runtime: 3.001s\n"
+            "CPU time consumed: 2min 1ms\n"
+            "Memory peak: 12.0G\n"
+            "IO bytes read: not a size\n"
+        )
+        self.assertEqual(
+            {"cpu_time": 120.001, "memory_peak": 12 * 1024**3},
+            parse_systemd_run_summary(stderr),
+        )
+        self.assertEqual({}, parse_systemd_run_summary(None))
+
+    def test_command_label(self):
+        self.assertEqual("ls", command_label(["/bin/ls", "/root"]))
+        self.assertEqual(
+            "curtin in-target apt-get",
+            command_label(
+                [
+                    "/snap/subiquity/x1/usr/bin/python3.10",
+                    "-m",
+                    "curtin",
+                    "--showtrace",
+                    "-vvv",
+                    "--set",
+                    "json:reporting={}",
+                    "-c",
+                    "/tmp/config.yaml",
+                    "in-target",
+                    "-t",
+                    "/target",
+                    "--",
+                    "apt-get",
+                    "install",
+                ]
+            ),
+        )
+        self.assertEqual(
+            "replay-curtin-log.py",
+            command_label(["python3", "scripts/replay-curtin-log.py", "-o", "x"]),
+        )
+
+    def test_profile_written(self):
+        path = self.tmp_path("var/log/installer/profile.json")
+        profile = CommandProfile(path)
+        profile.add(ResourceUsage(label="ls", wall_time=1.0, memory_peak=10))
+        profile.add(ResourceUsage(label="ls", wall_time=2.0, memory_peak=5))
+        profile.add(ResourceUsage(label="curtin install", wall_time=10.0))
+        with open(path) as fp:
+            summary = json.load(fp)
+        self.assertEqual(["curtin install", "ls"], [t["label"] for t in summary])
+        self.assertEqual(2, summary[1]["count"])
+        self.assertEqual(3.0, summary[1]["wall_time"])
+        self.assertEqual(10, summary[1]["memory_peak"])
+
 
 class TestDryRunCommandRunner(SubiTestCase):
     def setUp(self):
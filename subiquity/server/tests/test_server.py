@@ -13,12 +13,16 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import asyncio
+import json
 import os
 import shlex
 from unittest.mock import Mock, patch
 
-from subiquity.common.types import PasswordKind
+from subiquity.common.types import ApplicationState, PasswordKind
+from subiquity.server.geoip import CheckState
 from subiquity.server.server import (
+    WARM_RESTART_VERSION,
     MetaController,
     SubiquityServer,
     cloud_autoinstall_path,
@@ -27,6 +31,7 @@ from subiquity.server.server import (
 )
 from subiquitycore.tests import SubiTestCase
 from subiquitycore.tests.mocks import make_app
+from subiquitycore.tests.parameterized import parameterized
 from subiquitycore.utils import run_command
 
 
@@ -41,6 +46,7 @@ class TestAutoinstallLoad(SubiTestCase):
         opts.kernel_cmdline = {}
         opts.autoinstall = None
         self.server = SubiquityServer(opts, None)
+        self.addAsyncCleanup(self.server.file_writer.flush)
         self.server.base_model = Mock()
         self.server.base_model.root = opts.output_base
 
@@ -179,9 +185,144 @@ class TestDefaultUser(SubiTestCase):
         opts.output_base = self.tmp_dir()
         opts.machine_config = "examples/machines/simple.json"
         server = SubiquityServer(opts, None)
+        self.addAsyncCleanup(server.file_writer.flush)
         server._user_has_password = Mock(side_effect=Exception("should not be called"))
 
         opts.dry_run = False  # exciting!
         server.set_installer_password()
         self.assertIsNone(server.installer_user_name)
         self.assertEqual(PasswordKind.NONE, server.installer_user_passwd_kind)
+
+
+class TestWarmRestartSnapshot(SubiTestCase):
+    async def asyncSetUp(self):
+        opts = Mock()
+        opts.dry_run = True
+        opts.output_base = self.tmp_dir()
+        opts.machine_config = "examples/machines/simple.json"
+        self.server = SubiquityServer(opts, None)
+        self.addAsyncCleanup(self.server.file_writer.flush)
+        self.controller = Mock()
+        self.controller.name = "Thing"
+        self.controller.warm_restart_snapshot.return_value = {"expensive": True}
+        self.server.controllers = Mock(instances=[self.controller])
+        self.server.geoip = Mock()
+        self.server.geoip.check_state = CheckState.DONE
+        self.server.geoip.countrycode = "fr"
+        self.server.geoip.timezone = "Europe/Paris"
+        self.snapshot_path = self.server.state_path("warm-restart.json")
+
+    def test_round_trip(self):
+        self.server.save_warm_restart_snapshot()
+        self.server.load_warm_restart_snapshot()
+        self.controller.restore_warm_restart_snapshot.assert_called_once_with(
+            {"expensive": True}
+        )
+        self.server.geoip.restore.assert_called_once_with("fr", "Europe/Paris")
+        self.assertFalse(os.path.exists(self.snapshot_path))
+
+    def test_no_snapshot(self):
+        self.server.load_warm_restart_snapshot()
+        self.controller.restore_warm_restart_snapshot.assert_not_called()
+
+    def test_nothing_to_snapshot(self):
+        self.controller.warm_restart_snapshot.return_value = None
+        self.server.geoip.check_state = CheckState.FAILED
+        self.server.save_warm_restart_snapshot()
+        self.server.load_warm_restart_snapshot()
+        self.controller.restore_warm_restart_snapshot.assert_not_called()
+        self.server.geoip.restore.assert_not_called()
+
+    @parameterized.expand(
+        (
+            ("version", WARM_RESTART_VERSION + 1),
+            ("boot_id", "another-boot"),
+            ("time", 0),
+        )
+    )
+    def test_stale_snapshot_ignored(self, key, value):
+        self.server.save_warm_restart_snapshot()
+        with open(self.snapshot_path) as fp:
+            snapshot = json.load(fp)
+        snapshot[key] = value
+        with open(self.snapshot_path, "w") as fp:
+            json.dump(snapshot, fp)
+        self.server.load_warm_restart_snapshot()
+        self.controller.restore_warm_restart_snapshot.assert_not_called()
+        self.server.geoip.restore.assert_not_called()
+        self.assertFalse(os.path.exists(self.snapshot_path))
+
+    def test_corrupt_snapshot_ignored(self):
+        with open(self.snapshot_path, "w") as fp:
+            fp.write("{")
+        self.server.load_warm_restart_snapshot()
+        self.controller.restore_warm_restart_snapshot.assert_not_called()
+        self.assertFalse(os.path.exists(self.snapshot_path))
+
+    def test_failing_controller(self):
+        other = Mock()
+        other.name = "Other"
+        other.warm_restart_snapshot.side_effect = Exception("oops")
+        self.server.controllers.instances.insert(0, other)
+        self.server.save_warm_restart_snapshot()
+        self.server.load_warm_restart_snapshot()
+        other.restore_warm_restart_snapshot.assert_not_called()
+        self.controller.restore_warm_restart_snapshot.assert_called_once_with(
+            {"expensive": True}
+        )
+
+
+class TestStatusVersions(SubiTestCase):
+    async def asyncSetUp(self):
+        opts = Mock()
+        opts.dry_run = True
+        opts.output_base = self.tmp_dir()
+        opts.machine_config = "examples/machines/simple.json"
+        self.server = SubiquityServer(opts, None)
+        self.addAsyncCleanup(self.server.file_writer.flush)
+        self.meta = MetaController(self.server)
+
+    async def test_initial_state(self):
+        status = await self.meta.status_GET()
+        self.assertEqual(ApplicationState.STARTING_UP, status.state)
+        self.assertEqual(1, status.version)
+
+    async def test_every_transition_seen(self):
+        self.server.update_state(ApplicationState.CLOUD_INIT_WAIT)
+        self.server.update_state(ApplicationState.WAITING)
+        seen = []
+        version = 0
+        for _ in range(3):
+            status = await self.meta.status_GET(since=version)
+            seen.append(status.state)
+            version = status.version
+        self.assertEqual(
+            [
+                ApplicationState.STARTING_UP,
+                ApplicationState.CLOUD_INIT_WAIT,
+                ApplicationState.WAITING,
+            ],
+            seen,
+        )
+
+    async def test_waiters_woken_once(self):
+        waiters = [asyncio.create_task(self.meta.status_GET(since=1)) for _ in range(3)]
+        cur_waiter = asyncio.create_task(
+            self.meta.status_GET(cur=ApplicationState.STARTING_UP)
+        )
+        await asyncio.sleep(0)
+        self.assertFalse(any(waiter.done() for waiter in waiters))
+        self.server.update_state(ApplicationState.CLOUD_INIT_WAIT)
+        self.server.update_state(ApplicationState.WAITING)
+        for status in await asyncio.gather(*waiters, cur_waiter):
+            self.assertEqual(ApplicationState.CLOUD_INIT_WAIT, status.state)
+            self.assertEqual(2, status.version)
+
+    async def test_cur_other_state(self):
+        status = await self.meta.status_GET(cur=ApplicationState.WAITING)
+        self.assertEqual(ApplicationState.STARTING_UP, status.state)
+
+    async def test_version_from_before_restart(self):
+        status = await self.meta.status_GET(since=12)
+        self.assertEqual(ApplicationState.STARTING_UP, status.state)
+        self.assertEqual(1, status.version)
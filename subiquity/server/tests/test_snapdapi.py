@@ -0,0 +1,162 @@
+# Copyright 2024 Canonical, Ltd.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import asyncio
+from unittest import mock
+
+import aiohttp
+
+from subiquity.common.types import Change, TaskStatus
+from subiquity.server import snapdapi
+from subiquity.server.snapdapi import ChangeWatcher, get_change_watcher
+from subiquitycore.snapd import AsyncSnapd, get_fake_connection
+from subiquitycore.tests import SubiTestCase
+
+
+def make_change(change_id, status, *, ready=False, err=None):
+    return Change(
+        id=change_id,
+        kind="refresh-snap",
+        summary="",
+        status=status,
+        tasks=[],
+        ready=ready,
+        err=err,
+    )
+
+
+class StubChanges:
+    """Stands in for client.v2.changes, replaying a list of states."""
+
+    def __init__(self, states):
+        self.states = states
+        self.gets = {change_id: 0 for change_id in states}
+
+    def __getitem__(self, change_id):
+        stub = self
+
+        class Endpoint:
+            async def GET(self):
+                states = stub.states[change_id]
+                index = min(stub.gets[change_id], len(states) - 1)
+                stub.gets[change_id] += 1
+                state = states[index]
+                if isinstance(state, Exception):
+                    raise state
+                return state
+
+        return Endpoint()
+
+
+class TestChangeWatcher(SubiTestCase):
+    def make_watcher(self, states):
+        changes = StubChanges(states)
+        client = mock.Mock()
+        client.v2.changes = changes
+        watcher = ChangeWatcher(client)
+        watcher.initial_interval = 0.001
+        watcher.max_interval = 0.004
+        return watcher, changes
+
+    async def test_wait_done(self):
+        doing = make_change("1", TaskStatus.DOING)
+        done = make_change("1", TaskStatus.DONE, ready=True)
+        watcher, changes = self.make_watcher({"1": [doing, doing, done]})
+        self.assertEqual(done, await watcher.wait("1"))
+        self.assertEqual(3, changes.gets["1"])
+        # Finished changes are not fetched again.
+        self.assertEqual(done, await watcher.wait("1"))
+        self.assertEqual(done, await watcher.current("1"))
+        self.assertEqual(3, changes.gets["1"])
+
+    async def test_wait_error(self):
+        exc = aiohttp.ClientError("boom")
+        watcher, changes = self.make_watcher({"1": [exc]})
+        with self.assertRaises(aiohttp.ClientError):
+            await watcher.wait("1")
+
+    async def test_multiple_changes_one_loop(self):
+        doing1 = make_change("1", TaskStatus.DOING)
+        doing2 = make_change("2", TaskStatus.DOING)
+        done1 = make_change("1", TaskStatus.DONE, ready=True)
+        error2 = make_change("2", TaskStatus.ERROR, ready=True, err="no")
+        watcher, changes = self.make_watcher(
+            {
+                "1": [doing1, done1],
+                "2": [doing2, doing2, doing2, error2],
+            }
+        )
+        results = await asyncio.gather(watcher.wait("1"), watcher.wait("2"))
+        self.assertEqual([done1, error2], results)
+        self.assertEqual(2, changes.gets["1"])
+        self.assertEqual(4, changes.gets["2"])
+
+    async def test_backoff(self):
+        doing = make_change("1", TaskStatus.DOING)
+        done = make_change("1", TaskStatus.DONE, ready=True)
+        watcher, changes = self.make_watcher({"1": [doing] * 6 + [done]})
+        intervals = []
+        real_wait_for = asyncio.wait_for
+
+        async def wait_for(aw, timeout):
+            intervals.append(timeout)
+            return await real_wait_for(aw, timeout)
+
+        with mock.patch("asyncio.wait_for", new=wait_for):
+            await watcher.wait("1")
+        self.assertEqual([0.001, 0.002, 0.004, 0.004, 0.004, 0.004], intervals)
+
+    async def test_current_while_watched(self):
+        doing = make_change("1", TaskStatus.DOING)
+        done = make_change("1", TaskStatus.DONE, ready=True)
+        watcher, changes = self.make_watcher({"1": [doing] * 3 + [done]})
+        watcher.watch("1")
+        await asyncio.sleep(0)
+        self.assertEqual(doing, await watcher.current("1"))
+        self.assertEqual(1, changes.gets["1"])
+        await watcher.wait("1")
+        self.assertEqual(done, await watcher.current("1"))
+
+
+class TestPostAndWait(SubiTestCase):
+    async def test_fake_install_step(self):
+        client = snapdapi.make_api_client(AsyncSnapd(get_fake_connection()))
+        watcher = get_change_watcher(client)
+        watcher.initial_interval = watcher.max_interval = 0
+        await snapdapi.post_and_wait(
+            client,
+            client.v2.systems["mandatory"].POST,
+            snapdapi.SystemActionRequest(
+                action=snapdapi.SystemAction.INSTALL,
+                step=snapdapi.SystemActionStep.FINISH,
+                on_volumes={},
+            ),
+        )
+        self.assertEqual(TaskStatus.DONE, watcher.changes["5"].status)
+
+    async def test_fake_install_step_fails(self):
+        client = snapdapi.make_api_client(AsyncSnapd(get_fake_connection()))
+        watcher = get_change_watcher(client)
+        watcher.initial_interval = watcher.max_interval = 0
+        with self.assertRaises(aiohttp.ClientError):
+            await snapdapi.post_and_wait(
+                client,
+                client.v2.systems["finish-fail"].POST,
+                snapdapi.SystemActionRequest(
+                    action=snapdapi.SystemAction.INSTALL,
+                    step=snapdapi.SystemActionStep.FINISH,
+                    on_volumes={},
+                ),
+            )
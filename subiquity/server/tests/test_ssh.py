@@ -13,13 +13,56 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import asyncio
 import unittest
 from subprocess import CalledProcessError, CompletedProcess
 from unittest import mock
 
 from subiquity.common.types import SSHFetchIdStatus
-from subiquity.server.ssh import DryRunSSHKeyFetcher, SSHFetchError, SSHKeyFetcher
+from subiquity.server.ssh import (
+    DryRunSSHKeyFetcher,
+    SSHFetchError,
+    SSHKeyFetcher,
+    fingerprint_key,
+)
 from subiquitycore.tests.mocks import make_app
+from subiquitycore.tests.parameterized import parameterized
+
+ED25519_KEY = """\
+ssh-ed25519 AAAAC3NzaC1lZDI1NTE5AAAAIMM/qhS3hS3+IjpJBYXZWCqPKPH9Zag8QYbS548iEjoZ \
+test@earth # ssh-import-id lp:test"""
+
+ECDSA_KEY = """\
+ecdsa-sha2-nistp256 AAAAE2VjZHNhLXNoYTItbmlzdHAyNTYAAAAIbmlzdHAyNTYAAABBBO3YbbxoNPQf\
+mYVSBWDirlPncrnEvpshQLZ17dyqUDmEefq9woYU8vxg7NYS3c6qQi+6jzuPcBP837LAI0Ug9SM="""
+
+
+class TestFingerprintKey(unittest.TestCase):
+    def test_ed25519(self):
+        self.assertEqual(
+            fingerprint_key(ED25519_KEY),
+            "256 SHA256:rIR9UVRKslp5wLhV/XuYflDOMN67Z+4c1KgFuS75Qms "
+            "test@earth # ssh-import-id lp:test (ED25519)",
+        )
+
+    def test_ecdsa_no_comment(self):
+        self.assertEqual(
+            fingerprint_key(ECDSA_KEY),
+            "256 SHA256:QWh1EF7prAoP70ZlhdTGvdnFHTd2yUOPx2va12r3+uY no comment (ECDSA)",
+        )
+
+    @parameterized.expand(
+        [
+            ("ssh-nsa AAAAC3NzaC1lZDI1NTE5AAAAIMM/qhS3 test@host",),
+            ("sk-ssh-ed25519@openssh.com AAAAGnNrLXNzaC1lZDI1NTE5 test@host",),
+            ("ssh-ed25519 AAAAAC3N test@host",),
+            # The blob is for a different type of key.
+            (ED25519_KEY.replace("ssh-ed25519", "ssh-rsa", 1),),
+            ("ssh-ed25519",),
+        ]
+    )
+    def test_unhandled(self, key):
+        self.assertIsNone(fingerprint_key(key))
 
 
 class TestSSHKeyFetcher(unittest.IsolatedAsyncioTestCase):
@@ -72,6 +115,32 @@ ssh-ed25519 AAAAAC3N test@host # ssh-import-id lp:test
             self.assertEqual(cm.exception.reason, stderr)
             self.assertEqual(cm.exception.status, SSHFetchIdStatus.IMPORT_ERROR)
 
+    async def test_fetch_keys_concurrency(self):
+        running = 0
+        max_running = 0
+
+        async def arun_command(cmd, **kwargs):
+            nonlocal running, max_running
+            running += 1
+            max_running = max(max_running, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return CompletedProcess(cmd, 0, f"ssh-rsa AAAA {cmd[-1]}\n")
+
+        user_ids = [f"lp:user{i}" for i in range(10)]
+        with mock.patch(self.arun_command_sym, new=arun_command):
+            results = await asyncio.gather(
+                *[self.fetcher.fetch_keys_for_id(user_id) for user_id in user_ids]
+            )
+        self.assertEqual([[f"ssh-rsa AAAA {u}"] for u in user_ids], results)
+        self.assertEqual(self.fetcher.fetch_concurrency, max_running)
+
+    async def test_gen_fingerprint_for_key_in_process(self):
+        with mock.patch(self.arun_command_sym) as mock_arun:
+            fp = await self.fetcher.gen_fingerprint_for_key(ED25519_KEY)
+        mock_arun.assert_not_called()
+        self.assertEqual(fp, fingerprint_key(ED25519_KEY))
+
     async def test_gen_fingerprint_for_key_ok(self):
         with mock.patch(self.arun_command_sym) as mock_arun:
             mock_arun.return_value = CompletedProcess([], 0)
@@ -13,6 +13,8 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import asyncio
+import contextlib
 import unittest
 from subprocess import CalledProcessError
 from unittest.mock import AsyncMock, Mock, patch
@@ -20,12 +22,67 @@ from unittest.mock import AsyncMock, Mock, patch
 from subiquity.server.dryrun import DRConfig
 from subiquity.server.ubuntu_drivers import (
     CommandNotFoundError,
+    HardwareEnablementScanner,
     UbuntuDriversClientInterface,
     UbuntuDriversInterface,
     UbuntuDriversRunDriversInterface,
 )
 from subiquitycore.tests.mocks import make_app
 
+APT_CACHE_SHOW_OUTPUT = b"""\
+Package: oem-somerville-tentacool-meta
+Architecture: all
+Version: 22.04~ubuntu1
+Priority: optional
+Section: misc
+Origin: Ubuntu
+Maintainer: Commercial Engineering <commercial-engineering@canonical.com>
+Bugs: https://bugs.launchpad.net/ubuntu/+filebug
+Installed-Size: 14
+Depends: ubuntu-oem-keyring
+Filename: pool/main/o/oem-somerville-tentacool-meta/\
+oem-somerville-tentacool-meta_22.04~ubuntu1_all.deb
+Size: 1966
+MD5sum: 54c21fc5081342a1cf2713bf5337c7fe
+SHA1: 0503bf47dc27fc7e1228c8bbbbfcf217cace4d20
+SHA256: 06832f9d0e20c14e46f0666f551777cce94eff9fe01ca6e171c1ce36c344be39
+SHA512: 09399fb7d08f692ed93f714b382e9686072c270382af9f0a0753c5f6da3c3089\
+0d37bf15a7493f4256a1a0a27be0635a5f9d6dd52478be02a8754ae040f4d08f
+Description-en: hardware support for Dell XPS 13 9320
+ This is a metapackage for Dell PC:
+  * Dell XPS 13 9320
+ It installs packages needed to support this hardware fully.
+Description-md5: 1224924b830bd467ae43de5de655ed76
+Modaliases: meta(pci:*sv00001028sd00000AF3bc0Csc05*)
+Ubuntu-Oem-Kernel-Flavour: default
+
+Package: oem-sutton-balint-meta
+Architecture: all
+Version: 22.04~ubuntu1
+Priority: optional
+Section: misc
+Origin: Ubuntu
+Maintainer: Commercial Engineering <commercial-engineering@canonical.com>
+Bugs: https://bugs.launchpad.net/ubuntu/+filebug
+Installed-Size: 13
+Depends: ubuntu-oem-keyring
+Filename: pool/main/o/oem-sutton-balint-meta/\
+oem-sutton-balint-meta_22.04~ubuntu1_all.deb
+Size: 1906
+MD5sum: c05aba72ecdb44cadba5443fdcc81ae9
+SHA1: f35dcdc8d245252d4d298a9ed07620fa37f0dede
+SHA256: 5d5b08b2bfed3e34548db23b40a363b6fa819a9e0d9e1ffe96e067a56bbb813a
+SHA512: d207624a58b38aad165b35401615ab2a4d4184264fec4e9735c7dfcd6b4ee727\
+aa95bc41394c7a3fda0006ae0a00ef7cab474e42724b94a596f493b1f563f097
+Description-en: hardware support for Lenovo ThinkPad P16 Gen 1
+ This is a metapackage for Lenovo PC:
+  * Lenovo ThinkPad P16 Gen 1
+ It installs packages needed to support this hardware fully.
+Description-md5: 3963562d6f85b81c4b21e6a7bff3a2c4
+Modaliases: meta(dmi:*bvnLENOVO:bvrN3F*:pvrThinkPad*)
+Ubuntu-Oem-Kernel-Flavour: oem
+"""
+
 
 class TestUbuntuDriversInterface(unittest.IsolatedAsyncioTestCase):
     def setUp(self):
@@ -193,6 +250,58 @@ oem-somerville-tentacool-meta
 
         self.assertEqual(drivers, ["oem-somerville-tentacool-meta"])
 
+    @patch("subiquity.server.ubuntu_drivers.run_curtin_command")
+    async def test_oem_kernel_flavors(self, mock_run_curtin_command):
+        mock_run_curtin_command.return_value = Mock(stdout=APT_CACHE_SHOW_OUTPUT)
+        flavors = await self.ubuntu_drivers.oem_kernel_flavors(
+            "/target",
+            ["oem-somerville-tentacool-meta", "oem-sutton-balint-meta"],
+            context="reading OEM meta-packages",
+        )
+
+        mock_run_curtin_command.assert_called_once_with(
+            self.app,
+            "reading OEM meta-packages",
+            "in-target",
+            "-t",
+            "/target",
+            "--",
+            "apt-cache",
+            "show",
+            "oem-somerville-tentacool-meta",
+            "oem-sutton-balint-meta",
+            capture=True,
+            private_mounts=True,
+        )
+        self.assertEqual(
+            flavors,
+            {
+                "oem-somerville-tentacool-meta": "default",
+                "oem-sutton-balint-meta": "oem",
+            },
+        )
+
+    def test_oem_kernel_flavors_from_output_first_version(self):
+        output = """\
+Package: oem-foo-meta
+Version: 2
+
+Package: oem-foo-meta
+Version: 1
+Ubuntu-Oem-Kernel-Flavour: oem
+"""
+        self.assertEqual(
+            self.ubuntu_drivers._oem_kernel_flavors_from_output(output),
+            {"oem-foo-meta": None},
+        )
+
+    @patch("subiquity.server.ubuntu_drivers.run_curtin_command")
+    async def test_oem_kernel_flavors_none(self, mock_run_curtin_command):
+        self.assertEqual(
+            {}, await self.ubuntu_drivers.oem_kernel_flavors("/target", [], None)
+        )
+        mock_run_curtin_command.assert_not_called()
+
 
 class TestUbuntuDriversRunDriversInterface(unittest.IsolatedAsyncioTestCase):
     def setUp(self):
@@ -255,3 +364,98 @@ class TestUbuntuDriversRunDriversInterface(unittest.IsolatedAsyncioTestCase):
         mock_arun_command.assert_called_once_with(
             ["sh", "-c", "command -v ubuntu-drivers"], check=True
         )
+
+
+class TestHardwareEnablementScanner(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.app = make_app()
+        self.overlays = 0
+
+        @contextlib.asynccontextmanager
+        async def overlay():
+            self.overlays += 1
+            yield Mock(mountpoint="/overlay")
+
+        self.app.controllers.Mirror.final_apt_configurer.overlay = overlay
+        self.ubuntu_drivers = Mock(
+            ensure_cmd_exists=AsyncMock(),
+            list_drivers=AsyncMock(return_value=["nvidia-driver-510"]),
+            list_oem=AsyncMock(return_value=["oem-foo-meta", "oem-bar-meta"]),
+            oem_kernel_flavors=AsyncMock(return_value={"oem-foo-meta": "default"}),
+        )
+        p = patch(
+            "subiquity.server.ubuntu_drivers.get_ubuntu_drivers_interface",
+            return_value=self.ubuntu_drivers,
+        )
+        p.start()
+        self.addCleanup(p.stop)
+        self.scanner = HardwareEnablementScanner(self.app)
+
+    async def test_shared_scan(self):
+        drivers, oem = await asyncio.gather(
+            self.scanner.list_drivers(),
+            self.scanner.list_oem(),
+        )
+        self.assertEqual(["nvidia-driver-510"], drivers)
+        self.assertEqual({"oem-foo-meta": "default", "oem-bar-meta": None}, oem)
+        self.assertEqual(1, self.overlays)
+        self.ubuntu_drivers.ensure_cmd_exists.assert_called_once_with("/overlay")
+        self.ubuntu_drivers.oem_kernel_flavors.assert_called_once()
+        args = self.ubuntu_drivers.oem_kernel_flavors.call_args.args
+        self.assertEqual(("/overlay", ["oem-foo-meta", "oem-bar-meta"]), args[:2])
+        # The scan reports under a context of its own, not the one of
+        # whichever controller asked first.
+        self.assertIs(self.app.context, args[2].parent)
+
+    async def test_only_what_is_asked_for(self):
+        self.assertEqual(["nvidia-driver-510"], await self.scanner.list_drivers())
+        self.ubuntu_drivers.list_oem.assert_not_called()
+        # A later request gets a scan of its own.
+        await self.scanner.list_oem()
+        self.assertEqual(2, self.overlays)
+        self.ubuntu_drivers.list_drivers.assert_called_once()
+
+    async def test_no_ubuntu_drivers(self):
+        self.ubuntu_drivers.ensure_cmd_exists.side_effect = CommandNotFoundError
+        drivers, oem = await asyncio.gather(
+            self.scanner.list_drivers(),
+            self.scanner.list_oem(),
+        )
+        self.assertEqual(([], {}), (drivers, oem))
+
+    async def test_oem_failure_does_not_fail_drivers(self):
+        self.ubuntu_drivers.list_oem.side_effect = RuntimeError("boom")
+        with self.assertLogs("subiquity.server.ubuntu_drivers", "ERROR"):
+            drivers, oem = await asyncio.gather(
+                self.scanner.list_drivers(),
+                self.scanner.list_oem(),
+                return_exceptions=True,
+            )
+        self.assertEqual(["nvidia-driver-510"], drivers)
+        self.assertIsInstance(oem, RuntimeError)
+
+    async def test_drivers_failure_does_not_fail_oem(self):
+        self.ubuntu_drivers.list_drivers.side_effect = RuntimeError("boom")
+        with self.assertLogs("subiquity.server.ubuntu_drivers", "ERROR"):
+            drivers, oem = await asyncio.gather(
+                self.scanner.list_drivers(),
+                self.scanner.list_oem(),
+                return_exceptions=True,
+            )
+        self.assertIsInstance(drivers, RuntimeError)
+        self.assertEqual({"oem-foo-meta": "default", "oem-bar-meta": None}, oem)
+
+    async def test_overlay_failure(self):
+        @contextlib.asynccontextmanager
+        async def overlay():
+            raise RuntimeError("boom")
+            yield
+
+        self.app.controllers.Mirror.final_apt_configurer.overlay = overlay
+        results = await asyncio.gather(
+            self.scanner.list_drivers(),
+            self.scanner.list_oem(),
+            return_exceptions=True,
+        )
+        for result in results:
+            self.assertIsInstance(result, RuntimeError)
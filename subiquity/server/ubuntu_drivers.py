@@ -15,12 +15,15 @@
 
 """ Module that defines helpers to use the ubuntu-drivers command. """
 
+import asyncio
 import logging
 import subprocess
 from abc import ABC, abstractmethod
-from typing import List, Type
+from typing import Any, Dict, List, Optional, Set, Type
 
+from subiquity.server.apt import OverlayCleanupError
 from subiquity.server.curtin import run_curtin_command
+from subiquity.server.dpkg import iter_stanzas
 from subiquitycore.utils import arun_command
 
 log = logging.getLogger("subiquity.server.ubuntu_drivers")
@@ -83,6 +86,43 @@ class UbuntuDriversInterface(ABC):
             private_mounts=True,
         )
 
+    async def oem_kernel_flavors(
+        self, root_dir: str, metapkgs: List[str], context
+    ) -> Dict[str, Optional[str]]:
+        """Return the Ubuntu-Oem-Kernel-Flavour of each of the given
+        packages (None if a package does not set it), using a single
+        apt-cache show."""
+        if not metapkgs:
+            return {}
+        result = await run_curtin_command(
+            self.app,
+            context,
+            "in-target",
+            "-t",
+            root_dir,
+            "--",
+            "apt-cache",
+            "show",
+            *metapkgs,
+            capture=True,
+            private_mounts=True,
+        )
+        return self._oem_kernel_flavors_from_output(result.stdout.decode("utf-8"))
+
+    def _oem_kernel_flavors_from_output(self, output: str) -> Dict[str, Optional[str]]:
+        """Parse the output of apt-cache show and return the kernel flavor
+        of each package listed."""
+        flavors: Dict[str, Optional[str]] = {}
+        # One stanza per package version. Like apt-cache show for a single
+        # package, go by the first version listed.
+        for stanza in iter_stanzas(
+            output.splitlines(), {"Package", "Ubuntu-Oem-Kernel-Flavour"}
+        ):
+            package = stanza.get("Package")
+            if package is not None and package not in flavors:
+                flavors[package] = stanza.get("Ubuntu-Oem-Kernel-Flavour")
+        return flavors
+
     def _drivers_from_output(self, output: str) -> List[str]:
         """Parse the output of ubuntu-drivers list --recommended and return a
         list of drivers."""
@@ -263,3 +303,107 @@ def get_ubuntu_drivers_interface(app) -> UbuntuDriversInterface:
             cls = UbuntuDriversHasDriversInterface
 
     return cls(app, gpgpu=is_server)
+
+
+class HardwareEnablementScanner:
+    """Lists the drivers and OEM meta-packages available for the system.
+
+    The Drivers and OEM controllers both need these once the final apt
+    configuration is in place. Requests that are made together are
+    served by a single scan, which mounts one overlay and runs all the
+    ubuntu-drivers and apt-cache commands in it.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    async def list_drivers(self) -> List[str]:
+        """Return the recommended drivers for the system."""
+        return await self._request("drivers")
+
+    async def list_oem(self) -> Dict[str, Optional[str]]:
+        """Return the OEM meta-packages for the system, mapped to the kernel
+        flavor they ask for."""
+        return await self._request("oem")
+
+    async def _request(self, kind: str) -> Any:
+        fut = self._pending.get(kind)
+        if fut is None:
+            fut = self._pending[kind] = asyncio.get_running_loop().create_future()
+            if self._task is None or self._task.done():
+                self._task = asyncio.create_task(self._run())
+        return await asyncio.shield(fut)
+
+    async def _run(self) -> None:
+        # Both controllers wait for the same event before asking; give
+        # the second one a chance to join in.
+        await asyncio.sleep(0)
+        while self._pending:
+            pending, self._pending = self._pending, {}
+            try:
+                with self.app.context.child(
+                    "hardware_enablement_scan",
+                    "scanning for drivers and OEM meta-packages",
+                ) as context:
+                    results = await self._scan(set(pending), context)
+            except asyncio.CancelledError:
+                for fut in pending.values():
+                    fut.cancel()
+                raise
+            except Exception as exc:
+                # Setting up the overlay failed, so nothing could be listed.
+                for fut in pending.values():
+                    fut.set_exception(exc)
+            else:
+                for kind, fut in pending.items():
+                    result = results[kind]
+                    if isinstance(result, Exception):
+                        fut.set_exception(result)
+                    else:
+                        fut.set_result(result)
+
+    async def _scan(self, kinds: Set[str], context) -> Dict[str, Any]:
+        """Return the result of each kind of listing, or the exception it
+        failed with, so that a failure of one does not affect the other."""
+        log.debug("scanning for hardware enablement packages: %s", sorted(kinds))
+        ubuntu_drivers = get_ubuntu_drivers_interface(self.app)
+        results: Dict[str, Any] = {"drivers": [], "oem": {}}
+        apt = self.app.controllers.Mirror.final_apt_configurer
+        try:
+            async with apt.overlay() as d:
+                try:
+                    # Make sure ubuntu-drivers is available.
+                    await ubuntu_drivers.ensure_cmd_exists(d.mountpoint)
+                except CommandNotFoundError:
+                    return results
+
+                async def list_drivers():
+                    return await ubuntu_drivers.list_drivers(
+                        root_dir=d.mountpoint, context=context
+                    )
+
+                async def list_oem():
+                    metapkgs = await ubuntu_drivers.list_oem(
+                        root_dir=d.mountpoint, context=context
+                    )
+                    flavors = await ubuntu_drivers.oem_kernel_flavors(
+                        d.mountpoint, metapkgs, context
+                    )
+                    return {name: flavors.get(name) for name in metapkgs}
+
+                listers = {"drivers": list_drivers, "oem": list_oem}
+                ordered = sorted(kinds)
+                outcomes = await asyncio.gather(
+                    *(listers[kind]() for kind in ordered), return_exceptions=True
+                )
+                for kind, outcome in zip(ordered, outcomes):
+                    if isinstance(outcome, asyncio.CancelledError):
+                        raise outcome
+                    if isinstance(outcome, Exception):
+                        log.error("listing %s failed", kind, exc_info=outcome)
+                    results[kind] = outcome
+        except OverlayCleanupError:
+            log.exception("Failed to cleanup overlay. Continuing anyway.")
+        return results
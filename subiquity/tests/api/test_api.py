@@ -2203,3 +2203,18 @@ class TestMountDetection(TestAPI):
             self.assertTrue(disk1["has_in_use_partition"])
             disk1p2 = disk1["partitions"][1]
             self.assertTrue(disk1p2["is_in_use"])
+
+
+class TestMetrics(TestAPI):
+    @timeout()
+    async def test_metrics(self):
+        async with start_server("examples/machines/simple.json") as inst:
+            await inst.get("/locale")
+            metrics = await inst.get("/meta/metrics")
+            [locale] = [m for m in metrics if m["path"] == "/locale"]
+            self.assertEqual("GET", locale["method"])
+            self.assertEqual(1, locale["requests"])
+            self.assertEqual(
+                ["deserialize", "wait", "implementation", "serialize", "total"],
+                [p["phase"] for p in locale["phases"]],
+            )
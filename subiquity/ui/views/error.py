@@ -195,6 +195,7 @@ class ErrorReportStretchy(Stretchy):
             run_bg_task(self._wait())
         else:
             connect_signal(self.report, "changed", self._report_changed)
+            self.report.ensure_loaded()
             self.report.mark_seen()
         self.interrupting = interrupting
         self.min_wait = asyncio.create_task(asyncio.sleep(0.1))
@@ -17,6 +17,7 @@ import asyncio
 import enum
 import functools
 import inspect
+import time
 
 
 class Status(enum.Enum):
@@ -48,6 +49,9 @@ class Context:
     with somecontext.child("operation") as context:
         result = await long_running_operation()
         context.description = "result was {}".format(result)
+
+    The time.monotonic() values at which the context was entered and
+    exited are recorded in start_time and end_time.
     """
 
     def __init__(self, app, name, description, parent, level, childlevel=None):
@@ -63,6 +67,8 @@ class Context:
             childlevel = level
         self.childlevel = childlevel
         self.data = {}
+        self.start_time = None
+        self.end_time = None
 
     @classmethod
     def new(cls, app):
@@ -81,12 +87,30 @@ class Context:
             c = c.parent
         return "/".join(reversed(names))
 
+    def top_level(self):
+        """Return the top-level operation this context is part of.
+
+        That is, the ancestor just below the application's own context.
+        """
+        c = self
+        while c.parent is not None and c.parent.parent is not None:
+            c = c.parent
+        return c
+
+    @property
+    def duration(self):
+        if self.start_time is None or self.end_time is None:
+            return None
+        return self.end_time - self.start_time
+
     def enter(self, description=None):
+        self.start_time = time.monotonic()
         if description is None:
             description = self.description
         self.app.report_start_event(self, description)
 
     def exit(self, description=None, result=Status.SUCCESS):
+        self.end_time = time.monotonic()
         if description is None:
             description = self.description
         self.app.report_finish_event(self, description, result)
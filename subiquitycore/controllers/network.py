@@ -16,10 +16,11 @@
 import abc
 import asyncio
 import contextlib
+import copy
 import logging
 import os
 import subprocess
-from typing import Optional
+from typing import Optional, Set
 
 import pyroute2
 import yaml
@@ -47,22 +48,82 @@ log = logging.getLogger("subiquitycore.controllers.network")
 
 
 class SubiquityNetworkEventReceiver(NetworkEventReceiver):
+    """Apply netlink events to the model and tell the controller.
+
+    The model is updated as each event arrives but notifications to the
+    controller are held back for coalesce_window seconds so that bursts
+    (link flaps, DHCP renewals, many interfaces appearing at once) are
+    delivered as one batch: at most one notification per ifindex and at
+    most one probe of the default routes.
+    """
+
+    coalesce_window = 0.1
+
     def __init__(self, controller):
         self.controller = controller
         self.model = controller.model
         self.has_default_route = False
+        # ifindex -> list of ("new" | "update" | "del", netdev)
+        self._pending = {}
+        self._pending_route_probe = False
+        self._flush_handle = None
+
+    def _schedule_flush(self):
+        if self._flush_handle is None:
+            loop = asyncio.get_running_loop()
+            self._flush_handle = loop.call_later(self.coalesce_window, self.flush)
+
+    def _queue_link(self, ifindex, action, netdev):
+        events = self._pending.setdefault(ifindex, [])
+        if events:
+            last_action, _ = events[-1]
+            if action == "update" and last_action in ("new", "update"):
+                # Already going to report the latest state.
+                return
+            if action == "del" and last_action == "new":
+                # The controller never needs to hear about it.
+                events.pop()
+                if not events:
+                    del self._pending[ifindex]
+                return
+            if action == "del" and last_action == "update":
+                events.pop()
+        events.append((action, netdev))
+        self._schedule_flush()
+
+    def _queue_route_probe(self):
+        self._pending_route_probe = True
+        self._schedule_flush()
+
+    def flush(self):
+        """Deliver any pending notifications now."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        pending, self._pending = self._pending, {}
+        if self._pending_route_probe:
+            self._pending_route_probe = False
+            self.probe_default_routes()
+            self.controller.update_has_default_route(self.has_default_route)
+        for events in pending.values():
+            for action, netdev in events:
+                if action == "new":
+                    self.controller.new_link(netdev)
+                elif action == "update":
+                    self.controller.update_link(netdev)
+                else:
+                    self.controller.del_link(netdev)
 
     def new_link(self, ifindex, link):
         netdev = self.model.new_link(ifindex, link)
         if netdev is not None:
-            self.controller.new_link(netdev)
+            self._queue_link(ifindex, "new", netdev)
 
     def del_link(self, ifindex):
         netdev = self.model.del_link(ifindex)
-        self.probe_default_routes()
-        self.controller.update_has_default_route(self.has_default_route)
+        self._queue_route_probe()
         if netdev is not None:
-            self.controller.del_link(netdev)
+            self._queue_link(ifindex, "del", netdev)
 
     def update_link(self, ifindex):
         netdev = self.model.update_link(ifindex)
@@ -70,9 +131,8 @@ class SubiquityNetworkEventReceiver(NetworkEventReceiver):
             return
         flags = getattr(netdev.info, "flags", 0)
         if not (flags & IFF_UP):
-            self.probe_default_routes()
-            self.controller.update_has_default_route(self.has_default_route)
-        self.controller.update_link(netdev)
+            self._queue_route_probe()
+        self._queue_link(ifindex, "update", netdev)
 
     def route_change(self, action, data):
         super().route_change(action, data)
@@ -80,8 +140,7 @@ class SubiquityNetworkEventReceiver(NetworkEventReceiver):
             return
         if data["table"] != 254:
             return
-        self.probe_default_routes()
-        self.controller.update_has_default_route(self.has_default_route)
+        self._queue_route_probe()
 
     def _default_route_exists(self, routes):
         for route in routes:
@@ -156,6 +215,9 @@ class BaseNetworkController(BaseController):
     def __init__(self, app):
         super().__init__(app)
         self.apply_config_task = SingleInstanceTask(self._apply_config)
+        # The netplan config as of the last successful apply, used to
+        # work out which interfaces the next apply affects.
+        self._applied_config = None
         if self.opts.dry_run:
             self.root = os.path.abspath(self.opts.output_base)
             netplan_path = self.netplan_path
@@ -228,6 +290,7 @@ class BaseNetworkController(BaseController):
                 dev.remove_ip_networks_for_version(6)
                 log.debug("disabling %s", dev.name)
                 dev.disabled_reason = _("autoconfiguration failed")
+                dev.invalidate()
 
     @property
     def netplan_path(self):
@@ -259,9 +322,7 @@ class BaseNetworkController(BaseController):
             except subprocess.CalledProcessError as cp:
                 log.info("deleting %s failed with %r", dev.name, cp.stderr)
 
-    def _write_config(self):
-        config = self.model.render_config()
-
+    def _write_config(self, config):
         log.debug(
             "network config: \n%s",
             yaml.dump(netplan.sanitize_config(config), default_flow_style=False),
@@ -276,13 +337,38 @@ class BaseNetworkController(BaseController):
 
         self.parse_netplan_configs()
 
+    def _affected_interfaces(self, config) -> Optional[Set[str]]:
+        """Return the names of the interfaces applying config affects, or
+        None if it has to be applied to all of them."""
+        affected = netplan.changed_interfaces(self._applied_config, config)
+        if affected is None:
+            return None
+        # Applying again is how DHCP gets retried (e.g. by selecting
+        # "Automatic" again), so an interface that did not get a lease is
+        # affected even when its config is unchanged.
+        for dev in self.model.get_all_netdevs():
+            if any(dev.dhcp_state(v) == DHCPState.TIMED_OUT for v in (4, 6)):
+                affected.add(dev.name)
+        return affected
+
     @with_context(name="apply_config", description="silent={silent}", level="INFO")
     async def _apply_config(self, *, context, silent):
+        config = self.model.render_config()
+        affected = self._affected_interfaces(config)
+        if affected is not None:
+            if not affected:
+                log.debug("network config unchanged, not applying it")
+                return
+            log.debug("network config changed for %s", sorted(affected))
         devs_to_delete = []
         devs_to_down = []
         dhcp_device_versions = []
         dhcp_events = set()
         for dev in self.model.get_all_netdevs(include_deleted=True):
+            # Leave the state of interfaces this change does not touch
+            # alone, and do not wait for them to get a lease.
+            if affected is not None and dev.name not in affected:
+                continue
             dev.dhcp_events = {}
             for v in 4, 6:
                 if dev.dhcp_enabled(v):
@@ -301,7 +387,7 @@ class BaseNetworkController(BaseController):
                 else:
                     devs_to_down.append(dev)
 
-        self._write_config()
+        self._write_config(config)
 
         if not silent:
             self.apply_starting()
@@ -383,6 +469,7 @@ class BaseNetworkController(BaseController):
                     await arun_command(
                         ["systemctl", "start", "systemd-networkd.socket"], check=False
                     )
+            self._applied_config = copy.deepcopy(config)
         finally:
             if not silent:
                 self.apply_stopping()
@@ -531,19 +618,20 @@ class BaseNetworkController(BaseController):
 
     @abc.abstractmethod
     def new_link(self, netdev):
-        pass
+        netdev.invalidate()
 
     @abc.abstractmethod
     def update_link(self, netdev):
+        netdev.invalidate()
         for v, e in netdev.dhcp_events.items():
             if netdev.dhcp_addresses()[v]:
                 netdev.set_dhcp_state(v, DHCPState.CONFIGURED)
                 e.set()
-        pass
 
     @abc.abstractmethod
     def del_link(self, netdev):
-        pass
+        netdev.invalidate()
+        self.model.netdev_removed(netdev)
 
 
 class NetworkAnswersMixin:
@@ -13,10 +13,15 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import asyncio
 import unittest
 from unittest.mock import Mock
 
-from subiquitycore.controllers.network import SubiquityNetworkEventReceiver
+from subiquitycore.controllers.network import (
+    BaseNetworkController,
+    SubiquityNetworkEventReceiver,
+)
+from subiquitycore.models.network import DHCPState
 
 
 class TestRoutes(unittest.IsolatedAsyncioTestCase):
@@ -135,3 +140,113 @@ class TestRoutes(unittest.IsolatedAsyncioTestCase):
         ]
 
         self.assertFalse(self.er._default_route_exists(routes))
+
+
+class TestCoalescing(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.controller = Mock()
+        self.model = self.controller.model
+        self.devs = {}
+
+        def dev(ifindex, *args):
+            if ifindex not in self.devs:
+                self.devs[ifindex] = Mock(name=f"dev{ifindex}", info=Mock(flags=1))
+            return self.devs[ifindex]
+
+        self.model.new_link.side_effect = dev
+        self.model.update_link.side_effect = dev
+        self.model.del_link.side_effect = dev
+        self.er = SubiquityNetworkEventReceiver(self.controller)
+        self.er.coalesce_window = 0.01
+        self.er.probe_default_routes = Mock()
+
+    def calls(self):
+        return [
+            (c[0], c.args[0])
+            for c in self.controller.mock_calls
+            if c[0] in ("new_link", "update_link", "del_link")
+        ]
+
+    async def test_nothing_delivered_before_flush(self):
+        self.er.new_link(1, Mock())
+        self.er.update_link(1)
+        self.assertEqual([], self.calls())
+        self.model.new_link.assert_called_once()
+        self.model.update_link.assert_called_once()
+
+    async def test_burst_merged_per_ifindex(self):
+        self.er.new_link(1, Mock())
+        self.er.update_link(1)
+        self.er.update_link(1)
+        for i in range(5):
+            self.er.update_link(2)
+        await asyncio.sleep(0.05)
+        self.assertEqual(
+            [("new_link", self.devs[1]), ("update_link", self.devs[2])],
+            self.calls(),
+        )
+
+    async def test_new_then_del_dropped(self):
+        self.er.new_link(1, Mock())
+        self.er.del_link(1)
+        self.er.flush()
+        self.assertEqual([], self.calls())
+
+    async def test_update_then_del(self):
+        self.er.update_link(1)
+        self.er.del_link(1)
+        self.er.flush()
+        self.assertEqual([("del_link", self.devs[1])], self.calls())
+
+    async def test_route_probes_deduplicated(self):
+        for i in range(10):
+            self.er.route_change("add", {"dst": "default", "table": 254})
+        self.er.del_link(3)
+        self.er.flush()
+        self.er.probe_default_routes.assert_called_once()
+        self.controller.update_has_default_route.assert_called_once()
+
+    async def test_flush_cancels_timer(self):
+        self.er.update_link(1)
+        self.er.flush()
+        await asyncio.sleep(0.05)
+        self.assertEqual([("update_link", self.devs[1])], self.calls())
+
+
+def make_dev(name, dhcp_states):
+    dev = Mock()
+    dev.name = name
+    dev.dhcp_state.side_effect = lambda v: dhcp_states.get(v)
+    return dev
+
+
+class TestAffectedInterfaces(unittest.TestCase):
+    def setUp(self):
+        self.controller = Mock()
+        self.controller._applied_config = self.config(dhcp4=True)
+
+    def config(self, **eth0):
+        return {"network": {"version": 2, "ethernets": {"eth0": eth0}}}
+
+    def affected(self, config, *devs):
+        self.controller.model.get_all_netdevs.return_value = list(devs)
+        return BaseNetworkController._affected_interfaces(self.controller, config)
+
+    def test_unchanged(self):
+        eth0 = make_dev("eth0", {4: DHCPState.CONFIGURED})
+        self.assertEqual(set(), self.affected(self.config(dhcp4=True), eth0))
+
+    def test_changed(self):
+        eth0 = make_dev("eth0", {})
+        self.assertEqual({"eth0"}, self.affected(self.config(), eth0))
+
+    def test_retry_timed_out_dhcp(self):
+        # Selecting "Automatic" again after DHCP timed out does not change
+        # the config, but must still be applied to retry DHCP.
+        eth0 = make_dev("eth0", {4: DHCPState.TIMED_OUT})
+        eth1 = make_dev("eth1", {4: DHCPState.CONFIGURED})
+        self.assertEqual({"eth0"}, self.affected(self.config(dhcp4=True), eth0, eth1))
+
+    def test_no_previous_config(self):
+        self.controller._applied_config = None
+        self.assertIsNone(self.affected(self.config(dhcp4=True)))
@@ -14,14 +14,15 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import asyncio
-import json
 import logging
 import os
 
 from subiquitycore.async_helpers import run_bg_task
 from subiquitycore.context import Context
 from subiquitycore.controllerset import ControllerSet
+from subiquitycore.file_util import AsyncFileWriter
 from subiquitycore.pubsub import MessageHub
+from subiquitycore.state_store import StateStore
 
 log = logging.getLogger("subiquitycore.core")
 
@@ -53,6 +54,9 @@ class Application:
             #    subiquitycore/prober.py
             #  - copy-logs-fail: makes post-install copying of logs fail, see
             #    subiquity/controllers/installprogress.py
+            #  - check-gaps-cache: checks cached partition and gap lists
+            #    against a fresh computation, see
+            #    subiquity/common/filesystem/gaps.py
             self.debug_flags = os.environ.get("SUBIQUITY_DEBUG", "").split(",")
 
         self.opts = opts
@@ -63,6 +67,10 @@ class Application:
             self.root = opts.output_base
         self.state_dir = os.path.join(self.root, "run", self.project)
         os.makedirs(self.state_path("states"), exist_ok=True)
+        self.file_writer = AsyncFileWriter()
+        self.state_store = StateStore(
+            self.state_path("states.json"), legacy_dir=self.state_path("states")
+        )
 
         self.scale_factor = float(os.environ.get("SUBIQUITY_REPLAY_TIMESCALE", "1"))
         self.updated = os.path.exists(self.state_path("updating"))
@@ -96,8 +104,7 @@ class Application:
         cur = self.controllers.cur
         if cur is None:
             return
-        with open(self.state_path("states", cur.name), "w") as fp:
-            json.dump(cur.serialize(), fp)
+        self.state_store.set(cur.name, cur.serialize())
 
     def report_start_event(self, context, description):
         log = logging.getLogger(context.full_name())
@@ -129,6 +136,11 @@ class Application:
         self.base_model = self.make_model()
         run_bg_task(self.start())
         await self.exit_event.wait()
+        self.state_store.flush_sync()
+        try:
+            await self.file_writer.flush()
+        except Exception:
+            pass  # already logged by the writer
         if self._exc:
             exc, self._exc = self._exc, None
             raise exc
@@ -13,6 +13,7 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import asyncio
 import contextlib
 import datetime
 import grp
@@ -20,9 +21,12 @@ import logging
 import os
 import shutil
 import tempfile
+from typing import Callable, Dict, Optional
 
 import yaml
 
+from subiquitycore.async_helpers import run_in_thread
+
 _DEF_PERMS_FILE = 0o600
 _DEF_GROUP = "root"
 
@@ -80,6 +84,71 @@ def generate_config_yaml(filename, content, **kwargs):
         tf.write(yaml.dump(content))
 
 
+class AsyncFileWriter:
+    """Write files in a thread, so that slow storage does not hold up the
+    event loop.
+
+    Writes to the same path happen in the order they were requested. As
+    every write replaces the whole file, one that is superseded before
+    it gets going is skipped. Failures are logged, raised to anyone
+    awaiting the task returned by write_file or generate_config_yaml, and
+    raised (once) by the next flush().
+
+    Anything that reads the files from another process (curtin, for
+    instance) must only be started after awaiting flush().
+    """
+
+    def __init__(self):
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._generations: Dict[str, int] = {}
+        # The first failure that flush() has not raised yet.
+        self._error: Optional[BaseException] = None
+
+    def write_file(self, filename, content, **kwargs) -> asyncio.Task:
+        return self._submit(write_file, filename, content, **kwargs)
+
+    def generate_config_yaml(self, filename, content, **kwargs) -> asyncio.Task:
+        return self._submit(generate_config_yaml, filename, content, **kwargs)
+
+    async def flush(self) -> None:
+        """Wait for all the writes requested so far, and raise the first
+        failure since the last flush, if any."""
+        if self._tasks:
+            await asyncio.wait(list(self._tasks.values()))
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def _submit(self, func: Callable, filename, *args, **kwargs) -> asyncio.Task:
+        filename = str(filename)
+        generation = self._generations.get(filename, 0) + 1
+        self._generations[filename] = generation
+        task = asyncio.create_task(
+            self._write(
+                self._tasks.get(filename), generation, func, filename, args, kwargs
+            )
+        )
+        self._tasks[filename] = task
+        task.add_done_callback(lambda t: self._done(filename, t))
+        return task
+
+    async def _write(self, previous, generation, func, filename, args, kwargs):
+        if previous is not None:
+            await asyncio.wait([previous])
+        if self._generations[filename] != generation:
+            return
+        await run_in_thread(func, filename, *args, **kwargs)
+
+    def _done(self, filename: str, task: asyncio.Task) -> None:
+        if self._tasks.get(filename) is task:
+            del self._tasks[filename]
+            del self._generations[filename]
+        if not task.cancelled() and task.exception() is not None:
+            log.error("writing %s failed", filename, exc_info=task.exception())
+            if self._error is None:
+                self._error = task.exception()
+
+
 def copy_file_if_exists(source: str, target: str):
     """If source exists, copy to destination.  Ignore error that dest may be a
     duplicate.  Create destination parent dirs as needed."""
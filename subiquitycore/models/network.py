@@ -210,8 +210,28 @@ class NetworkDev:
             4: None,
             6: None,
         }
+        # netdev_info() is cached until invalidate() is called. version
+        # is the model's version counter as of the last invalidation and
+        # lets clients ask for just the devices that changed.
+        self._netdev_info: Optional[NetDevInfo] = None
+        self.version = 0
+
+    def invalidate(self):
+        """Forget the cached NetDevInfo and give the device a new version.
+
+        The network controllers call this from new_link, update_link and
+        del_link, which every change to a device (whether it comes from
+        the kernel or from the user editing its config) passes through.
+        """
+        self._netdev_info = None
+        self.version = self._model.next_version()
 
     def netdev_info(self) -> NetDevInfo:
+        if self._netdev_info is None:
+            self._netdev_info = self._make_netdev_info()
+        return self._netdev_info
+
+    def _make_netdev_info(self) -> NetDevInfo:
         if self.type == "eth":
             if self.info is not None:
                 is_connected = bool(self.info.is_connected)
@@ -332,7 +352,9 @@ class NetworkDev:
         return self._dhcp_state[version]
 
     def set_dhcp_state(self, version, state):
-        self._dhcp_state[version] = state
+        if self._dhcp_state[version] != state:
+            self._dhcp_state[version] = state
+            self.invalidate()
 
     @property
     def name(self):
@@ -457,6 +479,10 @@ class NetworkModel(object):
         self._has_network = False
         self.project = project
         self.force_offline = False
+        self.version = 0
+        # Maps the names of devices that went away to the version at
+        # which they did.
+        self._removed_netdevs: Dict[str, int] = {}
 
     @property
     def has_network(self):
@@ -553,6 +579,26 @@ class NetworkModel(object):
             devs = [v for v in devs if v.config is not None]
         return devs
 
+    def next_version(self) -> int:
+        self.version += 1
+        return self.version
+
+    def netdev_removed(self, dev):
+        self._removed_netdevs[dev.name] = dev.version
+
+    def get_netdevs_changed_since(self, version: int):
+        """Return the devices that changed and the names of the devices
+        that were removed after version."""
+        devs = self.get_all_netdevs()
+        changed = [dev for dev in devs if dev.version > version]
+        current = {dev.name for dev in devs}
+        removed = sorted(
+            name
+            for name, removed_version in self._removed_netdevs.items()
+            if removed_version > version and name not in current
+        )
+        return changed, removed
+
     def get_netdev_by_name(self, name):
         return self.devices_by_name[name]
 
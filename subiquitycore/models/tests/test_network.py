@@ -15,7 +15,7 @@
 
 from unittest.mock import Mock
 
-from subiquitycore.models.network import NetworkDev
+from subiquitycore.models.network import DHCPState, NetworkDev, NetworkModel
 from subiquitycore.tests import SubiTestCase
 
 
@@ -64,3 +64,59 @@ class TestNetworkDev(SubiTestCase):
         info = nd.netdev_info()
         self.assertIsNone(info.wlan.scan_state)
         self.assertEqual(info.wlan.visible_ssids, [])
+
+
+class TestNetDevInfoCache(SubiTestCase):
+    def setUp(self):
+        self.model = NetworkModel("test")
+
+    def add_dev(self, name, typ="eth", config=None):
+        dev = self.model.devices_by_name[name] = NetworkDev(self.model, name, typ)
+        dev.config = config if config is not None else {}
+        dev.invalidate()
+        return dev
+
+    def test_cached_until_invalidated(self):
+        dev = self.add_dev("eth0")
+        info = dev.netdev_info()
+        self.assertIs(info, dev.netdev_info())
+        dev.config["dhcp4"] = True
+        self.assertIs(info, dev.netdev_info())
+        dev.invalidate()
+        self.assertIsNot(info, dev.netdev_info())
+        self.assertTrue(dev.netdev_info().dhcp4.enabled)
+
+    def test_dhcp_state_invalidates(self):
+        dev = self.add_dev("eth0", config={"dhcp4": True})
+        version = dev.version
+        self.assertIsNone(dev.netdev_info().dhcp4.state)
+        dev.set_dhcp_state(4, DHCPState.PENDING)
+        self.assertEqual(DHCPState.PENDING, dev.netdev_info().dhcp4.state)
+        self.assertGreater(dev.version, version)
+        version = dev.version
+        dev.set_dhcp_state(4, DHCPState.PENDING)
+        self.assertEqual(version, dev.version)
+
+    def test_changed_since(self):
+        eth0 = self.add_dev("eth0")
+        eth1 = self.add_dev("eth1")
+        self.assertEqual(([eth0, eth1], []), self.model.get_netdevs_changed_since(0))
+        version = self.model.version
+        self.assertEqual(([], []), self.model.get_netdevs_changed_since(version))
+        eth1.invalidate()
+        self.assertEqual(([eth1], []), self.model.get_netdevs_changed_since(version))
+
+    def test_removed_since(self):
+        self.add_dev("eth0")
+        eth1 = self.add_dev("eth1")
+        version = self.model.version
+        del self.model.devices_by_name["eth1"]
+        eth1.invalidate()
+        self.model.netdev_removed(eth1)
+        self.assertEqual(([], ["eth1"]), self.model.get_netdevs_changed_since(version))
+        self.assertEqual(
+            ([], []), self.model.get_netdevs_changed_since(self.model.version)
+        )
+        # A device that comes back is reported as changed, not removed.
+        eth1 = self.add_dev("eth1")
+        self.assertEqual(([eth1], []), self.model.get_netdevs_changed_since(version))
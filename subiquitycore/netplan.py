@@ -161,3 +161,57 @@ def configs_in_root(root, masked=False):
     if not masked:
         paths = {os.path.basename(p): p for p in paths}.values()
     return sorted(paths, key=mykey)
+
+
+DEVICE_SECTIONS = ("ethernets", "wifis", "bonds", "bridges", "vlans")
+
+
+def changed_interfaces(old, new):
+    """Return the names of the interfaces affected by going from netplan
+    config old to new.
+
+    As well as the interfaces whose own config changed, this includes
+    the VLANs on a changed link and, in both directions, bonds (or
+    bridges) and their members. Returns None if the change cannot be
+    confined to a set of interfaces (there is no old config or something
+    other than the interface definitions changed).
+    """
+    if old is None:
+        return None
+    old_net = old.get("network", {})
+    new_net = new.get("network", {})
+    for key in old_net.keys() | new_net.keys():
+        if key not in DEVICE_SECTIONS and old_net.get(key) != new_net.get(key):
+            return None
+
+    def devices(net):
+        r = {}
+        for section in DEVICE_SECTIONS:
+            for name, config in (net.get(section) or {}).items():
+                r[name] = (section, config)
+        return r
+
+    old_devs = devices(old_net)
+    new_devs = devices(new_net)
+    changed = {
+        name
+        for name in old_devs.keys() | new_devs.keys()
+        if old_devs.get(name) != new_devs.get(name)
+    }
+
+    # (a, b) means that if a is affected so is b.
+    edges = set()
+    for devs in old_devs, new_devs:
+        for name, (section, config) in devs.items():
+            config = config or {}
+            if section == "vlans" and config.get("link"):
+                edges.add((config["link"], name))
+            for member in config.get("interfaces", []):
+                edges.add((name, member))
+                edges.add((member, name))
+
+    while True:
+        more = {b for a, b in edges if a in changed and b not in changed}
+        if not more:
+            return changed
+        changed |= more
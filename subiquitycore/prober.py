@@ -30,6 +30,10 @@ class Prober:
         if machine_config:
             self.saved_config = yaml.safe_load(machine_config)
         self.debug_flags = debug_flags
+        # (probe_types, task) of a storage probe started before anyone
+        # asked for it, see start_speculative_storage_probe and
+        # seed_storage.
+        self._speculative_storage = None
         log.debug("Prober() init finished, data:{}".format(self.saved_config))
 
     def probe_network(self, receiver):
@@ -39,7 +43,66 @@ class Prober:
             observer = UdevObserver(receiver)
         return observer, observer.start()
 
+    def start_speculative_storage_probe(self, probe_types=None):
+        """Start a storage probe in the background.
+
+        The next call to get_storage with the same probe_types returns
+        its result rather than probing again.
+        """
+        if self._speculative_storage is not None:
+            return
+        log.debug("starting speculative storage probe %s", probe_types)
+        task = asyncio.create_task(self._get_storage(probe_types))
+        self._speculative_storage = (probe_types, task)
+
+    def seed_storage(self, probe_types, storage):
+        """Arrange for the next call to get_storage with the same
+        probe_types to return storage, without probing.
+
+        This is for results that are known to still be valid, such as
+        those of a probe made just before the server restarted.
+        """
+        self.discard_speculative_storage()
+        log.debug("seeding storage probe %s", probe_types)
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(storage)
+        self._speculative_storage = (probe_types, future)
+
+    def discard_speculative_storage(self):
+        """Throw away the result of a speculative probe, if any.
+
+        This should be called if something may have changed the storage
+        of the system since the probe started.
+        """
+        if self._speculative_storage is None:
+            return
+        log.debug("discarding speculative storage probe")
+        _, task = self._speculative_storage
+        self._speculative_storage = None
+        if task.done():
+            if not task.cancelled():
+                # Retrieve the exception (if any) so it is not reported
+                # as never retrieved.
+                task.exception()
+        else:
+            task.cancel()
+
     async def get_storage(self, probe_types=None):
+        if self._speculative_storage is not None:
+            speculative_types, task = self._speculative_storage
+            if speculative_types == probe_types:
+                self._speculative_storage = None
+                try:
+                    return await task
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    # Probe again so that any failure is reported in
+                    # the usual way.
+                    log.exception("speculative storage probe failed")
+        return await self._get_storage(probe_types)
+
+    async def _get_storage(self, probe_types=None):
         if self.saved_config is not None:
             flag = "bpfail-full"
             if probe_types is not None:
@@ -19,20 +19,39 @@ import json
 import logging
 import os
 import time
-from functools import partial
 from urllib.parse import quote_plus, urlencode
 
+import aiohttp
 import requests_unixsocket
 
-from subiquitycore.async_helpers import run_in_thread
 from subiquitycore.utils import run_command
 
 log = logging.getLogger("subiquitycore.snapd")
 
-# Every method in this module blocks. Do not call them from the main thread!
+
+def configure_snapd_proxy(root, proxy):
+    # Blocks, run it in a thread if called from the event loop.
+    log.debug("restarting snapd to pick up proxy config")
+    dropin_dir = os.path.join(root, "etc/systemd/system/snapd.service.d")
+    os.makedirs(dropin_dir, exist_ok=True)
+    with open(os.path.join(dropin_dir, "snap_proxy.conf"), "w") as fp:
+        fp.write(proxy.proxy_systemd_dropin())
+    if root == "/":
+        cmds = [
+            ["systemctl", "daemon-reload"],
+            ["systemctl", "restart", "snapd.service"],
+        ]
+    else:
+        cmds = [["sleep", "2"]]
+    for cmd in cmds:
+        run_command(cmd)
 
 
 class SnapdConnection:
+    # Every method of this class blocks. Do not call them from the main
+    # thread! Code running in the event loop should use
+    # AsyncSnapdConnection instead.
+
     # In LP: #2034715, we found that while some requests should be
     # non-blocking, they are actually blocking and exceeding one minute.
     # Extending the timeout helps.
@@ -61,29 +80,73 @@ class SnapdConnection:
             )
 
     def configure_proxy(self, proxy):
-        log.debug("restarting snapd to pick up proxy config")
-        dropin_dir = os.path.join(self.root, "etc/systemd/system/snapd.service.d")
-        os.makedirs(dropin_dir, exist_ok=True)
-        with open(os.path.join(dropin_dir, "snap_proxy.conf"), "w") as fp:
-            fp.write(proxy.proxy_systemd_dropin())
-        if self.root == "/":
-            cmds = [
-                ["systemctl", "daemon-reload"],
-                ["systemctl", "restart", "snapd.service"],
-            ]
-        else:
-            cmds = [["sleep", "2"]]
-        for cmd in cmds:
-            run_command(cmd)
+        configure_snapd_proxy(self.root, proxy)
+
+
+class AsyncSnapdConnection:
+    """Talk to snapd from the event loop using aiohttp.
+
+    All requests go through one ClientSession whose UnixConnector keeps
+    connections to the snapd socket alive between calls. The session is
+    created on first use so that it belongs to the running loop.
+    """
+
+    default_timeout_seconds = SnapdConnection.default_timeout_seconds
+    connection_limit = 8
+
+    def __init__(self, root, sock):
+        self.root = root
+        self.sock = sock
+        self._session = None
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.UnixConnector(
+                path=self.sock, limit=self.connection_limit
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.default_timeout_seconds),
+                raise_for_status=True,
+            )
+        return self._session
+
+    async def _request(self, method, path, args, body=None):
+        # The host part of the URL is ignored by the connector.
+        url = "http://snapd/" + path
+        try:
+            async with self._get_session().request(
+                method, url, params=args, json=body
+            ) as response:
+                # snapd does not always send a JSON content type for errors.
+                return await response.json(content_type=None)
+        except asyncio.TimeoutError as exc:
+            # aiohttp lets the session timeout escape as a bare
+            # TimeoutError. Callers only handle aiohttp.ClientError, as
+            # they used to handle every RequestException.
+            raise aiohttp.ServerTimeoutError(
+                "timed out waiting for snapd: {} {}".format(method, path)
+            ) from exc
+
+    async def get(self, path, **args):
+        return await self._request("GET", path, args)
+
+    async def post(self, path, body, **args):
+        return await self._request("POST", path, args, body)
+
+    def configure_proxy(self, proxy):
+        configure_snapd_proxy(self.root, proxy)
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
 
 
 class _FakeFileResponse:
     def __init__(self, path):
         self.path = path
 
-    def raise_for_status(self):
-        pass
-
     def json(self):
         with open(self.path) as fp:
             return json.load(fp)
@@ -93,9 +156,6 @@ class _FakeMemoryResponse:
     def __init__(self, data):
         self.data = data
 
-    def raise_for_status(self):
-        pass
-
     def json(self):
         return self.data
 
@@ -122,6 +182,10 @@ class ResponseSet:
 
 
 class FakeSnapdConnection:
+    """Replays the responses stored in examples/snaps.
+
+    Implements the same interface as AsyncSnapdConnection."""
+
     def __init__(self, snap_data_dir, scale_factor, output_base):
         self.snap_data_dir = snap_data_dir
         self.scale_factor = scale_factor
@@ -132,7 +196,18 @@ class FakeSnapdConnection:
         log.debug("pretending to restart snapd to pick up proxy config")
         time.sleep(2 / self.scale_factor)
 
-    def post(self, path, body, **args):
+    async def post(self, path, body, **args):
+        return self._post_response(path, body, **args).json()
+
+    async def get(self, path, **args):
+        if "change" not in path:
+            await asyncio.sleep(1 / self.scale_factor)
+        return self._get_response(path, **args).json()
+
+    async def close(self):
+        pass
+
+    def _post_response(self, path, body, **args):
         if path == "v2/snaps/subiquity" and body["action"] == "refresh":
             # The post-refresh hook does this in the real world.
             update_marker_file = self.output_base + "/run/subiquity/updating"
@@ -171,9 +246,7 @@ class FakeSnapdConnection:
             "Don't know how to fake POST response to {}".format((path, args))
         )
 
-    def get(self, path, **args):
-        if "change" not in path:
-            time.sleep(1 / self.scale_factor)
+    def _get_response(self, path, **args):
         filename = path.replace("/", "-")
         if args:
             filename += "-" + urlencode(sorted(args.items()))
@@ -201,26 +274,36 @@ def get_fake_connection(scale_factor=1000, output_base=None):
 
 
 class AsyncSnapd:
+    # post_and_wait polls the change every poll_interval seconds, doubling
+    # the interval up to max_poll_interval for as long as the change
+    # does not move.
+    poll_interval = 0.1
+    max_poll_interval = 2.0
+
     def __init__(self, connection):
         self.connection = connection
 
     async def get(self, path, **args):
-        response = await run_in_thread(partial(self.connection.get, path, **args))
-        response.raise_for_status()
-        return response.json()
+        return await self.connection.get(path, **args)
 
     async def post(self, path, body, **args):
-        response = await run_in_thread(
-            partial(self.connection.post, path, body, **args)
-        )
-        response.raise_for_status()
-        return response.json()
+        return await self.connection.post(path, body, **args)
+
+    async def close(self):
+        await self.connection.close()
 
     async def post_and_wait(self, path, body, **args):
         change = (await self.post(path, body, **args))["change"]
         change_path = "v2/changes/{}".format(change)
+        interval = self.poll_interval
+        previous = None
         while True:
-            result = await self.get(change_path)
-            if result["result"]["status"] == "Done":
+            result = (await self.get(change_path))["result"]
+            if result["status"] == "Done":
                 break
-            await asyncio.sleep(0.1)
+            if result == previous:
+                interval = min(interval * 2, self.max_poll_interval)
+            else:
+                interval = self.poll_interval
+            previous = result
+            await asyncio.sleep(interval)
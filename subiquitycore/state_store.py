@@ -0,0 +1,136 @@
+# Copyright 2024 Canonical, Ltd.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from subiquitycore.async_helpers import run_in_thread
+
+log = logging.getLogger("subiquitycore.state_store")
+
+
+class StateStore:
+    """The serialized state of each controller, kept in a single file.
+
+    set() only updates the in-memory copy and schedules a write, so that
+    controllers configured in quick succession (as happens during an
+    autoinstall) cost one write between them. Writes happen in a thread
+    and replace the file atomically, so a crash leaves either the old or
+    the new content behind.
+
+    Older versions kept one file per controller in legacy_dir. These are
+    still read, so that state survives a refresh to this version.
+    """
+
+    # How long set() waits for other changes before writing.
+    coalesce_delay = 0.05
+
+    def __init__(self, path: str, legacy_dir: Optional[str] = None):
+        self.path = path
+        self.legacy_dir = legacy_dir
+        self._states: Dict[str, Any] = {}
+        self._dirty = False
+        self._flush_task: Optional[asyncio.Task] = None
+        # Serializes writes from the flush task and flush_sync.
+        self._write_lock = threading.Lock()
+        # Each serialized content gets the next sequence number. A write
+        # whose content is older than what is already on disk is skipped,
+        # e.g. a thread write that only gets going after flush_sync.
+        self._serialized_seq = 0
+        self._written_seq = 0
+
+    def load(self) -> Dict[str, Any]:
+        states: Dict[str, Any] = {}
+        if self.legacy_dir is not None and os.path.isdir(self.legacy_dir):
+            for name in os.listdir(self.legacy_dir):
+                try:
+                    with open(os.path.join(self.legacy_dir, name)) as fp:
+                        states[name] = json.load(fp)
+                except (OSError, ValueError):
+                    log.exception("loading state of %s failed", name)
+        try:
+            with open(self.path) as fp:
+                states.update(json.load(fp))
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError):
+            log.exception("loading states from %s failed", self.path)
+        states.update(self._states)
+        self._states = states
+        return dict(states)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._states
+
+    def get(self, name: str) -> Any:
+        return self._states.get(name)
+
+    def set(self, name: str, state: Any) -> None:
+        self._states[name] = state
+        self._dirty = True
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush())
+
+    async def flush(self) -> None:
+        """Wait until everything set so far is on disk."""
+        if self._flush_task is not None:
+            await asyncio.shield(self._flush_task)
+
+    def flush_sync(self) -> None:
+        """Write anything pending now, e.g. before exec or exit."""
+        with self._write_lock:
+            # A write handed to a thread may still be in flight.
+            in_flight = self._written_seq < self._serialized_seq
+        if self._dirty or in_flight:
+            self._write(*self._serialize())
+
+    def _serialize(self) -> Tuple[int, str]:
+        self._dirty = False
+        self._serialized_seq += 1
+        return self._serialized_seq, json.dumps(self._states)
+
+    async def _flush(self) -> None:
+        await asyncio.sleep(self.coalesce_delay)
+        while self._dirty:
+            try:
+                await run_in_thread(self._write, *self._serialize())
+            except OSError:
+                log.exception("saving states to %s failed", self.path)
+                # Leave it to the next set() or flush_sync() to retry.
+                self._dirty = True
+                return
+
+    def _write(self, seq: int, content: str) -> None:
+        dirname = os.path.dirname(self.path)
+        with self._write_lock:
+            if seq <= self._written_seq:
+                return
+            with tempfile.NamedTemporaryFile(
+                "w", dir=dirname, prefix=".states.", delete=False
+            ) as tf:
+                try:
+                    tf.write(content)
+                    tf.flush()
+                    os.fsync(tf.fileno())
+                except OSError:
+                    os.unlink(tf.name)
+                    raise
+            os.rename(tf.name, self.path)
+            self._written_seq = seq
@@ -42,10 +42,13 @@ def make_app(model=None):
     app.hub = MessageHub()
     app.opts = mock.Mock()
     app.opts.dry_run = True
+    app.debug_flags = ()
     app.scale_factor = 1000
     app.echo_syslog_id = None
     app.log_syslog_id = None
     app.report_start_event = mock.Mock()
     app.report_finish_event = mock.Mock()
+    app.file_writer = mock.Mock()
+    app.file_writer.flush = mock.AsyncMock()
 
     return app
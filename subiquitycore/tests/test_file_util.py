@@ -13,12 +13,14 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import asyncio
 from pathlib import Path
 from unittest.mock import Mock, patch
 
 from subiquitycore.file_util import (
     _DEF_GROUP,
     _DEF_PERMS_FILE,
+    AsyncFileWriter,
     copy_file_if_exists,
     set_log_perms,
 )
@@ -125,3 +127,67 @@ class TestLogPerms(SubiTestCase):
         set_log_perms(target, group="group1")
         self.chmod.assert_called_once_with(target, _DEF_PERMS_FILE | 0o110)
         self.chown.assert_called_once_with(target, 0, 11)
+
+
+class TestAsyncFileWriter(SubiTestCase):
+    def setUp(self):
+        self.writer = AsyncFileWriter()
+        self.written = []
+        p = patch("subiquitycore.file_util.write_file", side_effect=self.write_file)
+        p.start()
+        self.addCleanup(p.stop)
+
+    def write_file(self, filename, content, **kwargs):
+        self.written.append((filename, content))
+        if content == "fail":
+            raise OSError("write failed")
+
+    async def test_flush(self):
+        self.writer.write_file("/a", "1")
+        self.writer.write_file("/b", "2")
+        self.assertEqual([], self.written)
+        await self.writer.flush()
+        self.assertEqual({("/a", "1"), ("/b", "2")}, set(self.written))
+
+    async def test_superseded_write_skipped(self):
+        first = self.writer.write_file("/a", "1")
+        await asyncio.sleep(0)
+        self.writer.write_file("/a", "2")
+        self.writer.write_file("/a", "3")
+        await self.writer.flush()
+        # The first write may have started before the others were
+        # requested, but the last one always ends up on disk last.
+        self.assertTrue(first.done())
+        self.assertEqual(("/a", "3"), self.written[-1])
+        self.assertNotIn(("/a", "2"), self.written)
+
+    async def test_failure(self):
+        task = self.writer.write_file("/a", "fail")
+        with self.assertLogs("subiquitycore.file_util", "ERROR"):
+            with self.assertRaises(OSError):
+                await self.writer.flush()
+        with self.assertRaises(OSError):
+            await task
+        # A failed write does not prevent later ones.
+        self.writer.write_file("/a", "ok")
+        await self.writer.flush()
+        self.assertEqual(("/a", "ok"), self.written[-1])
+
+    async def test_failure_raised_once_by_flush(self):
+        task = self.writer.write_file("/a", "fail")
+        self.writer.write_file("/b", "ok")
+        with self.assertLogs("subiquitycore.file_util", "ERROR"):
+            with self.assertRaises(OSError):
+                await task
+        # The write failed before flush was called; it still surfaces.
+        with self.assertRaises(OSError):
+            await self.writer.flush()
+        await self.writer.flush()
+        self.assertIn(("/b", "ok"), self.written)
+
+    async def test_real_write(self):
+        target = self.tmp_path("dir/file")
+        await self.writer.generate_config_yaml(target, {"key": "value"})
+        self.assertEqual([], self.written)
+        with open(target) as fp:
+            self.assertIn("key: value", fp.read())
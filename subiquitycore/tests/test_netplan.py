@@ -1,6 +1,6 @@
 import os
 
-from subiquitycore.netplan import configs_in_root
+from subiquitycore.netplan import changed_interfaces, configs_in_root
 from subiquitycore.tests import SubiTestCase, populate_dir
 
 
@@ -43,3 +43,64 @@ class TestConfigsInRoot(SubiTestCase):
         self.assertEqual(
             [os.path.join(my_dir, p) for p in yamls], configs_in_root(my_dir)
         )
+
+
+def net(**sections):
+    return {"network": {"version": 2, **sections}}
+
+
+class TestChangedInterfaces(SubiTestCase):
+    def setUp(self):
+        self.base = net(
+            ethernets={
+                "eth0": {"dhcp4": True},
+                "eth1": {},
+                "eth2": {},
+                "eth3": {"dhcp4": True},
+            },
+            bonds={"bond0": {"interfaces": ["eth1", "eth2"], "dhcp4": True}},
+            vlans={"eth0.10": {"id": 10, "link": "eth0"}},
+        )
+
+    def test_no_old_config(self):
+        self.assertIsNone(changed_interfaces(None, self.base))
+
+    def test_unchanged(self):
+        self.assertEqual(set(), changed_interfaces(self.base, self.base))
+
+    def test_global_change(self):
+        new = net(renderer="NetworkManager", **self.base["network"])
+        self.assertIsNone(changed_interfaces(self.base, new))
+
+    def test_single_interface(self):
+        new = net(**self.base["network"])
+        new["network"]["ethernets"] = dict(
+            self.base["network"]["ethernets"], eth3={"dhcp6": True}
+        )
+        self.assertEqual({"eth3"}, changed_interfaces(self.base, new))
+
+    def test_link_change_affects_vlans(self):
+        new = net(**self.base["network"])
+        new["network"]["ethernets"] = dict(
+            self.base["network"]["ethernets"], eth0={"dhcp6": True}
+        )
+        self.assertEqual({"eth0", "eth0.10"}, changed_interfaces(self.base, new))
+
+    def test_vlan_change_leaves_link(self):
+        new = net(**self.base["network"])
+        new["network"]["vlans"] = {
+            "eth0.10": {"id": 10, "link": "eth0", "dhcp4": True},
+        }
+        self.assertEqual({"eth0.10"}, changed_interfaces(self.base, new))
+
+    def test_bond_change_affects_members(self):
+        new = net(**self.base["network"])
+        new["network"]["bonds"] = {
+            "bond0": {"interfaces": ["eth1"], "dhcp4": True},
+        }
+        self.assertEqual({"bond0", "eth1", "eth2"}, changed_interfaces(self.base, new))
+
+    def test_interface_removed(self):
+        new = net(**self.base["network"])
+        new["network"]["vlans"] = {}
+        self.assertEqual({"eth0.10"}, changed_interfaces(self.base, new))
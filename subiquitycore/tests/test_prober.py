@@ -13,6 +13,8 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import asyncio
+
 from subiquitycore.prober import Prober
 from subiquitycore.tests import SubiTestCase
 
@@ -24,3 +26,68 @@ class TestProber(SubiTestCase):
         none_storage = await prober.get_storage(probe_types=None)
         defaults_storage = await prober.get_storage(probe_types={"defaults"})
         self.assertEqual(defaults_storage, none_storage)
+
+
+class TestSpeculativeStorageProbe(SubiTestCase):
+    def setUp(self):
+        with open("examples/machines/simple.json", "r") as fp:
+            self.prober = Prober(machine_config=fp, debug_flags=())
+        self.probes = []
+        self.fail = False
+        real_get_storage = self.prober._get_storage
+
+        async def _get_storage(probe_types=None):
+            self.probes.append(probe_types)
+            if self.fail:
+                raise Exception("probe failed")
+            return await real_get_storage(probe_types)
+
+        self.prober._get_storage = _get_storage
+
+    async def start_speculative(self, probe_types):
+        self.prober.start_speculative_storage_probe(probe_types)
+        # Let the probe get going.
+        await asyncio.sleep(0)
+
+    async def test_result_reused_once(self):
+        await self.start_speculative({"defaults"})
+        storage = await self.prober.get_storage({"defaults"})
+        self.assertEqual([{"defaults"}], self.probes)
+        self.assertEqual(storage, await self.prober.get_storage({"defaults"}))
+        self.assertEqual([{"defaults"}, {"defaults"}], self.probes)
+
+    async def test_other_probe_types(self):
+        await self.start_speculative({"defaults"})
+        await self.prober.get_storage({"blockdev"})
+        await self.prober.get_storage({"defaults"})
+        self.assertEqual([{"defaults"}, {"blockdev"}], self.probes)
+
+    async def test_discard(self):
+        await self.start_speculative({"defaults"})
+        self.prober.discard_speculative_storage()
+        await self.prober.get_storage({"defaults"})
+        self.assertEqual([{"defaults"}, {"defaults"}], self.probes)
+
+    async def test_failure_probes_again(self):
+        self.fail = True
+        await self.start_speculative({"defaults"})
+        self.fail = False
+        storage = await self.prober.get_storage({"defaults"})
+        self.assertEqual([{"defaults"}, {"defaults"}], self.probes)
+        self.assertIn("blockdev", storage)
+
+    async def test_seeded(self):
+        self.prober.seed_storage({"defaults"}, {"blockdev": {"seeded": {}}})
+        # A speculative probe does not replace the seeded result.
+        await self.start_speculative({"defaults"})
+        storage = await self.prober.get_storage({"defaults"})
+        self.assertEqual({"blockdev": {"seeded": {}}}, storage)
+        self.assertEqual([], self.probes)
+        await self.prober.get_storage({"defaults"})
+        self.assertEqual([{"defaults"}], self.probes)
+
+    async def test_seeded_other_probe_types(self):
+        self.prober.seed_storage({"defaults"}, {"blockdev": {"seeded": {}}})
+        storage = await self.prober.get_storage({"blockdev"})
+        self.assertNotIn("seeded", storage["blockdev"])
+        self.assertEqual([{"blockdev"}], self.probes)
@@ -0,0 +1,103 @@
+# Copyright 2024 Canonical, Ltd.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import asyncio
+
+import aiohttp
+from aiohttp import web
+
+from subiquitycore.snapd import AsyncSnapd, AsyncSnapdConnection, get_fake_connection
+from subiquitycore.tests import SubiTestCase
+
+
+class TestAsyncSnapdConnection(SubiTestCase):
+    async def asyncSetUp(self):
+        self.requests = []
+        self.transports = set()
+        self.release = asyncio.Event()
+
+        async def handle(request):
+            self.transports.add(id(request.transport))
+            body = None
+            if request.can_read_body:
+                body = await request.json()
+            self.requests.append(
+                (request.method, request.path, dict(request.query), body)
+            )
+            if request.path == "/v2/missing":
+                return web.json_response(
+                    {"type": "error", "result": {"message": "not found"}},
+                    status=404,
+                )
+            if request.path == "/v2/hang":
+                await self.release.wait()
+            return web.json_response({"type": "sync", "result": "ok"})
+
+        app = web.Application()
+        app.router.add_route("*", "/{path:.*}", handle)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        self.addAsyncCleanup(runner.cleanup)
+        self.addCleanup(self.release.set)
+        sock = self.tmp_path("snapd.socket")
+        await web.UnixSite(runner, sock).start()
+        self.conn = AsyncSnapdConnection("/", sock)
+        self.snapd = AsyncSnapd(self.conn)
+        self.addAsyncCleanup(self.snapd.close)
+
+    async def test_get(self):
+        result = await self.snapd.get("v2/find", section="server")
+        self.assertEqual({"type": "sync", "result": "ok"}, result)
+        self.assertEqual(
+            [("GET", "/v2/find", {"section": "server"}, None)], self.requests
+        )
+
+    async def test_post(self):
+        await self.snapd.post("v2/snaps/subiquity", {"action": "refresh"})
+        self.assertEqual(
+            [("POST", "/v2/snaps/subiquity", {}, {"action": "refresh"})],
+            self.requests,
+        )
+
+    async def test_error(self):
+        with self.assertRaises(aiohttp.ClientResponseError) as cm:
+            await self.snapd.get("v2/missing")
+        self.assertEqual(404, cm.exception.status)
+
+    async def test_timeout(self):
+        self.conn.default_timeout_seconds = 0.1
+        with self.assertRaises(aiohttp.ClientError):
+            await self.snapd.get("v2/hang")
+
+    async def test_connection_reused(self):
+        for i in range(10):
+            await self.snapd.get("v2/changes/{}".format(i))
+        self.assertEqual(10, len(self.requests))
+        self.assertEqual(1, len(self.transports))
+
+
+class TestFakeSnapdConnection(SubiTestCase):
+    async def test_get(self):
+        snapd = AsyncSnapd(get_fake_connection(output_base=self.tmp_dir()))
+        result = await snapd.get("v2/snaps/subiquity")
+        self.assertEqual("subiquity", result["result"]["name"])
+
+    async def test_response_set(self):
+        snapd = AsyncSnapd(get_fake_connection(output_base=self.tmp_dir()))
+        statuses = []
+        while not statuses or statuses[-1] != "Done":
+            result = await snapd.get("v2/changes/7")
+            statuses.append(result["result"]["status"])
+        self.assertEqual("Done", statuses[-1])
@@ -0,0 +1,147 @@
+# Copyright 2024 Canonical, Ltd.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import asyncio
+import json
+import os
+from unittest import mock
+
+from subiquitycore.state_store import StateStore
+from subiquitycore.tests import SubiTestCase, populate_dir
+
+
+class TestStateStore(SubiTestCase):
+    def setUp(self):
+        self.dir = self.tmp_dir()
+        self.path = os.path.join(self.dir, "states.json")
+        self.legacy_dir = os.path.join(self.dir, "states")
+        self.store = StateStore(self.path, legacy_dir=self.legacy_dir)
+
+    def read(self):
+        with open(self.path) as fp:
+            return json.load(fp)
+
+    async def test_set_and_load(self):
+        self.store.set("Network", {"some": "config"})
+        self.store.set("Mirror", None)
+        await self.store.flush()
+        self.assertEqual({"Network": {"some": "config"}, "Mirror": None}, self.read())
+
+        store = StateStore(self.path, legacy_dir=self.legacy_dir)
+        self.assertNotIn("Network", store)
+        store.load()
+        self.assertIn("Network", store)
+        self.assertIn("Mirror", store)
+        self.assertNotIn("Proxy", store)
+        self.assertEqual({"some": "config"}, store.get("Network"))
+
+    async def test_burst_written_once(self):
+        with mock.patch.object(self.store, "_write", wraps=self.store._write) as w:
+            for i in range(10):
+                self.store.set(f"Controller{i}", i)
+            await self.store.flush()
+        w.assert_called_once()
+        self.assertEqual(10, len(self.read()))
+
+    async def test_set_while_writing(self):
+        self.store.set("First", 1)
+        await self.store.flush()
+        self.store.set("Second", 2)
+        await self.store.flush()
+        self.assertEqual({"First": 1, "Second": 2}, self.read())
+
+    async def test_flush_sync(self):
+        self.store.set("Network", 1)
+        self.store.flush_sync()
+        self.assertEqual({"Network": 1}, self.read())
+        with mock.patch.object(self.store, "_write") as w:
+            await self.store.flush()
+        w.assert_not_called()
+
+    async def test_flush_sync_overtakes_queued_write(self):
+        # A thread write of older content that only gets going after
+        # flush_sync (at exit, say) must not replace the newer file.
+        queued = asyncio.Event()
+        release = asyncio.Event()
+
+        async def slow_run_in_thread(func, *args):
+            queued.set()
+            await release.wait()
+            func(*args)
+
+        self.store.coalesce_delay = 0
+        with mock.patch("subiquitycore.state_store.run_in_thread", slow_run_in_thread):
+            self.store.set("Network", 1)
+            await queued.wait()
+            self.store.set("Network", 2)
+            self.store.flush_sync()
+            release.set()
+            await self.store.flush()
+        self.assertEqual({"Network": 2}, self.read())
+
+    async def test_flush_sync_writes_over_in_flight_write(self):
+        # flush_sync (before exec, say) while the thread write is still
+        # in flight must not leave the file without the new content.
+        queued = asyncio.Event()
+        release = asyncio.Event()
+
+        async def slow_run_in_thread(func, *args):
+            queued.set()
+            await release.wait()
+            func(*args)
+
+        self.store.coalesce_delay = 0
+        with mock.patch("subiquitycore.state_store.run_in_thread", slow_run_in_thread):
+            self.store.set("Network", 1)
+            await queued.wait()
+            self.store.flush_sync()
+            self.assertEqual({"Network": 1}, self.read())
+            release.set()
+            await self.store.flush()
+        self.assertEqual({"Network": 1}, self.read())
+
+    async def test_failed_write_keeps_old_content(self):
+        self.store.set("Network", 1)
+        await self.store.flush()
+        with mock.patch("os.fsync", side_effect=OSError):
+            self.store.set("Network", 2)
+            await self.store.flush()
+        self.assertEqual({"Network": 1}, self.read())
+        self.assertEqual(["states.json"], os.listdir(self.dir))
+
+    async def test_failed_write_retried(self):
+        with mock.patch("os.fsync", side_effect=OSError):
+            self.store.set("Network", 1)
+            await self.store.flush()
+        self.assertFalse(os.path.exists(self.path))
+        self.store.flush_sync()
+        self.assertEqual({"Network": 1}, self.read())
+
+    def test_load_legacy(self):
+        populate_dir(
+            self.legacy_dir,
+            {"Network": '{"legacy": true}', "Mirror": '"http://mirror"', "Bad": "{"},
+        )
+        with open(self.path, "w") as fp:
+            json.dump({"Network": {"legacy": False}}, fp)
+        self.assertEqual(
+            {"Network": {"legacy": False}, "Mirror": "http://mirror"},
+            self.store.load(),
+        )
+
+    def test_load_corrupt(self):
+        with open(self.path, "w") as fp:
+            fp.write('{"Netw')
+        self.assertEqual({}, self.store.load())
@@ -0,0 +1,84 @@
+# Copyright 2024 Canonical, Ltd.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+
+from subiquitycore.context import Context
+from subiquitycore.tests import SubiTestCase
+from subiquitycore.tracing import TraceEventWriter
+
+
+class TracingApp:
+    project = "subiquity"
+
+    def __init__(self, tracer):
+        self.tracer = tracer
+
+    def report_start_event(self, context, description):
+        self.tracer.report_start_event(context, description)
+
+    def report_finish_event(self, context, description, status):
+        self.tracer.report_finish_event(context, description, status)
+
+
+class TestTraceEventWriter(SubiTestCase):
+    def setUp(self):
+        self.path = self.tmp_path("log/trace.json")
+        self.tracer = TraceEventWriter(self.path, "subiquity-server")
+        self.context = Context.new(TracingApp(self.tracer))
+
+    def read_events(self):
+        with open(self.path) as fp:
+            return json.load(fp)
+
+    def test_context_times(self):
+        with self.context.child("op") as context:
+            self.assertIsNotNone(context.start_time)
+            self.assertIsNone(context.duration)
+        self.assertGreaterEqual(context.end_time, context.start_time)
+        self.assertGreaterEqual(context.duration, 0)
+
+    def test_events(self):
+        with self.context.child("op", "doing things") as op:
+            with op.child("step"):
+                pass
+        self.tracer.close()
+        metadata, *events = self.read_events()
+        self.assertEqual("process_name", metadata["name"])
+        self.assertEqual(
+            [("b", "op"), ("b", "step"), ("e", "step"), ("e", "op")],
+            [(e["ph"], e["name"]) for e in events],
+        )
+        self.assertEqual({hex(op.id)}, {e["id"] for e in events})
+        self.assertEqual("subiquity/op/step", events[1]["args"]["context"])
+        self.assertEqual("doing things", events[0]["args"]["description"])
+        self.assertEqual("SUCCESS", events[3]["args"]["status"])
+        self.assertLessEqual(events[0]["ts"], events[3]["ts"])
+
+    def test_readable_without_close(self):
+        with self.context.child("op"):
+            pass
+        with open(self.path) as fp:
+            content = fp.read()
+        events = json.loads(content + "]")
+        self.assertEqual(["process_name", "op", "op"], [e["name"] for e in events])
+
+    def test_top_level(self):
+        with self.context.child("a") as a:
+            with a.child("b") as b:
+                with b.child("c") as c:
+                    self.assertIs(a, c.top_level())
+                    self.assertIs(a, b.top_level())
+                    self.assertIs(a, a.top_level())
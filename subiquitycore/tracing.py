@@ -0,0 +1,101 @@
+# Copyright 2024 Canonical, Ltd.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+import logging
+import os
+
+from subiquitycore.file_util import set_log_perms
+
+log = logging.getLogger("subiquitycore.tracing")
+
+
+class TraceEventWriter:
+    """Write context start and finish events as Chrome trace events.
+
+    An instance of this class can be registered as an event listener on
+    an application (see SubiquityServer.add_event_listener). Each
+    context becomes a "nestable async" slice, grouped by the top-level
+    operation it belongs to, and the resulting file can be loaded into
+    Perfetto (https://ui.perfetto.dev) or chrome://tracing.
+
+    The file uses the JSON array format, which does not require the
+    closing bracket, so events are appended as they happen and the trace
+    of a process that crashed or was restarted is still readable.
+    """
+
+    def __init__(self, path, process_name):
+        self.path = path
+        self.pid = os.getpid()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._fp = open(path, "w")
+        set_log_perms(path)
+        self._fp.write("[")
+        self._sep = "\n"
+        self._write(
+            {
+                "ph": "M",
+                "name": "process_name",
+                "pid": self.pid,
+                "args": {"name": process_name},
+            }
+        )
+
+    def _write(self, event):
+        if self._fp is None:
+            return
+        try:
+            self._fp.write(self._sep + json.dumps(event))
+            self._sep = ",\n"
+        except OSError:
+            log.exception("writing trace event failed, disabling tracing")
+            self.close()
+
+    def _event(self, phase, context, timestamp, args):
+        return {
+            "ph": phase,
+            "cat": "context",
+            "name": context.name,
+            "id": hex(context.top_level().id),
+            "ts": int(timestamp * 1_000_000),
+            "pid": self.pid,
+            "tid": self.pid,
+            "args": args,
+        }
+
+    def report_start_event(self, context, description):
+        args = {"context": context.full_name(), "id": context.id}
+        if description:
+            args["description"] = description
+        self._write(self._event("b", context, context.start_time, args))
+
+    def report_finish_event(self, context, description, status):
+        args = {"status": status.name}
+        if description:
+            args["description"] = description
+        self._write(self._event("e", context, context.end_time, args))
+        if self._fp is not None and context.top_level() is context:
+            # Make sure whole operations make it to disk.
+            self._fp.flush()
+
+    def close(self):
+        if self._fp is None:
+            return
+        fp, self._fp = self._fp, None
+        try:
+            fp.write("\n]\n")
+            fp.close()
+        except OSError:
+            pass
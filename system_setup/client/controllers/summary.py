@@ -16,6 +16,7 @@ class SummaryController(SubiquityTuiController):
     def __init__(self, app):
         super().__init__(app)
         self.app_state = None
+        self.app_status_version = None
         self.crash_report_ref = None
         self.summary_view = None
 
@@ -42,11 +43,14 @@ class SummaryController(SubiquityTuiController):
     async def _wait_status(self, context):
         while True:
             try:
-                app_status = await self.app.client.meta.status.GET(cur=self.app_state)
+                app_status = await self.app.client.meta.status.GET(
+                    since=self.app_status_version
+                )
             except aiohttp.ClientError:
                 await asyncio.sleep(1)
                 continue
             self.app_state = app_status.state
+            self.app_status_version = app_status.version
 
             if self.summary_view:
                 self.summary_view.update_for_state(self.app_state)